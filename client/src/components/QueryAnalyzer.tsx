@@ -23,6 +23,7 @@ export default function QueryAnalyzer({
   const [query, setQuery] = useState("");
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [partialSQL, setPartialSQL] = useState("");
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -30,10 +31,13 @@ export default function QueryAnalyzer({
 
     setIsAnalyzing(true);
     setError(null);
+    setPartialSQL("");
 
     try {
-      const response = await api.generateSQL(query);
-      onAnalyze?.(query, response.data);
+      const data = await api.streamSQL(query, (text) =>
+        setPartialSQL((current) => current + text)
+      );
+      onAnalyze?.(query, data);
     } catch (error) {
       console.error("Error generating SQL:", error);
       setError(
@@ -175,6 +179,13 @@ export default function QueryAnalyzer({
         </div>
       </form>
 
+      {/* SQL as it is generated */}
+      {isAnalyzing && partialSQL && (
+        <pre className="mt-4 p-3 bg-gray-900 border border-gray-700 rounded-xl text-xs text-gray-300 whitespace-pre-wrap">
+          {partialSQL}
+        </pre>
+      )}
+
       {/* Error Display */}
       {error && (
         <div className="mt-4 p-3 bg-red-900/20 border border-red-700 rounded-xl">
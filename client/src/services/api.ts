@@ -4,6 +4,32 @@ export interface UploadResponse {
   message: string;
 }
 
+export interface ImportJob {
+  job_id: string;
+  database: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  statements_executed: number;
+  bytes_processed: number;
+  elapsed_seconds: number;
+  error: string | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Identifies this browser to the server, which keeps one database per session
+const SESSION_STORAGE_KEY = "nlp-to-sql-session-id";
+
+function getSessionId(): string {
+  let sessionId = localStorage.getItem(SESSION_STORAGE_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    localStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+  }
+  return sessionId;
+}
+
+const sessionHeaders = () => ({ "X-Session-Id": getSessionId() });
+
 export interface QueryRequest {
   question: string;
 }
@@ -13,6 +39,7 @@ export interface QueryResponse {
     question: string;
     sql_query: string;
     schema: string;
+    source?: "fast_path" | "llm";
   };
 }
 
@@ -28,6 +55,7 @@ export const api = {
       `${API_BASE_URL}/upload-schema?database=${database}`,
       {
         method: "POST",
+        headers: sessionHeaders(),
         body: formData,
       }
     );
@@ -37,6 +65,34 @@ export const api = {
       throw new Error(errorData.detail || "Upload failed");
     }
 
+    // The import runs in the background; wait for it to finish
+    const { job_id } = await response.json();
+    let job = await this.getJob(job_id);
+    while (job.status === "queued" || job.status === "running") {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      job = await this.getJob(job_id);
+    }
+
+    if (job.status === "failed") {
+      throw new Error(job.error || "Upload failed");
+    }
+
+    return {
+      message: `Schema and data uploaded successfully to database '${job.database}'.`,
+    };
+  },
+
+  async getJob(jobId: string): Promise<ImportJob> {
+    // Jobs are only visible to the session that started them
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, {
+      headers: sessionHeaders(),
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || "Failed to get job status");
+    }
+
     return response.json();
   },
 
@@ -45,6 +101,7 @@ export const api = {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...sessionHeaders(),
       },
       body: JSON.stringify({ question }),
     });
@@ -57,20 +114,81 @@ export const api = {
     return response.json();
   },
 
-  async runSQL(sql: string): Promise<any> {
+  // Streams partial SQL to onToken and resolves with the complete query
+  streamSQL(
+    question: string,
+    onToken: (text: string) => void
+  ): Promise<QueryResponse["data"]> {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(
+        `${API_BASE_URL}/generate-sql/stream?question=${encodeURIComponent(
+          question
+        )}&session_id=${encodeURIComponent(getSessionId())}`
+      );
+
+      source.addEventListener("token", (event) => {
+        onToken(JSON.parse((event as MessageEvent).data).text);
+      });
+      source.addEventListener("done", (event) => {
+        source.close();
+        const data = JSON.parse((event as MessageEvent).data);
+        if (!data.is_safe) {
+          reject(new Error(data.message));
+          return;
+        }
+        resolve({
+          question: data.question,
+          sql_query: data.sql_query,
+          schema: data.schema,
+        });
+      });
+      source.addEventListener("error", (event) => {
+        source.close();
+        const data = (event as MessageEvent).data;
+        reject(
+          new Error(data ? JSON.parse(data).error : "Failed to generate SQL")
+        );
+      });
+    });
+  },
+
+  async runSQL(sql: string, confirm = false): Promise<any> {
     const response = await fetch(`${API_BASE_URL}/run-sql`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...sessionHeaders(),
       },
-      body: JSON.stringify({ sql }),
+      body: JSON.stringify({ sql, confirm }),
     });
 
     if (!response.ok) {
       const errorData = await response.json();
-      throw new Error(errorData.detail || "Failed to run SQL");
+      throw new Error(errorData.detail || errorData.error || "Failed to run SQL");
     }
 
     return response.json();
   },
+
+  async exportSQL(
+    sql: string,
+    format: "csv" | "parquet" = "csv",
+    gzip = false
+  ): Promise<Blob> {
+    const response = await fetch(`${API_BASE_URL}/export`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        ...sessionHeaders(),
+      },
+      body: JSON.stringify({ sql, format, gzip }),
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json();
+      throw new Error(errorData.detail || errorData.error || "Failed to export results");
+    }
+
+    return response.blob();
+  },
 };
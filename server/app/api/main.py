@@ -1,17 +1,84 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, File, UploadFile, Query, Request, Header, Depends
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import psycopg2
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, List, Optional
 import os
+import shutil
+import tempfile
+import time
+import psycopg2
+
+from app.services.openai_client import FALLBACK_SQL, get_openai_client, llm_cache, similarity_cache
+from app.services.fast_path import fast_path
+from app.services.llm_cache import normalize_question
+from app.services.schema_catalog import schema_catalog
+from app.services.column_stats import column_stats
+from app.services.sql_ingest import SUPPORTED_EXTENSIONS, load_sql_script
+from app.services.result_cache import ResultCache
+from app.services.import_jobs import ImportJob, ImportJobManager, ImportQueueFullError
+from app.services.schema_retrieval import schema_retriever
+from app.services.tenant_registry import DEFAULT_TENANT, TenantRegistry, tenant_store
+from app.db.connection import pool_manager
+from app.db.executor import (
+    execute_query,
+    iterate_in_db_thread,
+    run_in_db_thread,
+    shutdown_executor,
+    QueryCancelledError
+)
+from app.db.dry_run import dry_run
+from app.db.query_guard import query_guard, ConfirmationRequiredError, QueryRejectedError
+from app.db.streaming import stream_query, make_continuation_token, parse_continuation_token, resumable
+from app.db.export import (
+    EXPORT_CSV,
+    EXPORT_MEDIA_TYPES,
+    EXPORT_PARQUET,
+    PARQUET_AVAILABLE,
+    copy_source,
+    shutdown_export_executor,
+    stream_export,
+)
+from config import settings
+from app.utils.utils import validate_sql_safety, normalize_sql
+from app.utils.singleflight import SingleFlight
+from app.utils.metrics import (
+    FALLBACKS,
+    REQUEST_SECONDS,
+    annotate_trace,
+    registry,
+    start_trace,
+    timed,
+)
+from app.utils.encoding import ENCODERS, MEDIA_TYPES, UnsupportedFormatError, dumps, negotiate_format, sse_event, type_names
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# Concurrent identical requests share one LLM call / one query execution
+generate_sql_flights = SingleFlight()
+run_sql_flights = SingleFlight()
 
-from app.services.openai_client import OpenAIClient
-from app.db.get_db_schema import get_db_schema
-from app.db.connection import get_connection
-from app.utils.utils import validate_sql_safety
+# Results of read-only queries, invalidated whenever their database is re-imported
+result_cache = ResultCache(max_bytes=settings.RESULT_CACHE_MAX_BYTES, ttl_seconds=settings.RESULT_CACHE_TTL)
 
-# In-memory storage for user database mappings (in production, use a proper database)
-user_databases = {}
+# Schema uploads run as background jobs on a bounded worker pool
+import_jobs = ImportJobManager(
+    partial(
+        load_sql_script,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        batch_size=settings.UPLOAD_BATCH_SIZE
+    ),
+    max_workers=settings.IMPORT_WORKERS,
+    max_queued=settings.IMPORT_MAX_QUEUED,
+    jobs_retained=settings.IMPORT_JOBS_RETAINED
+)
 
 app = FastAPI()
 
@@ -24,89 +91,505 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+class RequestMetricsMiddleware:
+    """
+    Times every request and logs slow ones with their stage timings
+    
+    A plain ASGI middleware (rather than @app.middleware) so streamed bodies
+    are timed to their last chunk and the request trace is visible to the
+    endpoint and the database threads it uses.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        trace = start_trace()
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - started
+            # Label by route template (/jobs/{job_id}) to keep the label set bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(seconds, method=scope["method"], path=path, status=status[0])
+            if settings.SLOW_REQUEST_MS > 0 and seconds * 1000 >= settings.SLOW_REQUEST_MS:
+                stages = ", ".join(f"{stage}={ms * 1000:.1f}ms" for stage, ms in trace["stages"].items())
+                # User SQL can hold literal values, so only its fingerprint is logged by default
+                sql = trace["sql"]
+                fingerprint = hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()[:12] if sql else "-"
+                logger.warning(
+                    "Slow request: %s %s -> %s in %.1fms | stages: %s | sql: %s",
+                    scope["method"], scope["path"], status[0], seconds * 1000, stages or "none", fingerprint
+                )
+                if sql:
+                    logger.debug("Slow request sql %s: %s", fingerprint, sql)
+
+app.add_middleware(RequestMetricsMiddleware)
+
+def _pool_samples():
+    for database, stats in pool_manager.stats().items():
+        yield (database, "idle"), stats["idle"]
+        yield (database, "in_use"), stats["in_use"]
+
+def _enabled_caches():
+    caches = (("llm", llm_cache), ("similarity", similarity_cache), ("result", result_cache))
+    # The similarity cache is None unless enabled
+    return [(name, cache) for name, cache in caches if cache is not None]
+
+def _cache_lookup_samples():
+    for name, cache in _enabled_caches():
+        stats = cache.stats()
+        yield (name, "hit"), stats["hits"]
+        yield (name, "miss"), stats["misses"]
+    stats = fast_path.stats()
+    yield ("fast_path", "hit"), stats["hits"]
+    yield ("fast_path", "miss"), stats["lookups"] - stats["hits"]
+
+def _cache_entry_samples():
+    for name, cache in _enabled_caches():
+        yield (name,), cache.stats()["entries"]
+
+def _flight_samples():
+    for name, flights in (("generate_sql", generate_sql_flights), ("run_sql", run_sql_flights)):
+        for key, value in flights.stats().items():
+            yield (name, key), value
+
+# Counters already kept by the caches, pools and flights are read at scrape time
+registry.gauge_callback(
+    "nlpsql_db_pool_connections",
+    "Pooled connections per database and state",
+    ["database", "state"],
+    _pool_samples,
+)
+registry.gauge_callback(
+    "nlpsql_cache_lookups_total",
+    "Cache lookups by cache and outcome (the fast path counts confident matches as hits)",
+    ["cache", "result"],
+    _cache_lookup_samples,
+    metric_type="counter",
+)
+registry.gauge_callback(
+    "nlpsql_cache_entries",
+    "Entries held per cache",
+    ["cache"],
+    _cache_entry_samples,
+)
+registry.gauge_callback(
+    "nlpsql_result_cache_bytes",
+    "Estimated memory held by the result cache",
+    [],
+    lambda: [((), result_cache.stats()["bytes"])],
+)
+registry.gauge_callback(
+    "nlpsql_tenants",
+    "Tenants in memory, their requests in flight, databases they use and evictions so far",
+    ["state"],
+    lambda: [((key,), value) for key, value in tenant_registry.stats().items()],
+)
+registry.gauge_callback(
+    "nlpsql_singleflight",
+    "Request coalescing counters (calls, executions, coalesced, errors, in_flight)",
+    ["flight", "counter"],
+    _flight_samples,
+)
+
 class QueryRequest(BaseModel):
     question: str
 
+class GenerateSQLRequest(QueryRequest):
+    dry_run: bool = False
+    max_repairs: Optional[int] = None
+
 class SQLRequest(BaseModel):
     sql: str
+    timeout_ms: Optional[int] = None
+    confirm: bool = False
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    concurrency: Optional[int] = None
+
+class AskRequest(QueryRequest):
+    timeout_ms: Optional[int] = None
+    confirm: bool = False
+
+class StreamSQLRequest(SQLRequest):
+    fetch_size: Optional[int] = None
+    max_rows: Optional[int] = None
+    continuation_token: Optional[str] = None
+
+class ExportRequest(BaseModel):
+    sql: str
+    format: str = EXPORT_CSV
+    gzip: bool = False
+    timeout_ms: Optional[int] = None
 
+@contextmanager
 def get_connection_to_db(database_name: str):
+    """Borrow a pooled connection to a database, returning it when the block exits"""
     try:
-        # Override DB_NAME env var temporarily
-        os.environ["DB_NAME"] = database_name
-        conn = get_connection()
-        return conn
+        pool = pool_manager.get_pool(database_name)
+        conn = pool.getconn()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
 
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+@app.on_event("shutdown")
+def close_connection_pools():
+    import_jobs.shutdown()
+    shutdown_executor()
+    shutdown_export_executor()
+    column_stats.shutdown()
+    pool_manager.close_all()
+
+async def get_catalog_entry(database: str):
+    """Schema catalog entry for a database, introspecting off the event loop only on a miss"""
+    return schema_catalog.peek(database) or await run_in_db_thread(schema_catalog.get, database)
+
+def invalidate_database_caches(database: str) -> None:
+    """Forget everything derived from a database's previous contents"""
+    # Generated SQL for the old schema is no longer valid
+    llm_cache.invalidate_database(database)
+    if similarity_cache is not None:
+        similarity_cache.invalidate_database(database)
+    schema_catalog.invalidate(database)
+    column_stats.invalidate(database)
+    schema_retriever.invalidate(database)
+    fast_path.invalidate(database)
+    result_cache.invalidate_database(database)
+
+def forget_reimported_database(database: str) -> None:
+    """Drop this worker's in-memory state of a database another worker re-imported"""
+    llm_cache.evict_database(database)
+    if similarity_cache is not None:
+        similarity_cache.invalidate_database(database)
+    schema_catalog.evict(database)
+    column_stats.evict(database)
+    schema_retriever.invalidate(database)
+    fast_path.invalidate(database)
+    result_cache.invalidate_database(database)
+
+def release_database(database: str) -> None:
+    """Free the pool and in-memory schema caches of a database no active tenant uses"""
+    pool_manager.close_pool(database)
+    schema_catalog.evict(database)
+    column_stats.evict(database)
+    schema_retriever.invalidate(database)
+    fast_path.invalidate(database)
+    result_cache.invalidate_database(database)
+
+# Which database each session or API key works on
+tenant_registry = TenantRegistry(
+    max_tenants=settings.TENANT_MAX_ACTIVE,
+    idle_timeout=settings.TENANT_IDLE_TIMEOUT,
+    max_concurrency=settings.TENANT_MAX_CONCURRENCY,
+    store=tenant_store,
+    on_evict=release_database,
+    max_bindings=settings.TENANT_MAX_BINDINGS,
+    store_refresh=settings.TENANT_STORE_REFRESH,
+    on_reimport=forget_reimported_database
+)
+
+# Longest session id accepted from a client
+MAX_SESSION_ID_LENGTH = 128
+
+async def tenant_id_for(request: Request) -> str:
+    """
+    Tenant a request belongs to: its API key, else its session id, else the shared default tenant
+    
+    The session id may also come as a session_id query parameter, for
+    clients such as EventSource that cannot set headers. Session ids are not
+    authenticated: they only keep browsers apart, and anyone who learns one
+    can work on that session's database. Deployments reachable by untrusted
+    clients should set TENANT_REQUIRE_API_KEY, which rejects requests without
+    an X-API-Key (keys are not checked against a list either; each key simply
+    gets its own tenant, so keys must be unguessable secrets).
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        # Keys are never kept in memory or the store in plain text
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    if settings.TENANT_REQUIRE_API_KEY:
+        raise HTTPException(status_code=401, detail="An X-API-Key header is required.")
+    session_id = request.headers.get("x-session-id") or request.query_params.get("session_id")
+    if session_id:
+        if len(session_id) > MAX_SESSION_ID_LENGTH:
+            raise HTTPException(status_code=400, detail="Session id is too long.")
+        return "session:" + session_id
+    return DEFAULT_TENANT
+
+async def tenant_slot(tenant_id: str = Depends(tenant_id_for)):
+    """Hold one of the tenant's request slots (TENANT_MAX_CONCURRENCY) while the request runs"""
+    async with tenant_registry.limit(tenant_id):
+        yield tenant_id
+
+def finish_import(job: ImportJob) -> None:
+    """Runs in the import worker once a job ends, before it reports completion"""
+    # Even a failed import may have committed some batches
+    invalidate_database_caches(job.database)
+    tenant_registry.record_import(job.database)
+    if job.error:
+        return
+
+    # Introspect the new schema once and index it for relevant-table retrieval
+    try:
+        schema_retriever.for_entry(schema_catalog.get(job.database))
+    except Exception as e:
+        logger.warning("Schema indexing failed for '%s': %s", job.database, e)
+
+    # ANALYZE the new tables and keep their statistics for prompts and /schema
+    if settings.COLUMN_STATS_ENABLED:
+        try:
+            column_stats.refresh(job.database)
+        except Exception as e:
+            logger.warning("Gathering column statistics failed for '%s': %s", job.database, e)
+
+    # The uploading tenant now works on this database
+    tenant_registry.bind(job.tenant_id or DEFAULT_TENANT, job.database)
+
+def spool_upload(fileobj, suffix: str) -> str:
+    """Copy an upload to a temporary file that outlives the request (blocking)"""
+    fileobj.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as spooled:
+        shutil.copyfileobj(fileobj, spooled)
+        return spooled.name
+
 @app.post("/upload-schema")
 async def upload_schema(
     file: UploadFile = File(..., content_type="text/x-sql"),
-    database: str = Query(...)
+    database: str = Query(...),
+    tenant_id: str = Depends(tenant_id_for)
 ):
     # Validate database name (basic protection)
-
-    print(file, database)
     if not database.isidentifier():
         raise HTTPException(status_code=400, detail="Invalid database name.")
 
-    if not file.filename.endswith(".sql"):
-        raise HTTPException(status_code=400, detail="Only .sql files are supported.")
+    if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Only .sql, .sql.gz and .zip files are supported.")
 
-    # Read and decode the SQL file
-    contents = await file.read()
-    sql_script = contents.decode("utf-8")
+    # Hand the import to a background worker; progress is reported at /jobs/{job_id}
+    suffix = next(ext for ext in SUPPORTED_EXTENSIONS if file.filename.lower().endswith(ext))
+    path = await run_in_threadpool(spool_upload, file.file, suffix)
+    try:
+        job = import_jobs.submit(database, path, file.filename, on_finish=finish_import, tenant_id=tenant_id)
+    except ImportQueueFullError as e:
+        os.remove(path)
+        raise HTTPException(status_code=429, detail=str(e))
 
-    # Optional: block dangerous keywords
-    forbidden_keywords = ["drop database", "create database"]
-    if any(word in sql_script.lower() for word in forbidden_keywords):
-        raise HTTPException(status_code=400, detail="SQL script contains forbidden commands.")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": f"Import into database '{database}' queued.",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}"
+        }
+    )
 
-    # Create database if it doesn't exist
-    try:
-        # Connect to postgres to create database
-        conn = get_connection_to_db("postgres")
-        conn.autocommit = True
-        cur = conn.cursor()
-        
-        # Check if database exists
-        cur.execute(f"SELECT 1 FROM pg_database WHERE datname = '{database}'")
-        if cur.fetchone() is None:
-            cur.execute(f"CREATE DATABASE {database}")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, tenant_id: str = Depends(tenant_id_for)):
+    """
+    Get the progress and outcome of a schema import
+    
+    Args:
+        job_id: Id returned by /upload-schema
+        tenant_id: Tenant of the request (only its own jobs are visible)
         
-        cur.close()
-        conn.close()
-
-        # Now connect to the target database and execute the schema SQL
-        conn = get_connection_to_db(database)
-        cur = conn.cursor()
-        cur.execute(sql_script)
-        conn.commit()
-        cur.close()
-        conn.close()
+    Returns:
+        dict with status ("queued", "running", "succeeded" or "failed"),
+        statements_executed, bytes_processed, elapsed_seconds and error
+    """
+    job = import_jobs.get(job_id, tenant_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+async def stats_for(database: str):
+    """Column statistics of a database from memory or the store, if enabled and gathered"""
+    if not settings.COLUMN_STATS_ENABLED:
+        return None
+    return await column_stats.apeek(database)
+
+async def schema_for_question(catalog_entry, question: str) -> str:
+    """The part of a database's schema relevant to a question (all of it when small)"""
+    with timed("schema_retrieval"):
+        stats = await stats_for(catalog_entry.database)
+        return schema_retriever.for_entry(catalog_entry).schema_for_question(
+            question,
+            max_tables=settings.SCHEMA_RETRIEVAL_MAX_TABLES,
+            max_chars=settings.SCHEMA_RETRIEVAL_MAX_CHARS,
+            stats=stats.tables if stats is not None else None,
+            max_distinct=settings.COLUMN_STATS_PROMPT_MAX_DISTINCT
+        )
+
+def match_fast_path(catalog_entry, question: str):
+    """Rule-based match for a simple question shape, if the fast path is enabled"""
+    if not settings.FAST_PATH_ENABLED:
+        return None
+    with timed("fast_path"):
+        return fast_path.lookup(catalog_entry, question)
+
+def elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - started) * 1000, 3)
+
+async def generate_for_question(database: str, question: str, timings: Optional[Dict[str, float]] = None):
+    """
+    Generate SQL for a question against the relevant part of a database's schema
+    
+    Simple question shapes are answered by the rule-based fast path; the LLM
+    is called only when it has no confident match. If the LLM call fails, a
+    low-confidence match is preferred over the generic fallback query.
+    
+    Args:
+        database: Database name
+        question: Natural language question
+        timings: Optional dict receiving schema_ms and generate_ms
+    
+    Returns:
+        (generated SQL, schema text used in the prompt, "fast_path" or "llm")
+    """
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    catalog_entry = await get_catalog_entry(database)
+    schema = await schema_for_question(catalog_entry, question)
+    timings["schema_ms"] = elapsed_ms(started)
+    
+    started = time.perf_counter()
+    match = match_fast_path(catalog_entry, question)
+    if fast_path.confident(match):
+        timings["generate_ms"] = elapsed_ms(started)
+        return match.sql, schema, "fast_path"
+    
+    # Shared OpenAI client (answers repeated questions from the LLM cache)
+    client = get_openai_client()
+    
+    async def generate():
+        try:
+            return await client.agenerate_sql_query_strict(question, schema, database=database)
+        except Exception as e:
+            logger.warning("Error generating SQL query: %s", e)
+            if match is not None:
+                fast_path.record_fallback()
+                FALLBACKS.inc(kind="fast_path")
+                return match.sql
+            FALLBACKS.inc(kind="fallback_sql")
+            return FALLBACK_SQL
+    
+    # Generate SQL (identical questions in flight share one call)
+    sql_query = await generate_sql_flights.do(
+        ("generate-sql", database, normalize_question(question)),
+        generate
+    )
+    timings["generate_ms"] = elapsed_ms(started)
+    return sql_query, schema, "llm"
+
+async def dry_run_and_repair(
+    database: str,
+    question: str,
+    schema: str,
+    sql_query: str,
+    max_repairs: int,
+    timings: Dict[str, float]
+):
+    """
+    Dry-run generated SQL and let the model repair it until it plans cleanly
+    
+    SQL that still fails once the repairs are used up is dropped from the
+    LLM caches, so the next request generates afresh instead of reusing it.
+    
+    Args:
+        database: Database name
+        question: Natural language question
+        schema: Schema text the SQL was generated from
+        sql_query: Generated SQL
+        max_repairs: Repair attempts allowed after the first failure
+        timings: Dict receiving dry_run_ms and repair_ms (summed over attempts)
+    
+    Returns:
+        (final SQL, attempts made, {"ok": bool, "errors": [error per failed attempt]})
+    """
+    client = get_openai_client()
+    timings.setdefault("dry_run_ms", 0.0)
+    timings.setdefault("repair_ms", 0.0)
+    errors = []
+    attempts = 1
+    while True:
+        started = time.perf_counter()
+        try:
+            with timed("dry_run"):
+                error = await run_in_db_thread(
+                    dry_run, database, sql_query, settings.DRY_RUN_TIMEOUT_MS, connect=get_connection_to_db
+                )
+        except Exception as e:
+            errors.append(f"Dry run failed: {e}")
+            return sql_query, attempts, {"ok": False, "errors": errors}
+        finally:
+            timings["dry_run_ms"] += elapsed_ms(started)
         
-        # Store the database mapping for this session
-        # In a real app, you'd associate this with a user session
-        user_databases["current"] = database
+        if error is None:
+            return sql_query, attempts, {"ok": True, "errors": errors}
+        errors.append(error)
+        if attempts > max_repairs:
+            client.forget_sql(question, schema, sql_query)
+            return sql_query, attempts, {"ok": False, "errors": errors}
         
-        return {"message": f"Schema and data uploaded successfully to database '{database}'."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"SQL execution failed: {str(e)}")
+        started = time.perf_counter()
+        try:
+            with timed("sql_repair"):
+                sql_query = await client.arepair_sql_query(question, schema, sql_query, error, database=database)
+        except Exception as e:
+            errors.append(f"Repair failed: {e}")
+            client.forget_sql(question, schema, sql_query)
+            return sql_query, attempts, {"ok": False, "errors": errors}
+        finally:
+            timings["repair_ms"] += elapsed_ms(started)
+        attempts += 1
 
 @app.post("/generate-sql")
-async def generate_sql(request: QueryRequest):
+async def generate_sql(request: GenerateSQLRequest, tenant_id: str = Depends(tenant_slot)):
     """
     Generate SQL query from natural language question
     
+    With dry_run, the SQL is planned server-side (EXPLAIN in a read-only
+    transaction) and, if PostgreSQL rejects it, sent back to the model with
+    the error for up to max_repairs corrections before it is returned.
+    
     Args:
-        request: QueryRequest object containing:
+        request: GenerateSQLRequest object containing:
             question (str): Natural language question to convert to SQL
+            dry_run (bool, optional): Validate and repair the SQL before returning
+            max_repairs (int, optional): Repair attempts allowed (capped at the
+                configured SQL_REPAIR_MAX_ATTEMPTS)
             
     Returns:
         dict containing:
             question (str): Original question
             sql_query (str): Generated SQL query
-            schema (str): Database schema used for generation
+            schema (str): Database schema used for generation (only the
+                tables relevant to the question when the schema is large)
+            source (str): "fast_path" if a local rule answered, else "llm"
+            attempts (int): Generations made (1 plus repairs)
+            dry_run (dict | None): {"ok": bool, "errors": [...]} when dry_run is set
+            timings (dict): Milliseconds spent per stage (schema_ms,
+                generate_ms, dry_run_ms, repair_ms, total_ms)
             
     Raises:
         HTTPException: If there is an error generating the query
@@ -120,45 +603,271 @@ async def generate_sql(request: QueryRequest):
     
     try:
         # Get the database that the user uploaded to
-        current_database = user_databases.get("current")
+        current_database = await tenant_registry.adatabase_for(tenant_id)
         if not current_database:
             raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
         
-        # Get database schema for the user's database
-        schema = get_db_schema(current_database)
+        started = time.perf_counter()
+        timings = {}
+        sql_query, schema, source = await generate_for_question(current_database, request.question, timings)
         
-        # Create OpenAI client
-        client = OpenAIClient()
-        
-        # Generate SQL
-        sql_query = client.generate_sql_query(request.question, schema)
+        attempts = 1
+        dry_run_result = None
+        if request.dry_run:
+            max_repairs = settings.SQL_REPAIR_MAX_ATTEMPTS
+            if request.max_repairs is not None:
+                max_repairs = max(0, min(request.max_repairs, max_repairs))
+            sql_query, attempts, dry_run_result = await dry_run_and_repair(
+                current_database, request.question, schema, sql_query, max_repairs, timings
+            )
+        timings["total_ms"] = elapsed_ms(started)
+        annotate_trace(sql=sql_query)
         
         return {
             "data": {
                 "question": request.question,
                 "sql_query": sql_query,
-                "schema": schema
+                "schema": schema,
+                "source": source,
+                "attempts": attempts,
+                "dry_run": dry_run_result,
+                "timings": timings
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/fast-path/stats")
+async def fast_path_stats():
+    """Hit rate of the rule-based fast path (share of questions answered without the LLM)"""
+    return fast_path.stats()
+
+@app.post("/generate-sql/batch")
+async def generate_sql_batch(request: BatchQueryRequest, tenant_id: str = Depends(tenant_slot)):
+    """
+    Generate SQL for many questions against the current database
+    
+    The schema is loaded once for the batch, and questions the rule-based fast
+    path answers never reach the LLM. LLM calls run concurrently, at
+    most `concurrency` at a time and under the process-wide rate limit, and
+    rate-limited or failed (5xx) calls are retried with backoff.
+    
+    Args:
+        request: BatchQueryRequest object containing:
+            questions (list): Natural language questions
+            concurrency (int, optional): LLM calls in flight at once
+                (capped at the configured BATCH_CONCURRENCY)
+            
+    Returns:
+        dict containing:
+            results (list): One {question, sql_query, source, error} per
+                question, in order; sql_query is null when error is set
+            succeeded (int): Questions that produced SQL
+            failed (int): Questions that did not
+            
+    Raises:
+        HTTPException: If the batch is empty or too large, no database is
+            uploaded or the schema cannot be loaded
+    """
+    
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given.")
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions are allowed per batch."
+        )
+    
+    current_database = await tenant_registry.adatabase_for(tenant_id)
+    if not current_database:
+        raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
+    
+    # One catalog lookup and retrieval index for the whole batch
+    try:
+        catalog_entry = await get_catalog_entry(current_database)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    results = [
+        {"question": question, "sql_query": None, "source": None, "error": None}
+        for question in request.questions
+    ]
+    pending = []
+    for position, question in enumerate(request.questions):
+        validation = validate_sql_safety(question, include_select=True)
+        if not validation["is_safe"]:
+            results[position]["error"] = validation["message"]
+            continue
+        match = match_fast_path(catalog_entry, question)
+        if fast_path.confident(match):
+            results[position].update(sql_query=match.sql, source="fast_path")
+            continue
+        pending.append((position, question, await schema_for_question(catalog_entry, question)))
+    
+    concurrency = min(request.concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_CONCURRENCY)
+    generated = await get_openai_client().agenerate_sql_batch(
+        [(question, schema) for _, question, schema in pending],
+        database=current_database,
+        concurrency=concurrency
+    )
+    for (position, _, _), (sql_query, error) in zip(pending, generated):
+        results[position].update(sql_query=sql_query, source="llm" if error is None else None, error=error)
+    
+    failed = sum(1 for result in results if result["error"])
+    return {
+        "data": {
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed
+        }
+    }
+
+async def fast_path_events(sql_query: str):
+    """Fast-path SQL in the event shape of OpenAIClient.astream_sql_query"""
+    yield {"type": "token", "text": sql_query}
+    yield {"type": "sql", "sql_query": sql_query}
+
+@app.get("/generate-sql/stream")
+async def generate_sql_stream(question: str = Query(...), tenant_id: str = Depends(tenant_slot)):
+    """
+    Generate SQL from a natural language question, streaming it as server-sent events
+    
+    Partial SQL is forwarded as soon as the model produces it; the validated
+    query follows as the terminal event.
+    
+    Args:
+        question: Natural language question to convert to SQL
+            
+    Returns:
+        StreamingResponse of text/event-stream events:
+            token: {"text": str} (repeated)
+            done: {"question", "sql_query", "schema", "is_safe", "message"}
+            error: {"error": str} if generation fails after the stream started
+            
+    Raises:
+        HTTPException: If no database is uploaded or the schema cannot be loaded
+    """
+    
+    validation = validate_sql_safety(question, include_select=True)
+    
+    if not validation["is_safe"]:
+        return JSONResponse(content={"error": validation["message"]}, status_code=400)
+    
+    current_database = await tenant_registry.adatabase_for(tenant_id)
+    if not current_database:
+        raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
+    
+    try:
+        catalog_entry = await get_catalog_entry(current_database)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    schema = await schema_for_question(catalog_entry, question)
+    client = get_openai_client()
+    
+    match = match_fast_path(catalog_entry, question)
+    if fast_path.confident(match):
+        generated = fast_path_events(match.sql)
+    else:
+        generated = client.astream_sql_query(question, schema, database=current_database)
+    
+    async def events():
+        try:
+            async for event in generated:
+                if event["type"] == "token":
+                    yield sse_event("token", {"text": event["text"]})
+                    continue
+                
+                sql_validation = validate_sql_safety(event["sql_query"])
+                yield sse_event("done", {
+                    "question": question,
+                    "sql_query": event["sql_query"],
+                    "schema": schema,
+                    "is_safe": sql_validation["is_safe"],
+                    "message": sql_validation["message"]
+                })
+        except Exception as e:
+            logger.warning("Error streaming SQL query: %s", e)
+            yield sse_event("error", {"error": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def execute_and_cache(
+    database: str,
+    sql: str,
+    timeout_ms: Optional[int],
+    confirm: bool,
+    http_request: Request,
+    connect=None
+):
+    """
+    Execute a query behind the cost guard and store its result for later identical requests
+
+    The guard EXPLAINs the query as submitted; the automatic LIMIT is only
+    added to the statement that runs, so it cannot hide a large row estimate.
+    """
+    generation = result_cache.generation(database)
+    limited_sql, row_limit = query_guard.apply_row_limit(database, sql)
+    plan = {}
+
+    def check_plan(cur):
+        plan.update(query_guard.check(cur, database, sql, confirmed=confirm) or {})
+
+    result = await execute_query(
+        database,
+        limited_sql,
+        statement_timeout_ms=timeout_ms,
+        request=http_request,
+        connect=connect or get_connection_to_db,
+        prepare=check_plan if query_guard.enabled else None,
+    )
+    result = query_guard.finish(result, row_limit, plan or None)
+    result_cache.set(database, sql, result, generation=generation)
+    return result
+
 @app.post("/run-sql")
-async def run_sql(request: SQLRequest):
+async def run_sql(
+    request: SQLRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None),
+    accept: Optional[str] = Header(None),
+    tenant_id: str = Depends(tenant_slot)
+):
     """
     Execute SQL query and return results
     
+    The query runs off the event loop with a statement timeout, and is
+    cancelled on the server if the client disconnects. Before it runs, its
+    EXPLAIN estimate is checked against the database's thresholds, and a LIMIT
+    is added to row-returning queries that have none.
+    
     Args:
         request: SQLRequest object containing:
             sql (str): SQL query to execute
+            timeout_ms (int, optional): Statement timeout in milliseconds
+            confirm (bool, optional): Run a query whose estimate needs confirmation
+        http_request: Incoming HTTP request (used to detect disconnects)
+        format: Result format ("json", "columnar", "msgpack" or "arrow");
+            falls back to the Accept header, then "json"
+        accept: Accept header
             
     Returns:
-        dict containing:
+        For "json", a dict containing:
             data (list): List of dictionaries with query results
+            cached (bool): Whether the result came from the result cache
+            plan (dict): EXPLAIN summary (costs, rows, sequential scans, thresholds)
+            truncated (bool): Whether the automatic row limit cut the result
+        For the other formats, {columns, types, rows: [[...]], cached, plan,
+        truncated} encoded as JSON or MessagePack, or an Arrow IPC stream.
+        Every response carries an X-Cache: HIT|MISS header
             
     Raises:
         HTTPException: If SQL is unsafe or has invalid syntax
-        JSONResponse: For other execution errors
+        JSONResponse: 409 with the plan when the query needs confirmation,
+            422 with the plan when it is rejected, or other execution errors
     """
 
     # Validate the SQL that will be executed
@@ -167,52 +876,377 @@ async def run_sql(request: SQLRequest):
     if not validation["is_safe"]:
         return JSONResponse(content={"error": validation["message"]}, status_code=400)
 
+    try:
+        result_format = negotiate_format(format, accept)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
     try:
         # Get the database that the user uploaded to
-        current_database = user_databases.get("current")
+        current_database = await tenant_registry.adatabase_for(tenant_id)
         if not current_database:
             raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
         
-        # Connect to the user's database
-        conn = get_connection_to_db(current_database)
-        cur = conn.cursor()
-        cur.execute(request.sql)
-        print(request.sql)
-        rows = cur.fetchall()
-        column_names = [desc[0] for desc in cur.description]
-        results = [dict(zip(column_names, row)) for row in rows]
-        cur.close()
-        conn.close()
-
-        return {"data": results}
+        annotate_trace(sql=request.sql)
+        # Repeated read-only queries are answered without touching the database
+        result = result_cache.get(current_database, request.sql)
+        cached = result is not None
+
+        if not cached:
+            # Identical statements in flight share one execution; if the client that
+            # started it disconnects, the remaining callers run it again
+            result = await run_sql_flights.do(
+                ("run-sql", current_database, normalize_sql(request.sql), request.timeout_ms, request.confirm),
+                lambda: execute_and_cache(current_database, request.sql, request.timeout_ms, request.confirm, http_request),
+                retry_on=(QueryCancelledError,)
+            )
 
+        cache_header = {"X-Cache": "HIT" if cached else "MISS"}
+        with timed("serialization"):
+            content = ENCODERS[result_format](
+                result.columns,
+                result.type_codes,
+                result.rows,
+                cached=cached,
+                plan=result.plan,
+                truncated=result.truncated
+            )
+        return Response(content=content, media_type=MEDIA_TYPES[result_format], headers=cache_header)
+
+    except ConfirmationRequiredError as e:
+        return JSONResponse(status_code=409, content={"error": str(e), "confirm_required": True, "plan": e.plan})
+    except QueryRejectedError as e:
+        return JSONResponse(status_code=422, content={"error": str(e), "plan": e.plan})
     except psycopg2.errors.SyntaxError:
         raise HTTPException(status_code=400, detail="Invalid SQL syntax.")
+    except psycopg2.errors.QueryCanceled:
+        raise HTTPException(status_code=504, detail="Query exceeded the statement timeout.")
+    except QueryCancelledError as e:
+        return JSONResponse(status_code=499, content={"error": str(e)})
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.post("/run-sql/stream")
+async def run_sql_stream(request: StreamSQLRequest, tenant_id: str = Depends(tenant_slot)):
+    """
+    Execute SQL query and stream results as NDJSON
+    
+    Rows are read through a server-side cursor in batches of fetch_size and
+    written as they arrive. At most max_rows rows are sent per response; if
+    more remain, the final line says so (has_more) and, for queries with a
+    top-level ORDER BY, carries a continuation_token that resumes the stream
+    where it stopped. Without an ORDER BY the row order is not repeatable, so
+    no token is issued; add one (on a unique key) to page through a result,
+    or use /export for all of it. The query's EXPLAIN estimate is checked against
+    the database's cost guard thresholds first, as for /run-sql (on every
+    page, since continuation tokens are not signed).
+    
+    Args:
+        request: StreamSQLRequest object containing:
+            sql (str): SQL query to execute
+            timeout_ms (int, optional): Statement timeout in milliseconds
+            confirm (bool, optional): Run a query whose estimate needs confirmation
+            fetch_size (int, optional): Rows fetched per round trip
+            max_rows (int, optional): Row cap for this response
+            continuation_token (str, optional): Token from a previous truncated stream
+            
+    Returns:
+        StreamingResponse of newline-delimited JSON objects:
+            {"type": "columns", "columns": [...], "types": [...]}
+            {"type": "rows", "rows": [[...], ...]} (repeated)
+            {"type": "end", "row_count": int, "has_more": bool, "continuation_token": str | null}
+        or a 409/422 JSONResponse with the plan, as for /run-sql
+    """
+
+    validation = validate_sql_safety(request.sql)
+
+    if not validation["is_safe"]:
+        return JSONResponse(content={"error": validation["message"]}, status_code=400)
+
+    current_database = await tenant_registry.adatabase_for(tenant_id)
+    if not current_database:
+        raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
+
+    fetch_size = max(1, min(request.fetch_size or settings.STREAM_FETCH_SIZE, settings.STREAM_MAX_ROWS))
+    max_rows = max(1, min(request.max_rows or settings.STREAM_MAX_ROWS, settings.STREAM_MAX_ROWS))
+
+    offset = 0
+    if request.continuation_token:
+        if not resumable(request.sql):
+            raise HTTPException(status_code=400, detail="Only queries with a top-level ORDER BY can be resumed.")
+        try:
+            offset = parse_continuation_token(request.continuation_token, current_database, request.sql)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    events = stream_query(
+        current_database,
+        request.sql,
+        fetch_size=fetch_size,
+        max_rows=max_rows,
+        offset=offset,
+        statement_timeout_ms=request.timeout_ms,
+        connect=get_connection_to_db,
+        prepare=(
+            (lambda cur: query_guard.check(cur, current_database, request.sql, confirmed=request.confirm))
+            if query_guard.enabled else None
+        ),
+    )
+
+    # Run the query up to the first batch before committing to a 200 response
+    try:
+        header = await run_in_db_thread(next, events)
+    except ConfirmationRequiredError as e:
+        return JSONResponse(status_code=409, content={"error": str(e), "confirm_required": True, "plan": e.plan})
+    except QueryRejectedError as e:
+        return JSONResponse(status_code=422, content={"error": str(e), "plan": e.plan})
+    except psycopg2.errors.SyntaxError:
+        raise HTTPException(status_code=400, detail="Invalid SQL syntax.")
+    except psycopg2.errors.QueryCanceled:
+        raise HTTPException(status_code=504, detail="Query exceeded the statement timeout.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    async def body():
+        yield dumps(header) + "\n"
+        async for event in iterate_in_db_thread(events):
+            if event["type"] == "end":
+                event["continuation_token"] = (
+                    make_continuation_token(current_database, request.sql, offset + event["row_count"])
+                    if event["has_more"] and resumable(request.sql) else None
+                )
+            yield dumps(event) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@app.post("/export")
+async def export(request: ExportRequest, tenant_id: str = Depends(tenant_slot)):
+    """
+    Export the full result of a read-only query as CSV or Parquet
+    
+    CSV is streamed straight from PostgreSQL's COPY (query) TO STDOUT;
+    Parquet is written one row group at a time. Rows are never collected
+    in memory, so an export of any size uses a bounded buffer. No row cap
+    or cost guard applies, only the statement timeout.
+    
+    Args:
+        request: ExportRequest object containing:
+            sql (str): SQL query to export
+            format (str, optional): "csv" (default) or "parquet" (needs pyarrow)
+            gzip (bool, optional): gzip the CSV file / use gzip as the Parquet codec
+            timeout_ms (int, optional): Statement timeout in milliseconds
+            
+    Returns:
+        StreamingResponse with the file as an attachment
+    """
+
+    validation = validate_sql_safety(request.sql)
+
+    if not validation["is_safe"]:
+        return JSONResponse(content={"error": validation["message"]}, status_code=400)
+
+    try:
+        source = copy_source(request.sql)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    export_format = request.format.lower()
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{request.format}'")
+    if export_format == EXPORT_PARQUET and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=406, detail="Parquet export requires the 'pyarrow' package")
+
+    current_database = await tenant_registry.adatabase_for(tenant_id)
+    if not current_database:
+        raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
+
+    chunks = stream_export(
+        current_database,
+        source,
+        export_format=export_format,
+        compress=request.gzip,
+        statement_timeout_ms=request.timeout_ms,
+        connect=get_connection_to_db,
+    )
+
+    # Run the query up to the first chunk before committing to a 200 response
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except Exception as e:
+        status, content = query_error(e)
+        return JSONResponse(status_code=status, content=content)
+
+    async def body():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    filename = f"{current_database}-export.{export_format}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    if request.gzip and export_format == EXPORT_CSV:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def query_error(e: Exception):
+    """Map a query execution failure to (HTTP status, error body)"""
+    if isinstance(e, ConfirmationRequiredError):
+        return 409, {"error": str(e), "confirm_required": True, "plan": e.plan}
+    if isinstance(e, QueryRejectedError):
+        return 422, {"error": str(e), "plan": e.plan}
+    if isinstance(e, psycopg2.errors.SyntaxError):
+        return 400, {"error": "Invalid SQL syntax."}
+    if isinstance(e, psycopg2.errors.QueryCanceled):
+        return 504, {"error": "Query exceeded the statement timeout."}
+    if isinstance(e, QueryCancelledError):
+        return 499, {"error": str(e)}
+    if isinstance(e, HTTPException):
+        return e.status_code, {"error": e.detail}
+    return 500, {"error": str(e)}
+
+@app.post("/ask")
+async def ask(request: AskRequest, http_request: Request, tenant_id: str = Depends(tenant_slot)):
+    """
+    Answer a natural language question in one request: generate the SQL, run it
+    and stream the SQL followed by the rows as NDJSON
+    
+    The database's pool is warmed while the schema is looked up and the SQL
+    is generated, but a connection is only borrowed once the SQL has been
+    generated and validated, so none sits idle through the LLM call.
+    
+    Args:
+        request: AskRequest object containing:
+            question (str): Natural language question
+            timeout_ms (int, optional): Statement timeout in milliseconds
+            confirm (bool, optional): Run a query whose estimate needs confirmation
+        http_request: Incoming HTTP request (used to detect disconnects)
+            
+    Returns:
+        StreamingResponse of newline-delimited JSON objects:
+            {"type": "sql", "question": str, "sql_query": str}
+            {"type": "columns", "columns": [...], "types": [...]}
+            {"type": "rows", "rows": [[...], ...]} (repeated)
+            {"type": "end", "row_count": int, "truncated": bool, "cached": bool, "plan": dict}
+        or, if the SQL is unsafe or fails to run after the stream started,
+            {"type": "error", "status": int, "error": str, ...}
+            
+    Raises:
+        HTTPException: If no database is uploaded or SQL generation fails
+    """
+    
+    validation = validate_sql_safety(request.question, include_select=True)
+    
+    if not validation["is_safe"]:
+        return JSONResponse(content={"error": validation["message"]}, status_code=400)
+    
+    current_database = await tenant_registry.adatabase_for(tenant_id)
+    if not current_database:
+        raise HTTPException(status_code=400, detail="No database schema uploaded. Please upload a SQL file first.")
+    
+    # Opening the pool's idle connections overlaps with schema lookup and the
+    # LLM call; nothing is borrowed from it yet
+    warm_up = asyncio.ensure_future(run_in_db_thread(pool_manager.get_pool(current_database).warm))
+    warm_up.add_done_callback(lambda future: future.cancelled() or future.exception())
+    try:
+        sql_query, _, _ = await generate_for_question(current_database, request.question)
+        annotate_trace(sql=sql_query)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def body():
+        yield dumps({"type": "sql", "question": request.question, "sql_query": sql_query}) + "\n"
+        
+        validation = validate_sql_safety(sql_query)
+        if not validation["is_safe"]:
+            yield dumps({"type": "error", "status": 400, "error": validation["message"]}) + "\n"
+            return
+        
+        result = result_cache.get(current_database, sql_query)
+        cached = result is not None
+        try:
+            if not cached:
+                result = await run_sql_flights.do(
+                    ("run-sql", current_database, normalize_sql(sql_query), request.timeout_ms, request.confirm),
+                    lambda: execute_and_cache(
+                        current_database,
+                        sql_query,
+                        request.timeout_ms,
+                        request.confirm,
+                        http_request
+                    ),
+                    retry_on=(QueryCancelledError,)
+                )
+        except Exception as e:
+            status, error = query_error(e)
+            yield dumps({"type": "error", "status": status, **error}) + "\n"
+            return
+        
+        yield dumps({"type": "columns", "columns": result.columns, "types": type_names(result.type_codes)}) + "\n"
+        for start in range(0, len(result.rows), settings.STREAM_FETCH_SIZE):
+            yield dumps({"type": "rows", "rows": result.rows[start:start + settings.STREAM_FETCH_SIZE]}) + "\n"
+        yield dumps({
+            "type": "end",
+            "row_count": len(result.rows),
+            "truncated": result.truncated,
+            "cached": cached,
+            "plan": result.plan
+        }) + "\n"
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint
+    
+    Returns:
+        Stage latency and token histograms, request latencies, fallback and
+        validation counters, and cache, pool and coalescing statistics in
+        the Prometheus text format
+    """
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 @app.get("/current-database")
-async def get_current_database():
+async def get_current_database(tenant_id: str = Depends(tenant_id_for)):
     """Get the current database that the user uploaded to"""
-    current_database = user_databases.get("current")
+    current_database = await tenant_registry.adatabase_for(tenant_id)
     if not current_database:
         raise HTTPException(status_code=404, detail="No database uploaded yet")
     
     return {"database": current_database}
 
 @app.get("/schema")
-async def get_schema():
-    """Get the current database schema"""
-    current_database = user_databases.get("current")
+async def get_schema(tenant_id: str = Depends(tenant_id_for)):
+    """Get the current database schema and its column statistics (null until gathered)"""
+    current_database = await tenant_registry.adatabase_for(tenant_id)
     if not current_database:
         raise HTTPException(status_code=404, detail="No database uploaded yet")
     
     try:
-        schema = get_db_schema(current_database)
-        return {"database": current_database, "schema": schema}
+        catalog_entry = await get_catalog_entry(current_database)
+        stats = await stats_for(current_database)
+        # Plain JSON already; skips FastAPI's recursive jsonable_encoder pass
+        return JSONResponse(content={
+            "database": current_database,
+            "schema": catalog_entry.text,
+            "statistics": stats.tables if stats is not None else None
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get schema: {str(e)}") 
\ No newline at end of file
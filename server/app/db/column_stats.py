@@ -0,0 +1,165 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from app.db.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Activity of every analyzable public table: planner row estimate, rows changed
+# since the last ANALYZE, when that was (manual or autovacuum) and how long ago
+TABLE_ACTIVITY_QUERY = """
+    SELECT cls.relname,
+           cls.reltuples,
+           coalesce(st.n_mod_since_analyze, 0),
+           greatest(st.last_analyze, st.last_autoanalyze),
+           extract(epoch FROM now() - greatest(st.last_analyze, st.last_autoanalyze))
+    FROM pg_class cls
+    JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+    LEFT JOIN pg_stat_user_tables st ON st.relid = cls.oid
+    WHERE ns.nspname = 'public' AND cls.relkind IN ('r', 'p', 'm')
+"""
+
+# Per-column statistics ANALYZE left in pg_stats, for the given tables. Only
+# catalog rows are read; most_common_vals (anyarray) goes through text to text[]
+# (array-typed columns come out as array literals, e.g. '{a,b}'); with_values
+# false leaves common values out for tables where that cast fails.
+COLUMN_STATS_QUERY = """
+    SELECT cls.relname,
+           cls.reltuples,
+           greatest(st.last_analyze, st.last_autoanalyze),
+           coalesce(json_agg(json_build_object(
+               'name', s.attname,
+               'null_frac', s.null_frac,
+               'n_distinct', s.n_distinct,
+               'common_values', CASE WHEN %(with_values)s
+                   THEN (s.most_common_vals::text::text[])[1:%(max_values)s] END,
+               'common_freqs', CASE WHEN %(with_values)s
+                   THEN s.most_common_freqs[1:%(max_values)s] END
+           )) FILTER (WHERE s.attname IS NOT NULL), '[]'::json)
+    FROM pg_class cls
+    JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+    LEFT JOIN pg_stat_user_tables st ON st.relid = cls.oid
+    LEFT JOIN pg_stats s ON s.schemaname = 'public' AND s.tablename = cls.relname AND NOT s.inherited
+    WHERE ns.nspname = 'public' AND cls.relname = ANY(%(tables)s)
+    GROUP BY cls.relname, cls.reltuples, st.last_analyze, st.last_autoanalyze
+"""
+
+# Longer common values are left out (truncating them would mislead the model)
+MAX_VALUE_CHARS = 64
+
+
+def table_activity(database: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Modification counters of the public tables of a database
+
+    Args:
+        database: Database name
+
+    Returns:
+        Table name -> {
+            "row_estimate": float, "modified": int,
+            "analyzed_at": str | None, "analyzed_age": float | None (seconds)
+        }
+    """
+    with get_connection(database) as conn:
+        with conn.cursor() as cur:
+            cur.execute(TABLE_ACTIVITY_QUERY)
+            return {
+                name: {
+                    "row_estimate": row_estimate,
+                    "modified": modified,
+                    "analyzed_at": analyzed_at.isoformat() if analyzed_at else None,
+                    "analyzed_age": float(age) if age is not None else None,
+                }
+                for name, row_estimate, modified, analyzed_at, age in cur.fetchall()
+            }
+
+
+def analyze_tables(database: str, tables: List[str]) -> None:
+    """
+    Run ANALYZE on some public tables (samples rows; never a full scan)
+
+    Args:
+        database: Database name
+        tables: Table names
+    """
+    if not tables:
+        return
+    with get_connection(database) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("ANALYZE {}").format(
+                sql.SQL(", ").join(sql.Identifier("public", table) for table in tables)
+            ))
+        conn.commit()
+
+
+def read_column_stats(database: str, tables: List[str], max_values: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Row counts and per-column statistics of some public tables, from the catalogs
+
+    If the common values of some column cannot be read as text, the tables are
+    read one at a time and the failing one is read without common values, so
+    one odd column never costs the statistics of the whole database.
+
+    Args:
+        database: Database name
+        tables: Table names
+        max_values: Most common values kept per column
+
+    Returns:
+        Table name -> {
+            "row_count": int, "analyzed_at": str | None,
+            "columns": {name: {"null_frac", "distinct", "common_values", "common_freqs"}}
+        }
+    """
+    if not tables:
+        return {}
+    params = {"tables": list(tables), "max_values": max(1, max_values), "with_values": True}
+    with get_connection(database) as conn:
+        with conn.cursor() as cur:
+            try:
+                rows = _fetch_column_stats(cur, params)
+            except psycopg2.DataError:
+                conn.rollback()
+                rows = []
+                for table in tables:
+                    try:
+                        rows += _fetch_column_stats(cur, dict(params, tables=[table]))
+                    except psycopg2.DataError as e:
+                        conn.rollback()
+                        logger.warning("Common values of '%s' in '%s' are unreadable, left out: %s", table, database, e)
+                        rows += _fetch_column_stats(cur, dict(params, tables=[table], with_values=False))
+
+    stats = {}
+    for name, row_estimate, analyzed_at, columns in rows:
+        row_count = max(int(row_estimate), 0)
+        stats[name] = {
+            "row_count": row_count,
+            "analyzed_at": analyzed_at.isoformat() if analyzed_at else None,
+            "columns": {column["name"]: _column_stats(column, row_count) for column in columns},
+        }
+    return stats
+
+
+def _fetch_column_stats(cur, params: Dict[str, Any]) -> List[tuple]:
+    cur.execute(COLUMN_STATS_QUERY, params)
+    return cur.fetchall()
+
+
+def _column_stats(column: Dict[str, Any], row_count: int) -> Dict[str, Any]:
+    # A negative n_distinct is a fraction of the row count (the column grows with the table)
+    n_distinct = column["n_distinct"]
+    distinct = round(n_distinct) if n_distinct >= 0 else round(-n_distinct * row_count)
+
+    values: List[Optional[str]] = column["common_values"] or []
+    freqs: List[float] = column["common_freqs"] or []
+    kept = [(value, freq) for value, freq in zip(values, freqs) if value is None or len(value) <= MAX_VALUE_CHARS]
+    return {
+        "null_frac": round(column["null_frac"], 4),
+        "distinct": distinct,
+        "common_values": [value for value, _ in kept],
+        "common_freqs": [round(freq, 4) for _, freq in kept],
+    }
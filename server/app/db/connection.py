@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+
+from app.db.pool import PoolManager
+from config import settings
+
+# Process-wide pool manager, one pool per database name
+pool_manager = PoolManager(
+    max_pools=settings.DB_POOL_MAX_POOLS,
+    min_size=settings.DB_POOL_MIN_SIZE,
+    max_size=settings.DB_POOL_MAX_SIZE,
+    acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT,
+    idle_timeout=settings.DB_POOL_IDLE_TIMEOUT,
+    health_check_interval=settings.DB_POOL_HEALTH_CHECK_INTERVAL,
+)
+
+
+@contextmanager
+def get_connection(database: str):
+    """
+    Borrow a pooled connection to a database
+
+    The connection is returned to its pool (rolled back if a transaction
+    was left open) when the block exits.
+
+    Args:
+        database: Database name
+
+    Yields:
+        psycopg2 connection
+    """
+    with pool_manager.connection(database) as conn:
+        yield conn
@@ -0,0 +1,56 @@
+from typing import Callable, Optional
+
+import psycopg2
+
+from app.db.connection import get_connection
+from app.utils.utils import validate_sql_safety
+
+
+def describe_error(error: psycopg2.Error) -> str:
+    """PostgreSQL's message for a failed statement, with its detail and hint if any"""
+    diag = error.diag
+    lines = [diag.message_primary or (str(error).strip().splitlines() or [type(error).__name__])[0]]
+    if diag.message_detail:
+        lines.append(f"DETAIL: {diag.message_detail}")
+    if diag.message_hint:
+        lines.append(f"HINT: {diag.message_hint}")
+    return "\n".join(lines)
+
+
+def dry_run(database: str, sql: str, timeout_ms: int, connect: Callable = get_connection) -> Optional[str]:
+    """
+    Check that a query would run, without running it (blocking)
+
+    The query is validated, then planned with EXPLAIN inside a read-only
+    transaction that is always rolled back, so name resolution and type
+    errors surface without touching any rows.
+
+    Args:
+        database: Database name
+        sql: SQL query to check
+        timeout_ms: Statement timeout for planning
+        connect: Context manager factory yielding a connection for the database
+
+    Returns:
+        None if the query is valid, else the error message to show the model
+
+    Raises:
+        psycopg2.OperationalError: If the database itself is unreachable
+    """
+    validation = validate_sql_safety(sql)
+    if not validation["is_safe"]:
+        return validation["message"]
+
+    with connect(database) as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION READ ONLY")
+                cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+                cur.execute("EXPLAIN " + sql)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except psycopg2.Error as e:
+            return describe_error(e)
+        finally:
+            conn.rollback()
+    return None
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from app.db.connection import get_connection
+from app.utils.metrics import observe_stage, timed
+from config import settings
+
+# Bounded pool for blocking psycopg2 work so it never runs on the event loop
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_EXECUTOR_WORKERS,
+    thread_name_prefix="db-worker",
+)
+
+
+_END = object()
+
+
+class QueryResult(NamedTuple):
+    """Rows exactly as the cursor returned them, plus column metadata"""
+    columns: List[str]
+    type_codes: List[int]
+    rows: List[tuple]
+    plan: Optional[Dict[str, Any]] = None
+    truncated: bool = False
+
+
+class QueryCancelledError(Exception):
+    """Raised when a query was cancelled because the client went away"""
+
+
+async def run_in_db_thread(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the database thread pool
+
+    Args:
+        func: Callable to run
+        *args, **kwargs: Arguments forwarded to func
+
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (e.g. its request trace) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor, partial(context.run, func, *args, **kwargs))
+
+
+async def iterate_in_db_thread(iterator: Iterator) -> AsyncIterator:
+    """
+    Drive a blocking iterator (e.g. a server-side cursor) from async code
+
+    Each next() call runs on the database thread pool. If the consumer stops
+    early, the iterator is closed on the pool once any in-flight step finishes,
+    so its connection is always released.
+
+    Args:
+        iterator: Blocking iterator or generator
+
+    Yields:
+        Items produced by the iterator
+    """
+    step = None
+    context = contextvars.copy_context()
+    try:
+        while True:
+            step = _db_executor.submit(context.run, next, iterator, _END)
+            item = await asyncio.wrap_future(step)
+            if item is _END:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None and step is not None:
+            step.add_done_callback(lambda _: _submit_quietly(close))
+
+
+def _submit_quietly(func: Callable) -> None:
+    try:
+        _db_executor.submit(func)
+    except RuntimeError:
+        # Executor already shut down; run inline so the connection is released
+        func()
+
+
+def fetch_all(cur) -> QueryResult:
+    """Default result handler: column names and type OIDs plus every row"""
+    if not cur.description:
+        return QueryResult([], [], [])
+    return QueryResult(
+        [desc[0] for desc in cur.description],
+        [desc[1] for desc in cur.description],
+        cur.fetchall(),
+    )
+
+
+def resolve_statement_timeout(timeout_ms: Optional[int]) -> int:
+    """Clamp a requested statement timeout to the configured maximum"""
+    if not timeout_ms or timeout_ms <= 0:
+        return settings.QUERY_STATEMENT_TIMEOUT_MS
+    return min(timeout_ms, settings.QUERY_MAX_STATEMENT_TIMEOUT_MS)
+
+
+async def execute_query(
+    database: str,
+    sql: str,
+    params: Optional[Sequence[Any]] = None,
+    statement_timeout_ms: Optional[int] = None,
+    request: Optional[Any] = None,
+    handler: Callable = fetch_all,
+    connect: Callable = get_connection,
+    prepare: Optional[Callable] = None,
+) -> Any:
+    """
+    Execute a query on the database thread pool without blocking the event loop
+
+    The statement runs with a transaction-local statement_timeout. When a
+    Starlette request is passed and its client disconnects before the query
+    finishes, the query is cancelled on the server via the libpq cancel protocol;
+    if it has not started yet, the worker gives up as soon as it has a connection.
+
+    Args:
+        database: Database name
+        sql: SQL statement to execute
+        params: Optional query parameters
+        statement_timeout_ms: Per-request timeout (defaults to the configured timeout)
+        request: Optional request whose disconnection cancels the query
+        handler: Callable receiving the cursor after execution; its result is returned
+        connect: Context manager factory yielding a connection for the database
+        prepare: Optional callable receiving the cursor before the statement runs
+            (in the same transaction); raising from it aborts the query
+
+    Returns:
+        The handler's return value (a QueryResult by default)
+
+    Raises:
+        QueryCancelledError: If the client disconnected and the query was cancelled
+    """
+    timeout_ms = resolve_statement_timeout(statement_timeout_ms)
+    active = {}
+    # Guards "cancelled" and active["conn"], so a cancel lands either before
+    # the statement starts or on the connection running it
+    cancel_lock = threading.Lock()
+    cancelled = threading.Event()
+
+    def work():
+        if cancelled.is_set():
+            raise QueryCancelledError("Client disconnected; query cancelled")
+        started = time.perf_counter()
+        with connect(database) as conn:
+            observe_stage("connection_acquire", time.perf_counter() - started)
+            with cancel_lock:
+                if cancelled.is_set():
+                    raise QueryCancelledError("Client disconnected; query cancelled")
+                active["conn"] = conn
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+                    if prepare is not None:
+                        with timed("cost_guard"):
+                            prepare(cur)
+                    with timed("query_execution"):
+                        cur.execute(sql, params)
+                    with timed("row_fetch"):
+                        return handler(cur)
+            finally:
+                with cancel_lock:
+                    active.pop("conn", None)
+
+    query = asyncio.ensure_future(run_in_db_thread(work))
+    if request is None:
+        return await query
+
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({query, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+
+    if not query.done():
+        with cancel_lock:
+            cancelled.set()
+            conn = active.get("conn")
+        if conn is not None:
+            conn.cancel()
+        try:
+            await query
+        except Exception:
+            pass
+        raise QueryCancelledError("Client disconnected; query cancelled")
+
+    return query.result()
+
+
+async def _wait_for_disconnect(request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+
+def shutdown_executor() -> None:
+    """Stop accepting new work on the database thread pool"""
+    _db_executor.shutdown(wait=False)
@@ -0,0 +1,361 @@
+import asyncio
+import contextvars
+import decimal
+import threading
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+PARQUET_AVAILABLE = pyarrow is not None
+
+from app.db.connection import get_connection
+from app.db.executor import resolve_statement_timeout
+from app.utils.encoding import dumps, type_names
+from app.utils.sql_lexer import CLOSE_PAREN, OPEN_PAREN, WORD, SQLLexError, tokenize
+from config import settings
+
+# Formats accepted by /export
+EXPORT_CSV = "csv"
+EXPORT_PARQUET = "parquet"
+
+EXPORT_MEDIA_TYPES = {
+    EXPORT_CSV: "text/csv",
+    EXPORT_PARQUET: "application/vnd.apache.parquet",
+}
+
+# Statements COPY (...) TO STDOUT accepts that the SQL validator also allows
+_COPYABLE_STATEMENTS = {"select", "with", "values", "table"}
+
+# Exports can run for minutes, so they get their own threads instead of
+# holding workers of the query pool
+_export_executor = ThreadPoolExecutor(
+    max_workers=settings.EXPORT_MAX_CONCURRENT,
+    thread_name_prefix="export-worker",
+)
+
+
+_END = object()
+
+
+class ExportCancelledError(Exception):
+    """Raised in the export thread once the client has gone away"""
+
+
+def copy_source(sql: str) -> str:
+    """
+    Query text that can be embedded safely in COPY (...) TO STDOUT
+
+    Leading/trailing comments and the final semicolon are dropped, and the
+    parentheses must balance, so the query can never close the COPY
+    parenthesis itself and append options such as TO PROGRAM.
+
+    Args:
+        sql: Query that already passed validate_sql_safety
+
+    Returns:
+        The query text between its first and last token
+
+    Raises:
+        ValueError: If the query cannot be exported with COPY
+    """
+    try:
+        tokens = [token for token in tokenize(sql) if token.value != ";"]
+    except SQLLexError as e:
+        raise ValueError(str(e))
+    if not tokens:
+        raise ValueError("Empty query")
+    if tokens[0].kind != WORD or tokens[0].value not in _COPYABLE_STATEMENTS:
+        raise ValueError(f"Only SELECT, WITH, VALUES and TABLE queries can be exported, got '{tokens[0].value}'")
+
+    balance = 0
+    for token in tokens:
+        if token.kind == OPEN_PAREN:
+            balance += 1
+        elif token.kind == CLOSE_PAREN:
+            balance -= 1
+            if balance < 0:
+                raise ValueError("Unbalanced parentheses in query")
+    if balance:
+        raise ValueError("Unbalanced parentheses in query")
+    return sql[tokens[0].start:tokens[-1].end]
+
+
+class ChunkPipe:
+    """
+    File-like sink filled by a blocking writer and drained by async code
+
+    Writes are gathered into chunks of chunk_size bytes; at most max_chunks
+    wait for the consumer, after which the writer blocks. A slow client
+    therefore slows the export down instead of growing memory.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, chunk_size: int, max_chunks: int):
+        self._loop = loop
+        self._chunk_size = max(1, chunk_size)
+        self._queue: asyncio.Queue = asyncio.Queue(max(1, max_chunks))
+        self._buffer = bytearray()
+        self._position = 0
+        self._cancelled = threading.Event()
+        self.closed = False
+
+    # Writer side (export thread)
+
+    def write(self, data) -> int:
+        if self._cancelled.is_set():
+            raise ExportCancelledError("Client disconnected")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= self._chunk_size:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Send what is buffered, then end the stream (re-raising error on the consumer side)"""
+        self.closed = True
+        if self._cancelled.is_set():
+            return
+        if self._buffer and error is None:
+            self._put(bytes(self._buffer))
+        self._buffer.clear()
+        self._put(error if error is not None else _END)
+
+    def _put(self, item: Any) -> None:
+        asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop).result()
+
+    # Consumer side (event loop)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Chunks in order until the writer finishes"""
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def cancel(self) -> None:
+        """Stop the writer: its next write raises, and a write blocked on a full queue is released"""
+        self._cancelled.set()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+class GzipWriter:
+    """File-like wrapper gzip-compressing everything written to another sink"""
+
+    def __init__(self, sink, level: int = 6):
+        self._sink = sink
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._sink.write(compressed)
+        return len(data)
+
+    def close(self) -> None:
+        self._sink.write(self._compressor.flush())
+
+
+# Arrow types for PostgreSQL OIDs; anything else is written as text.
+# numeric becomes text too so no precision is lost.
+_ARROW_TYPES = {
+    16: lambda: pyarrow.bool_(),
+    17: lambda: pyarrow.binary(),
+    20: lambda: pyarrow.int64(),
+    21: lambda: pyarrow.int16(),
+    23: lambda: pyarrow.int32(),
+    26: lambda: pyarrow.int64(),
+    700: lambda: pyarrow.float32(),
+    701: lambda: pyarrow.float64(),
+    1082: lambda: pyarrow.date32(),
+    1083: lambda: pyarrow.time64("us"),
+    1114: lambda: pyarrow.timestamp("us"),
+    1184: lambda: pyarrow.timestamp("us", tz="UTC"),
+    1186: lambda: pyarrow.duration("us"),
+}
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    # json/jsonb, arrays, ranges, ...
+    return dumps(value)
+
+
+def parquet_schema(columns: List[str], type_codes: Sequence[int]):
+    """Arrow schema for a result, with the PostgreSQL type names kept as metadata"""
+    fields = [
+        pyarrow.field(name, _ARROW_TYPES[code]() if code in _ARROW_TYPES else pyarrow.string())
+        for name, code in zip(columns, type_codes)
+    ]
+    return pyarrow.schema(fields, metadata={"pg_types": dumps(type_names(type_codes))})
+
+
+def _row_group(schema, type_codes: Sequence[int], rows: List[tuple]):
+    arrays = []
+    for field, code, values in zip(schema, type_codes, zip(*rows)):
+        if code not in _ARROW_TYPES:
+            values = [_as_text(value) for value in values]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_query(
+    database: str,
+    sql: str,
+    sink,
+    export_format: str = EXPORT_CSV,
+    compress: bool = False,
+    statement_timeout_ms: Optional[int] = None,
+    row_group_size: int = settings.EXPORT_ROW_GROUP_SIZE,
+    connect: Callable = get_connection,
+    on_connection: Optional[Callable] = None,
+) -> None:
+    """
+    Write a query result to a file-like sink (blocking)
+
+    CSV comes straight from COPY (query) TO STDOUT, so rows never become
+    Python objects. Parquet is read through a named server-side cursor and
+    written one row group at a time. Either way memory is bounded by one
+    chunk or row group, not by the size of the result.
+
+    Args:
+        database: Database name
+        sql: Query text from copy_source()
+        sink: Object with a write() method receiving the encoded bytes
+        export_format: EXPORT_CSV or EXPORT_PARQUET
+        compress: gzip the CSV stream / use gzip as the Parquet column codec
+        statement_timeout_ms: Per-request statement timeout (EXPORT_STATEMENT_TIMEOUT_MS by default)
+        row_group_size: Rows per Parquet row group
+        connect: Context manager factory yielding a connection for the database
+        on_connection: Called with the connection once borrowed (to allow cancelling)
+    """
+    timeout_ms = resolve_statement_timeout(statement_timeout_ms or settings.EXPORT_STATEMENT_TIMEOUT_MS)
+
+    with connect(database) as conn:
+        if on_connection is not None:
+            on_connection(conn)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION READ ONLY")
+                cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+
+            if export_format == EXPORT_CSV:
+                target = GzipWriter(sink) if compress else sink
+                with conn.cursor() as cur:
+                    cur.copy_expert(f"COPY (\n{sql}\n) TO STDOUT WITH (FORMAT csv, HEADER true)", target)
+                if compress:
+                    target.close()
+            else:
+                _write_parquet(conn, sql, sink, compress, row_group_size)
+        finally:
+            conn.rollback()
+
+
+def _write_parquet(conn, sql: str, sink, compress: bool, row_group_size: int) -> None:
+    with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+        cur.itersize = row_group_size
+        cur.execute(sql)
+        rows = cur.fetchmany(row_group_size)
+        columns = [desc[0] for desc in cur.description]
+        type_codes = [desc[1] for desc in cur.description]
+        schema = parquet_schema(columns, type_codes)
+
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="gzip" if compress else "snappy")
+        try:
+            while rows:
+                writer.write_batch(_row_group(schema, type_codes, rows), row_group_size=row_group_size)
+                rows = cur.fetchmany(row_group_size)
+        finally:
+            writer.close()
+
+
+async def stream_export(
+    database: str,
+    sql: str,
+    export_format: str = EXPORT_CSV,
+    compress: bool = False,
+    statement_timeout_ms: Optional[int] = None,
+    connect: Callable = get_connection,
+) -> AsyncIterator[bytes]:
+    """
+    Run export_query() on an export thread and yield its output as it is produced
+
+    If the consumer stops early (e.g. the client disconnected), the running
+    statement is cancelled and the export thread stops at its next write.
+
+    Args:
+        database: Database name
+        sql: Query text from copy_source()
+        export_format: EXPORT_CSV or EXPORT_PARQUET
+        compress: gzip the output (see export_query)
+        statement_timeout_ms: Per-request statement timeout
+        connect: Context manager factory yielding a connection for the database
+
+    Yields:
+        Chunks of the encoded result, about EXPORT_CHUNK_BYTES each
+    """
+    loop = asyncio.get_running_loop()
+    pipe = ChunkPipe(loop, settings.EXPORT_CHUNK_BYTES, settings.EXPORT_BUFFER_CHUNKS)
+    borrowed = []
+
+    def run() -> None:
+        try:
+            export_query(
+                database,
+                sql,
+                pipe,
+                export_format=export_format,
+                compress=compress,
+                statement_timeout_ms=statement_timeout_ms,
+                connect=connect,
+                on_connection=borrowed.append,
+            )
+        except BaseException as e:
+            pipe.finish(e)
+        else:
+            pipe.finish()
+
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(_export_executor, context.run, run)
+    try:
+        async for chunk in pipe.chunks():
+            yield chunk
+    finally:
+        if not future.done():
+            pipe.cancel()
+            for conn in borrowed:
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+
+
+def shutdown_export_executor() -> None:
+    """Stop accepting new exports"""
+    _export_executor.shutdown(wait=False)
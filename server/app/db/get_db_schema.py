@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional
+
+from app.db.connection import get_connection
+
+# Whole public schema (tables, columns, comments, foreign keys) as one JSON document
+SCHEMA_QUERY = """
+    WITH rels AS (
+        SELECT cls.oid, cls.relname
+        FROM pg_class cls
+        JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+        WHERE ns.nspname = 'public' AND cls.relkind IN ('r', 'p', 'v', 'm')
+    ),
+    cols AS (
+        SELECT att.attrelid,
+               json_agg(json_build_object(
+                   'name', att.attname,
+                   'type', format_type(att.atttypid, att.atttypmod),
+                   'comment', col_description(att.attrelid, att.attnum)
+               ) ORDER BY att.attnum) AS columns
+        FROM pg_attribute att
+        JOIN rels ON rels.oid = att.attrelid
+        WHERE att.attnum > 0 AND NOT att.attisdropped
+        GROUP BY att.attrelid
+    ),
+    fks AS (
+        SELECT con.conrelid,
+               json_agg(json_build_object(
+                   'columns', (SELECT json_agg(a.attname ORDER BY k.ord)
+                               FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                               JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum),
+                   'references_table', dst.relname,
+                   'references_columns', (SELECT json_agg(a.attname ORDER BY k.ord)
+                                          FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+                                          JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum)
+               ) ORDER BY con.conname) AS foreign_keys
+        FROM pg_constraint con
+        JOIN rels ON rels.oid = con.conrelid
+        JOIN pg_class dst ON dst.oid = con.confrelid
+        WHERE con.contype = 'f'
+        GROUP BY con.conrelid
+    )
+    SELECT coalesce(json_agg(json_build_object(
+               'name', rels.relname,
+               'comment', obj_description(rels.oid, 'pg_class'),
+               'columns', coalesce(cols.columns, '[]'::json),
+               'foreign_keys', coalesce(fks.foreign_keys, '[]'::json)
+           ) ORDER BY rels.relname), '[]'::json)
+    FROM rels
+    LEFT JOIN cols ON cols.attrelid = rels.oid
+    LEFT JOIN fks ON fks.conrelid = rels.oid
+"""
+
+# Cheap fingerprint of the public schema's catalog rows, used to detect DDL changes
+SCHEMA_SIGNATURE_QUERY = """
+    SELECT md5(coalesce(string_agg(
+               att.attrelid::text || ':' || cls.relname || ':' || att.attname || ':' ||
+               att.atttypid::text || ':' || att.atttypmod::text,
+               ',' ORDER BY att.attrelid, att.attnum), '') ||
+           (SELECT coalesce(string_agg(con.oid::text, ',' ORDER BY con.oid), '')
+            FROM pg_constraint con
+            JOIN pg_namespace cns ON cns.oid = con.connamespace
+            WHERE con.contype = 'f' AND cns.nspname = 'public'))
+    FROM pg_attribute att
+    JOIN pg_class cls ON cls.oid = att.attrelid
+    JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+    WHERE ns.nspname = 'public'
+      AND cls.relkind IN ('r', 'p', 'v', 'm')
+      AND att.attnum > 0
+      AND NOT att.attisdropped
+"""
+
+
+def introspect_tables(database: str) -> List[Dict[str, Any]]:
+    """
+    Read the public tables of a database with comments and foreign keys
+
+    Everything is fetched with a single catalog query.
+
+    Args:
+        database: Database name
+
+    Returns:
+        List of tables, each a dict with:
+            name (str), comment (str | None),
+            columns (list of {name, type, comment}),
+            foreign_keys (list of {columns, references_table, references_columns})
+    """
+    with get_connection(database) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_QUERY)
+            return cur.fetchone()[0]
+
+
+def schema_signature(database: str) -> str:
+    """
+    Fingerprint of the public schema's columns and foreign keys
+
+    Args:
+        database: Database name
+
+    Returns:
+        md5 hex digest that changes whenever tables, columns or foreign keys change
+    """
+    with get_connection(database) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SIGNATURE_QUERY)
+            return cur.fetchone()[0]
+
+
+def render_schema(
+    tables: List[Dict[str, Any]],
+    only: Optional[List[str]] = None,
+    stats: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_distinct: int = 20
+) -> str:
+    """
+    Render introspected tables as prompt text
+
+    Args:
+        tables: Output of introspect_tables
+        only: Optional table names to include (in this order)
+        stats: Optional column statistics per table (see read_column_stats)
+        max_distinct: Columns with at most this many distinct values get them listed
+
+    Returns:
+        One line per table, e.g. "products(product_id smallint, product_name character varying(40))",
+        followed by one "a.x -> b.y" line per foreign key between included tables.
+        With stats, table lines end in an approximate row count ("-- ~830 rows") and
+        enum-like columns get a line such as "customers.country: 'France', 'Germany' (21 distinct)"
+    """
+    by_name = {table["name"]: table for table in tables}
+    selected = [by_name[name] for name in only if name in by_name] if only is not None else tables
+    included = {table["name"] for table in selected}
+    stats = stats or {}
+
+    lines = []
+    for table in selected:
+        columns = ", ".join(f"{column['name']} {column['type']}" for column in table["columns"])
+        line = f"{table['name']}({columns})"
+        if table["name"] in stats:
+            line += f" -- ~{approximate_count(stats[table['name']]['row_count'])} rows"
+        lines.append(line)
+
+    for table in selected:
+        for fk in table["foreign_keys"]:
+            if fk["references_table"] in included:
+                source = ", ".join(f"{table['name']}.{column}" for column in fk["columns"])
+                target = ", ".join(f"{fk['references_table']}.{column}" for column in fk["references_columns"])
+                lines.append(f"{source} -> {target}")
+
+    for table in selected:
+        table_stats = stats.get(table["name"])
+        if table_stats is None:
+            continue
+        for column in table["columns"]:
+            column_stats = table_stats["columns"].get(column["name"])
+            if column_stats is not None and _lists_values(column["type"], column_stats, max_distinct):
+                lines.append(f"{table['name']}.{column['name']}: {_render_values(column_stats)}")
+
+    return "\n".join(lines)
+
+
+# Column types whose common values tell the model nothing it can filter on by name
+_NON_ENUM_TYPES = (
+    "smallint", "integer", "bigint", "numeric", "real", "double precision", "money", "oid",
+    "boolean", "date", "time", "timestamp", "interval", "bytea", "uuid", "json", "jsonb",
+)
+
+
+def _lists_values(column_type: str, column_stats: Dict[str, Any], max_distinct: int) -> bool:
+    return (
+        0 < column_stats["distinct"] <= max_distinct
+        and any(value is not None for value in column_stats["common_values"])
+        and not column_type.startswith(_NON_ENUM_TYPES)
+    )
+
+
+def _render_values(column_stats: Dict[str, Any]) -> str:
+    # Sorted rather than by frequency so the text (and cache keys built from it) stays stable
+    values = sorted(value for value in column_stats["common_values"] if value is not None)
+    text = ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+    if column_stats["distinct"] > len(values):
+        text += ", ..."
+    text += f" ({column_stats['distinct']} distinct"
+    if column_stats["null_frac"] >= 0.01:
+        text += f", {column_stats['null_frac']:.0%} NULL"
+    return text + ")"
+
+
+def approximate_count(count: int) -> str:
+    """
+    Row count rounded to two significant digits, e.g. 77, 830, 2.2k, 1.5M
+
+    Small changes in a table then leave prompts (and cache keys) unchanged.
+    """
+    digits = len(str(count)) - 2
+    rounded = round(count, -digits) if digits > 0 else count
+    for scale, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "k")):
+        if rounded >= scale:
+            return f"{rounded / scale:g}{suffix}"
+    return str(rounded)
+
+
+def get_db_schema(database: str) -> str:
+    """
+    Describe the public tables of a database for prompting
+
+    Args:
+        database: Database name
+
+    Returns:
+        Schema text as produced by render_schema
+    """
+    return render_schema(introspect_tables(database))
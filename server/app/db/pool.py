@@ -0,0 +1,335 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from config.database import get_connection_params
+
+
+class PoolError(Exception):
+    """Raised when a connection cannot be handed out by a pool"""
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection becomes available within the acquire timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool for a single database"""
+
+    def __init__(
+        self,
+        database: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        connect: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Initialize the pool (connections are opened lazily)
+
+        Args:
+            database: Database every connection in this pool points at
+            min_size: Connections kept open even when idle
+            max_size: Upper bound on open connections (idle + in use)
+            acquire_timeout: Seconds to wait for a free connection
+            idle_timeout: Seconds after which surplus idle connections are closed
+            health_check_interval: Idle seconds after which a connection is pinged before reuse
+            connect: Optional factory for new connections (defaults to psycopg2.connect)
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect or (lambda: psycopg2.connect(**get_connection_params(database)))
+
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def size(self) -> int:
+        """Number of open connections (idle + in use)"""
+        return len(self._idle) + self._in_use
+
+    def warm(self) -> None:
+        """Open connections until min_size are available"""
+        while True:
+            with self._cond:
+                if self._closed or self.size >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+            self.putconn(conn)
+
+    def getconn(self):
+        """
+        Check out a healthy connection, waiting up to acquire_timeout
+
+        Returns:
+            An open psycopg2 connection
+
+        Raises:
+            PoolTimeoutError: If the pool stays exhausted for acquire_timeout seconds
+            PoolError: If the pool has been closed
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            conn, last_used = None, None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError(f"Connection pool for '{self.database}' is closed")
+
+                    self._evict_idle_locked(time.monotonic())
+
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self.size < self.max_size:
+                        self._in_use += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out waiting for a connection to '{self.database}' "
+                            f"({self.max_size} in use)"
+                        )
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if self._is_healthy(conn, last_used):
+                return conn
+
+            # Stale connection: drop it and try again with the freed slot
+            self._close_quietly(conn)
+            self._release_slot()
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection previously obtained from getconn
+            discard: Close the connection instead of keeping it for reuse
+        """
+        if not discard:
+            discard = not self._reset(conn)
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def evict_idle(self) -> int:
+        """
+        Close idle connections older than idle_timeout, keeping min_size open
+
+        Returns:
+            Number of connections closed
+        """
+        with self._cond:
+            return self._evict_idle_locked(time.monotonic())
+
+    def close(self) -> None:
+        """Close idle connections; in-use connections are closed when returned"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage"""
+        with self._cond:
+            return {
+                "database": self.database,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_size": self.max_size,
+                "closed": self._closed,
+            }
+
+    def _evict_idle_locked(self, now: float) -> int:
+        evicted = 0
+        # Oldest idle connections sit on the left
+        while self._idle and self.size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._close_quietly(conn)
+            evicted += 1
+        return evicted
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(conn) -> bool:
+        """Put a returned connection back into a clean state; False if it is unusable"""
+        if conn.closed:
+            return False
+        try:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PoolManager:
+    """Keeps one ConnectionPool per database, capped with LRU eviction"""
+
+    def __init__(
+        self,
+        max_pools: int = 8,
+        pool_factory: Optional[Callable[[str], ConnectionPool]] = None,
+        **pool_options,
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            max_pools: Maximum number of databases with an open pool
+            pool_factory: Optional callable building a pool for a database name
+            **pool_options: Keyword arguments forwarded to ConnectionPool
+        """
+        self.max_pools = max_pools
+        self._pool_factory = pool_factory or (lambda database: ConnectionPool(database, **pool_options))
+        self._pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_pool(self, database: str) -> ConnectionPool:
+        """
+        Get (or lazily create) the pool for a database
+
+        Args:
+            database: Database name
+
+        Returns:
+            The ConnectionPool for that database
+        """
+        evicted = []
+        with self._lock:
+            pool = self._pools.get(database)
+            if pool is not None:
+                self._pools.move_to_end(database)
+                return pool
+
+            pool = self._pool_factory(database)
+            self._pools[database] = pool
+            while len(self._pools) > self.max_pools:
+                _, lru_pool = self._pools.popitem(last=False)
+                evicted.append(lru_pool)
+
+        for lru_pool in evicted:
+            lru_pool.close()
+        return pool
+
+    @contextmanager
+    def connection(self, database: str):
+        """
+        Context manager yielding a pooled connection to a database
+
+        Args:
+            database: Database name
+        """
+        with self.get_pool(database).connection() as conn:
+            yield conn
+
+    def evict_idle(self) -> int:
+        """Close idle connections past their timeout in every pool"""
+        with self._lock:
+            pools = list(self._pools.values())
+        return sum(pool.evict_idle() for pool in pools)
+
+    def close_pool(self, database: str) -> None:
+        """Close and forget the pool for a database, if any"""
+        with self._lock:
+            pool = self._pools.pop(database, None)
+        if pool is not None:
+            pool.close()
+
+    def close_all(self) -> None:
+        """Close every pool"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Usage snapshot for every open pool"""
+        with self._lock:
+            pools = list(self._pools.items())
+        return {database: pool.stats() for database, pool in pools}
@@ -0,0 +1,207 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db.executor import QueryResult
+from app.utils.sql_lexer import SEMICOLON, WORD, SQLLexError, tokenize
+from config import settings
+
+# Statements that return rows and accept a trailing LIMIT
+_LIMITABLE = {"select", "with", "values", "table"}
+
+# Top-level clauses after which a LIMIT is not added (one is present, or it
+# would have to go before a locking clause)
+_NO_AUTO_LIMIT = {"limit", "fetch", "for"}
+
+DEFAULT_THRESHOLDS = {
+    "confirm_cost": settings.QUERY_GUARD_CONFIRM_COST,
+    "reject_cost": settings.QUERY_GUARD_REJECT_COST,
+    "confirm_rows": settings.QUERY_GUARD_CONFIRM_ROWS,
+    "reject_rows": settings.QUERY_GUARD_REJECT_ROWS,
+    "row_limit": settings.QUERY_GUARD_ROW_LIMIT,
+}
+
+
+class QueryGuardError(Exception):
+    """Raised when a query is stopped before execution; carries the plan summary"""
+
+    def __init__(self, message: str, plan: Dict[str, Any]):
+        super().__init__(message)
+        self.plan = plan
+
+
+class QueryRejectedError(QueryGuardError):
+    """Raised when the estimated cost or row count is above the hard limit"""
+
+
+class ConfirmationRequiredError(QueryGuardError):
+    """Raised when the estimate needs the caller's confirmation before running"""
+
+
+def scan_top_level(sql: str) -> Tuple[List[str], int]:
+    """
+    Keywords outside parentheses, strings and comments
+
+    Args:
+        sql: SQL statement
+
+    Returns:
+        (lowercased top-level words, end offset of the statement without
+        trailing whitespace, comments and semicolons)
+    """
+    tokens = [token for token in tokenize(sql) if token.kind != SEMICOLON]
+    words = [token.value for token in tokens if token.kind == WORD and token.depth == 0]
+    return words, tokens[-1].end if tokens else 0
+
+
+def plannable(sql: str) -> bool:
+    """Whether EXPLAIN accepts a statement (SHOW and EXPLAIN itself cannot be planned)"""
+    try:
+        words, _ = scan_top_level(sql)
+    except SQLLexError:
+        # Let the statement itself report the error
+        return True
+    return bool(words) and words[0] in _LIMITABLE
+
+
+def summarize_plan(plan: Any) -> Dict[str, Any]:
+    """
+    Reduce EXPLAIN (FORMAT JSON) output to the figures the guard acts on
+
+    Args:
+        plan: Parsed EXPLAIN output (a one-element list)
+
+    Returns:
+        dict with the root node type, startup/total cost, estimated rows and
+        width, and the tables read with sequential scans
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    seq_scans = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name"):
+            seq_scans.append(node["Relation Name"])
+        stack.extend(node.get("Plans", ()))
+
+    return {
+        "node_type": root.get("Node Type"),
+        "startup_cost": root.get("Startup Cost"),
+        "total_cost": root.get("Total Cost"),
+        "plan_rows": root.get("Plan Rows"),
+        "plan_width": root.get("Plan Width"),
+        "seq_scans": sorted(set(seq_scans)),
+    }
+
+
+class QueryGuard:
+    """Checks planner estimates before a query runs and bounds the rows it returns"""
+
+    def __init__(
+        self,
+        defaults: Optional[Dict[str, float]] = None,
+        overrides: Optional[Dict[str, Dict[str, float]]] = None,
+        enabled: bool = True,
+    ):
+        """
+        Initialize the guard
+
+        Args:
+            defaults: Thresholds used for every database (confirm_cost,
+                reject_cost, confirm_rows, reject_rows, row_limit; 0 disables one)
+            overrides: Per-database threshold overrides, keyed by database name
+            enabled: Whether queries are checked at all
+        """
+        self.defaults = dict(DEFAULT_THRESHOLDS if defaults is None else defaults)
+        self.overrides = overrides or {}
+        self.enabled = enabled
+
+    def thresholds(self, database: str) -> Dict[str, float]:
+        """Effective thresholds for a database"""
+        thresholds = dict(self.defaults)
+        thresholds.update(self.overrides.get(database, {}))
+        return thresholds
+
+    def apply_row_limit(self, database: str, sql: str) -> Tuple[str, Optional[int]]:
+        """
+        Add a LIMIT to a row-returning statement that has none
+
+        One row more than the limit is requested so truncation can be detected.
+
+        Args:
+            database: Database name (selects the row_limit threshold)
+            sql: SQL statement
+
+        Returns:
+            (SQL to execute, row limit applied or None)
+        """
+        row_limit = int(self.thresholds(database)["row_limit"])
+        if not self.enabled or row_limit <= 0:
+            return sql, None
+
+        try:
+            words, end = scan_top_level(sql)
+        except SQLLexError:
+            return sql, None
+        if not words or words[0] not in _LIMITABLE or _NO_AUTO_LIMIT.intersection(words):
+            return sql, None
+        return f"{sql[:end]}\nLIMIT {row_limit + 1}", row_limit
+
+    def check(
+        self, cur, database: str, sql: str, params: Any = None, confirmed: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        EXPLAIN a statement and enforce the database's thresholds
+
+        Statements EXPLAIN cannot plan (SHOW, EXPLAIN) are let through unchecked.
+
+        Args:
+            cur: Open cursor (runs in the caller's transaction)
+            database: Database name
+            sql: Statement that is about to run
+            params: Query parameters
+            confirmed: Whether the caller accepted an expensive query
+
+        Returns:
+            Plan summary, with the thresholds it was checked against, or None
+            if the statement cannot be planned
+
+        Raises:
+            QueryRejectedError: If cost or rows exceed the reject thresholds
+            ConfirmationRequiredError: If they exceed the confirm thresholds
+                and the query was not confirmed
+        """
+        if not plannable(sql):
+            return None
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        summary = summarize_plan(cur.fetchone()[0])
+        thresholds = self.thresholds(database)
+        summary["thresholds"] = thresholds
+
+        cost = summary["total_cost"] or 0
+        rows = summary["plan_rows"] or 0
+        if 0 < thresholds["reject_cost"] < cost or 0 < thresholds["reject_rows"] < rows:
+            raise QueryRejectedError(
+                f"Query rejected: estimated cost {cost:.0f} / rows {rows} exceeds the limit for this database.",
+                summary,
+            )
+        if not confirmed and (0 < thresholds["confirm_cost"] < cost or 0 < thresholds["confirm_rows"] < rows):
+            raise ConfirmationRequiredError(
+                f"Query is expensive (estimated cost {cost:.0f}, rows {rows}); resend with confirm=true to run it.",
+                summary,
+            )
+        return summary
+
+    @staticmethod
+    def finish(result: QueryResult, row_limit: Optional[int], plan: Optional[Dict[str, Any]]) -> QueryResult:
+        """Attach the plan summary and drop the extra row fetched to detect truncation"""
+        rows = result.rows
+        truncated = row_limit is not None and len(rows) > row_limit
+        if truncated:
+            rows = rows[:row_limit]
+        return result._replace(rows=rows, plan=plan, truncated=truncated)
+
+
+query_guard = QueryGuard(overrides=settings.QUERY_GUARD_THRESHOLDS, enabled=settings.QUERY_GUARD_ENABLED)
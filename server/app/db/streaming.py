@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import json
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.db.connection import get_connection
+from app.db.executor import resolve_statement_timeout
+from app.db.query_guard import plannable, scan_top_level
+from app.utils.sql_lexer import SQLLexError
+from app.utils.encoding import type_names
+
+
+def _query_fingerprint(database: str, sql: str) -> str:
+    return hashlib.sha256(f"{database}\0{sql.strip()}".encode("utf-8")).hexdigest()[:16]
+
+
+def resumable(sql: str) -> bool:
+    """
+    Whether a stream of a query can be resumed from a row offset
+
+    Only a top-level ORDER BY makes the row order repeatable; without one a
+    resumed page could repeat or skip rows. Ties in the ORDER BY columns can
+    still be returned in either order, so it should cover a unique key.
+    """
+    try:
+        words, _ = scan_top_level(sql)
+    except SQLLexError:
+        return False
+    return "order" in words
+
+
+def make_continuation_token(database: str, sql: str, offset: int) -> str:
+    """
+    Encode where a truncated stream stopped
+
+    Args:
+        database: Database the query ran against
+        sql: The streamed SQL query
+        offset: Number of rows already delivered
+
+    Returns:
+        Opaque URL-safe token
+    """
+    payload = json.dumps({"q": _query_fingerprint(database, sql), "o": offset})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def parse_continuation_token(token: str, database: str, sql: str) -> int:
+    """
+    Decode a continuation token for the same database and query
+
+    Args:
+        token: Token returned by a previous stream
+        database: Database the query runs against
+        sql: The SQL query being resumed
+
+    Returns:
+        Row offset to resume from
+
+    Raises:
+        ValueError: If the token is malformed or belongs to a different query
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        fingerprint, offset = payload["q"], int(payload["o"])
+    except Exception:
+        raise ValueError("Malformed continuation token")
+
+    if fingerprint != _query_fingerprint(database, sql) or offset < 0:
+        raise ValueError("Continuation token does not match this query")
+    return offset
+
+
+def stream_query(
+    database: str,
+    sql: str,
+    fetch_size: int,
+    max_rows: int,
+    offset: int = 0,
+    statement_timeout_ms: Optional[int] = None,
+    connect: Callable = get_connection,
+    prepare: Optional[Callable] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a query through a named server-side cursor (blocking generator)
+
+    Rows are fetched fetch_size at a time, so memory stays bounded by one
+    batch no matter how large the result is. The connection is held until
+    the generator is exhausted or closed. SHOW and EXPLAIN, which cannot be
+    declared as cursors, run on a regular cursor (their results are small).
+
+    Args:
+        database: Database name
+        sql: Read-only SQL query
+        fetch_size: Rows per round trip to the server
+        max_rows: Stop after this many rows
+        offset: Rows to skip on the server before streaming (from a continuation token)
+        statement_timeout_ms: Per-request statement timeout
+        connect: Context manager factory yielding a connection for the database
+        prepare: Optional callable receiving a cursor before the statement runs
+            (e.g. the cost guard; whatever it raises surfaces from the first next())
+
+    Yields:
+        {"type": "columns", "columns": [...], "types": [...]} once, then
+        {"type": "rows", "rows": [tuple, ...]} per batch, then
+        {"type": "end", "row_count": int, "has_more": bool}
+    """
+    sql = sql.strip().rstrip(";")
+    timeout_ms = resolve_statement_timeout(statement_timeout_ms)
+
+    with connect(database) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+            if prepare is not None:
+                prepare(cur)
+
+        with conn.cursor(name=f"stream_{uuid.uuid4().hex}" if plannable(sql) else None) as cur:
+            cur.itersize = fetch_size
+            cur.execute(sql)
+            if offset:
+                # MOVE on the server (for named cursors): skipped rows never cross the wire
+                cur.scroll(offset)
+
+            batch = cur.fetchmany(min(fetch_size, max_rows))
+            yield {
+                "type": "columns",
+                "columns": [desc[0] for desc in cur.description],
+                "types": type_names([desc[1] for desc in cur.description]),
+            }
+
+            sent = 0
+            while batch:
+                sent += len(batch)
+                yield {"type": "rows", "rows": batch}
+                remaining = max_rows - sent
+                if remaining <= 0:
+                    break
+                batch = cur.fetchmany(min(fetch_size, remaining))
+
+            has_more = sent >= max_rows and bool(cur.fetchmany(1))
+            yield {"type": "end", "row_count": sent, "has_more": has_more}
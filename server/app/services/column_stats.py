@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.db.column_stats import analyze_tables, read_column_stats, table_activity
+from app.services.tenant_registry import TenantStore, tenant_store
+from app.utils.metrics import timed
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows a table must have changed, on top of the threshold fraction, before it
+# is analyzed again (the same floor autovacuum uses)
+_ANALYZE_MIN_ROWS = 50
+
+# Tables analyzed this recently are left alone: writes committed just before an
+# ANALYZE (e.g. by the import) can reach the statistics counters after it
+_ANALYZE_GRACE_SECONDS = 60.0
+
+
+class DatabaseStats:
+    """Column statistics of one database; replaced as a whole on every refresh"""
+
+    def __init__(self, database: str, tables: Dict[str, Dict[str, Any]]):
+        self.database = database
+        self.tables = tables
+        self.loaded_at = time.time()
+
+
+class ColumnStatsCatalog:
+    """
+    Row counts and per-column statistics of each database, served from memory
+
+    Statistics come from pg_class/pg_stats after ANALYZE, which samples rows
+    instead of scanning tables. A refresh only analyzes tables that changed
+    substantially since their last ANALYZE and only re-reads tables whose
+    statistics changed (including ones autovacuum analyzed), so keeping the
+    catalog current costs one catalog query when nothing happened. Requests
+    never wait for a refresh: due ones run on a background thread.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 300.0,
+        analyze_threshold: float = 0.1,
+        max_values: int = 10,
+        store: Optional[TenantStore] = None,
+        activity: Callable[[str], Dict[str, Dict[str, Any]]] = table_activity,
+        analyze: Callable[[str, List[str]], None] = analyze_tables,
+        read: Callable[[str, List[str], int], Dict[str, Dict[str, Any]]] = read_column_stats,
+    ):
+        """
+        Initialize the catalog
+
+        Args:
+            refresh_interval: Seconds between checks for changed tables (0 disables)
+            analyze_threshold: Fraction of a table's rows that must change before it is analyzed again
+            max_values: Most common values kept per column
+            store: Optional store persisting statistics between restarts and processes
+            activity: Callable returning the modification counters of a database's tables
+            analyze: Callable running ANALYZE on tables of a database
+            read: Callable reading the statistics of tables of a database
+        """
+        self.refresh_interval = refresh_interval
+        self.analyze_threshold = analyze_threshold
+        self.max_values = max_values
+        self.store = store
+        self._activity = activity
+        self._analyze = analyze
+        self._read = read
+        self._entries: Dict[str, DatabaseStats] = {}
+        self._lock = threading.Lock()
+        self._database_locks: Dict[str, threading.Lock] = {}
+        # Monotonic time of the last refresh attempt per database
+        self._checked: Dict[str, float] = {}
+        self._pending: Set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="column-stats")
+
+    def peek(self, database: str) -> Optional[DatabaseStats]:
+        """
+        Statistics of a database without querying it (blocking; see apeek)
+
+        Falls back to the store when nothing is in memory. When a refresh is
+        due (or statistics were never checked in this process), one is
+        started in the background and the current statistics are returned
+        meanwhile.
+
+        Args:
+            database: Database name
+
+        Returns:
+            DatabaseStats, or None if the database was never analyzed
+        """
+        with self._lock:
+            entry = self._entries.get(database)
+        if entry is None and self.store is not None:
+            entry = self._load(database, self.store.get_column_stats(database))
+        return self._checked_entry(database, entry)
+
+    async def apeek(self, database: str) -> Optional[DatabaseStats]:
+        """peek for the event loop: a store read runs on a worker thread"""
+        with self._lock:
+            entry = self._entries.get(database)
+        if entry is None and self.store is not None:
+            entry = self._load(database, await asyncio.to_thread(self.store.get_column_stats, database))
+        return self._checked_entry(database, entry)
+
+    def refresh(self, database: str, force: bool = False) -> DatabaseStats:
+        """
+        Bring a database's statistics up to date (blocking)
+
+        Args:
+            database: Database name
+            force: Re-analyze and re-read every table
+
+        Returns:
+            The refreshed DatabaseStats
+        """
+        with self._database_lock(database):
+            with self._lock:
+                self._checked[database] = time.monotonic()
+                entry = self._entries.get(database)
+            known = {} if force else dict(entry.tables) if entry is not None else self._stored(database)
+
+            with timed("column_stats_refresh"):
+                activity = self._activity(database)
+                stale = [table for table, counters in activity.items() if force or self._needs_analyze(counters)]
+                self._analyze(database, stale)
+
+                changed = [
+                    table for table, counters in activity.items()
+                    if table in stale or table not in known or known[table]["analyzed_at"] != counters["analyzed_at"]
+                ]
+                fresh = self._read(database, changed, self.max_values)
+
+            removed = [table for table in known if table not in activity]
+            tables = {table: fresh.get(table, known.get(table)) for table in activity}
+            tables = {table: stats for table, stats in tables.items() if stats is not None}
+            if self.store is not None and (fresh or removed):
+                self.store.update_column_stats(database, fresh, removed)
+
+            entry = DatabaseStats(database, tables)
+            with self._lock:
+                self._entries[database] = entry
+            if stale or changed:
+                logger.info("Column statistics of '%s': analyzed %d, re-read %d table(s)", database, len(stale), len(changed))
+            return entry
+
+    def invalidate(self, database: str) -> None:
+        """Drop a database's statistics everywhere (e.g. after an upload replaced its data)"""
+        self.evict(database)
+        if self.store is not None:
+            self.store.delete_column_stats(database)
+
+    def evict(self, database: str) -> None:
+        """Free the in-memory copy of a database's statistics (the stored copy is kept)"""
+        with self._lock:
+            self._entries.pop(database, None)
+            self._checked.pop(database, None)
+
+    def shutdown(self) -> None:
+        """Stop starting background refreshes"""
+        self._executor.shutdown(wait=False)
+
+    def _load(self, database: str, tables: Dict[str, Dict[str, Any]]) -> Optional[DatabaseStats]:
+        if not tables:
+            return None
+        with self._lock:
+            return self._entries.setdefault(database, DatabaseStats(database, tables))
+
+    def _checked_entry(self, database: str, entry: Optional[DatabaseStats]) -> Optional[DatabaseStats]:
+        if self._refresh_due(database):
+            self._refresh_in_background(database)
+        return entry
+
+    def _needs_analyze(self, counters: Dict[str, Any]) -> bool:
+        if counters["analyzed_at"] is None:
+            return True
+        if counters["analyzed_age"] is not None and counters["analyzed_age"] < _ANALYZE_GRACE_SECONDS:
+            return False
+        limit = _ANALYZE_MIN_ROWS + self.analyze_threshold * max(counters["row_estimate"], 0)
+        return counters["modified"] > limit
+
+    def _stored(self, database: str) -> Dict[str, Dict[str, Any]]:
+        return self.store.get_column_stats(database) if self.store is not None else {}
+
+    def _refresh_due(self, database: str) -> bool:
+        if self.refresh_interval <= 0:
+            # Disabled: statistics only change when an import refreshes them
+            return False
+        with self._lock:
+            checked = self._checked.get(database)
+        if checked is None:
+            # Stored statistics may have been written long ago by another process
+            return True
+        return time.monotonic() - checked >= self.refresh_interval
+
+    def _refresh_in_background(self, database: str) -> None:
+        with self._lock:
+            if database in self._pending:
+                return
+            self._pending.add(database)
+
+        def run():
+            try:
+                self.refresh(database)
+            except Exception as e:
+                # Retried after a full interval (refresh() recorded the attempt)
+                logger.warning("Refreshing column statistics of '%s' failed: %s", database, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(database)
+
+        try:
+            self._executor.submit(run)
+        except RuntimeError:
+            # Shutting down
+            with self._lock:
+                self._pending.discard(database)
+
+    def _database_lock(self, database: str) -> threading.Lock:
+        with self._lock:
+            return self._database_locks.setdefault(database, threading.Lock())
+
+
+def _stats_store() -> Optional[TenantStore]:
+    """The tenant store when the statistics share its file, else a store of their own"""
+    path = settings.COLUMN_STATS_STORE_PATH
+    if not path:
+        return None
+    if tenant_store is not None and path == settings.TENANT_STORE_PATH:
+        return tenant_store
+    return TenantStore(path)
+
+
+column_stats = ColumnStatsCatalog(
+    refresh_interval=settings.COLUMN_STATS_REFRESH_INTERVAL,
+    analyze_threshold=settings.COLUMN_STATS_ANALYZE_THRESHOLD,
+    max_values=settings.COLUMN_STATS_MAX_VALUES,
+    store=_stats_store(),
+)
@@ -0,0 +1,379 @@
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.schema_catalog import CatalogEntry
+from app.services.schema_retrieval import stem
+from config import settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+_NAME_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_PLAIN_IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+
+# Words that never change which table or column a phrase refers to
+_FILLER = {"the", "a", "an", "all", "every", "each", "of", "our", "my"}
+
+# Phrase matched against a full name scores 1; a unique partial match scores less
+_EXACT_SCORE = 1.0
+_PARTIAL_SCORE = 0.6
+
+_NUMERIC_TYPES = ("smallint", "integer", "bigint", "real", "double precision", "numeric", "decimal", "money")
+
+_AGGREGATES = {
+    "average": "AVG", "avg": "AVG", "mean": "AVG",
+    "total": "SUM", "sum": "SUM", "sum of": "SUM",
+    "maximum": "MAX", "max": "MAX", "highest": "MAX", "largest": "MAX",
+    "minimum": "MIN", "min": "MIN", "lowest": "MIN", "smallest": "MIN",
+}
+
+# Words before "<n> <table> by <column>" and the order they ask for
+_ASCENDING_DIRECTIONS = ("bottom", "first", "earliest", "oldest", "lowest", "smallest")
+_DESCENDING_DIRECTIONS = ("top", "last", "latest", "newest", "highest", "largest")
+
+_VERB = r"(?:(?:please |can you |could you )?(?:show|list|get|give|display|fetch|return|find|select)(?: me)? )"
+_GROUP = r"(?: (?:by|per|for each|grouped by|in each|across) (?P<group>[a-z0-9_ ]+?))?"
+
+# Question shapes, tried in order against the normalized question
+_RULES = [
+    ("count", re.compile(
+        r"^(?:" + _VERB + r"?(?:the )?(?:total )?(?:number of|count of) |how many |count (?:the )?(?:number of )?|"
+        r"number of )(?P<table>[a-z0-9_ ]+?)(?: are there| do we have| there are| exist| in total)?" + _GROUP + r"$"
+    )),
+    ("aggregate", re.compile(
+        r"^(?:what is |what's |what are )?" + _VERB + r"?(?:the )?(?P<agg>" + "|".join(
+            sorted(_AGGREGATES, key=len, reverse=True)
+        ) + r") (?P<column>[a-z0-9_ ]+?)(?: (?:of|in|for|across|from|among) (?:all )?(?:the )?(?P<table>[a-z0-9_ ]+?))?"
+        + _GROUP + r"$"
+    )),
+    ("top", re.compile(
+        r"^" + _VERB + r"?(?:the )?(?P<direction>" + "|".join(
+            _ASCENDING_DIRECTIONS + _DESCENDING_DIRECTIONS
+        ) + r")? ?(?P<limit>\d+) (?P<table>[a-z0-9_ ]+?) "
+        r"(?:by|ordered by|sorted by|with the (?P<superlative>highest|most|largest|lowest|least|smallest)) "
+        r"(?P<column>[a-z0-9_ ]+?)(?: (?P<order>asc|ascending|desc|descending))?$"
+    )),
+    ("sorted", re.compile(
+        r"^" + _VERB + r"?(?:all )?(?:the )?(?P<table>[a-z0-9_ ]+?) (?:ordered|sorted) by (?P<column>[a-z0-9_ ]+?)"
+        r"(?: (?P<order>asc|ascending|desc|descending))?$"
+    )),
+    ("list", re.compile(
+        r"^" + _VERB + r"(?:all |every )?(?:the )?(?P<table>[a-z0-9_ ]+?)(?: records| rows| entries)?$"
+    )),
+]
+
+
+class FastPathMatch(NamedTuple):
+    """SQL produced locally for a question, with how sure the matcher is"""
+    sql: str
+    confidence: float
+    rule: str
+
+
+def quote_identifier(name: str) -> str:
+    """Quote an identifier unless it is a plain lowercase name"""
+    if _PLAIN_IDENTIFIER.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _name_tokens(name: str) -> List[str]:
+    parts = []
+    for part in re.split(r"[_\W]+", name):
+        parts.extend(_NAME_PART.findall(part) or [part])
+    return [stem(part.lower()) for part in parts if part]
+
+
+def _phrase_tokens(phrase: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(phrase) if word not in _FILLER]
+
+
+def _resolve(phrase_tokens: List[str], candidates: Dict[Any, List[str]]) -> Tuple[Optional[Any], float]:
+    """Best unambiguous candidate for a phrase and its score"""
+    if not phrase_tokens:
+        return None, 0.0
+    joined = "".join(phrase_tokens)
+    scored = []
+    for candidate, tokens in candidates.items():
+        if tokens == phrase_tokens or "".join(tokens) == joined:
+            scored.append((_EXACT_SCORE, candidate))
+        elif set(phrase_tokens) <= set(tokens):
+            scored.append((_PARTIAL_SCORE, candidate))
+    if not scored:
+        return None, 0.0
+    scored.sort(key=lambda item: item[0], reverse=True)
+    if len(scored) > 1 and scored[1][0] == scored[0][0]:
+        return None, 0.0
+    return scored[0][1], scored[0][0]
+
+
+class FastPathMatcher:
+    """Answers simple question shapes from the schema without calling the LLM"""
+
+    def __init__(self, tables: List[Dict[str, Any]]):
+        """
+        Build the matcher
+
+        Args:
+            tables: Output of introspect_tables
+        """
+        self.tables = {table["name"]: table for table in tables}
+        self._table_tokens = {name: _name_tokens(name) for name in self.tables}
+        self._column_tokens = {
+            name: {column["name"]: _name_tokens(column["name"]) for column in table["columns"]}
+            for name, table in self.tables.items()
+        }
+
+    def match(self, question: str) -> Optional[FastPathMatch]:
+        """
+        SQL for a question if it has a recognised shape
+
+        Args:
+            question: Natural language question
+
+        Returns:
+            FastPathMatch, or None when no rule applies or a name cannot be
+            resolved unambiguously
+        """
+        normalized = " ".join(_WORD.findall(question.lower().replace("'s ", " ")))
+        for rule, pattern in _RULES:
+            found = pattern.match(normalized)
+            if found is None:
+                continue
+            result = getattr(self, "_" + rule)(found)
+            if result is not None:
+                sql, confidence = result
+                return FastPathMatch(sql, confidence, rule)
+        return None
+
+    def _table(self, phrase: Optional[str]) -> Tuple[Optional[str], float]:
+        if not phrase:
+            return None, 0.0
+        return _resolve(_phrase_tokens(phrase), self._table_tokens)
+
+    def _column(self, table: str, phrase: Optional[str]) -> Tuple[Optional[str], float]:
+        if not phrase:
+            return None, 0.0
+        return _resolve(_phrase_tokens(phrase), self._column_tokens[table])
+
+    def _column_anywhere(self, phrase: str) -> Tuple[Optional[Tuple[str, str]], float]:
+        candidates = {
+            (table, column): tokens
+            for table, columns in self._column_tokens.items()
+            for column, tokens in columns.items()
+        }
+        return _resolve(_phrase_tokens(phrase), candidates)
+
+    def _grouping(self, table: str, phrase: Optional[str]) -> Optional[Tuple[str, str, str, float]]:
+        """
+        Resolve a "by <phrase>" clause
+
+        Returns:
+            (select expression, FROM clause, GROUP BY expression, score), or None
+        """
+        source = quote_identifier(table)
+        column, column_score = self._column(table, phrase)
+        if column is not None and column_score == _EXACT_SCORE:
+            expression = quote_identifier(column)
+            return expression, source, expression, column_score
+
+        # "products by category": group on a table referenced by a foreign key
+        referenced, score = self._table(phrase)
+        for fk in self.tables[table]["foreign_keys"] if referenced is not None else ():
+            if fk["references_table"] != referenced or len(fk["columns"]) != 1:
+                continue
+            label = self._label_column(referenced) or fk["references_columns"][0]
+            expression = f"r.{quote_identifier(label)}"
+            join = (
+                f"{source} t JOIN {quote_identifier(referenced)} r "
+                f"ON t.{quote_identifier(fk['columns'][0])} = r.{quote_identifier(fk['references_columns'][0])}"
+            )
+            return expression, join, expression, score
+
+        if column is not None:
+            expression = quote_identifier(column)
+            return expression, source, expression, column_score
+        return None
+
+    def _label_column(self, table: str) -> Optional[str]:
+        """Column that names a row (e.g. category_name), if the table has one"""
+        for column in self.tables[table]["columns"]:
+            if "name" in self._column_tokens[table][column["name"]]:
+                return column["name"]
+        return None
+
+    def _column_type(self, table: str, column: str) -> str:
+        for candidate in self.tables[table]["columns"]:
+            if candidate["name"] == column:
+                return candidate["type"]
+        return ""
+
+    def _list(self, found) -> Optional[Tuple[str, float]]:
+        table, score = self._table(found.group("table"))
+        if table is None:
+            return None
+        return f"SELECT * FROM {quote_identifier(table)}", score
+
+    def _sorted(self, found) -> Optional[Tuple[str, float]]:
+        table, table_score = self._table(found.group("table"))
+        if table is None:
+            return None
+        column, column_score = self._column(table, found.group("column"))
+        if column is None:
+            return None
+        descending = (found.group("order") or "").startswith("desc")
+        order = "DESC NULLS LAST" if descending else "ASC"
+        sql = f"SELECT * FROM {quote_identifier(table)} ORDER BY {quote_identifier(column)} {order}"
+        return sql, min(table_score, column_score)
+
+    def _top(self, found) -> Optional[Tuple[str, float]]:
+        table, table_score = self._table(found.group("table"))
+        if table is None:
+            return None
+        column, column_score = self._column(table, found.group("column"))
+        if column is None:
+            return None
+
+        # An explicit order wins; "5 orders by date" says neither way, so it
+        # is only a guess and stays below the usual confidence bar
+        direction_score = _EXACT_SCORE
+        if found.group("order"):
+            descending = found.group("order").startswith("desc")
+        elif found.group("superlative"):
+            descending = found.group("superlative") in ("highest", "most", "largest")
+        elif found.group("direction"):
+            descending = found.group("direction") in _DESCENDING_DIRECTIONS
+        else:
+            descending, direction_score = True, _PARTIAL_SCORE
+        order = "DESC NULLS LAST" if descending else "ASC"
+        sql = (
+            f"SELECT * FROM {quote_identifier(table)} "
+            f"ORDER BY {quote_identifier(column)} {order} LIMIT {int(found.group('limit'))}"
+        )
+        return sql, min(table_score, column_score, direction_score)
+
+    def _count(self, found) -> Optional[Tuple[str, float]]:
+        table, table_score = self._table(found.group("table"))
+        if table is None:
+            return None
+        if not found.group("group"):
+            return f"SELECT COUNT(*) AS count FROM {quote_identifier(table)}", table_score
+
+        grouping = self._grouping(table, found.group("group"))
+        if grouping is None:
+            return None
+        expression, source, group_by, group_score = grouping
+        sql = (
+            f"SELECT {expression}, COUNT(*) AS count FROM {source} "
+            f"GROUP BY {group_by} ORDER BY count DESC"
+        )
+        return sql, min(table_score, group_score)
+
+    def _aggregate(self, found) -> Optional[Tuple[str, float]]:
+        function = _AGGREGATES[found.group("agg")]
+        if found.group("table"):
+            table, table_score = self._table(found.group("table"))
+            if table is None:
+                return None
+            column, column_score = self._column(table, found.group("column"))
+        else:
+            # No table named: the column must identify one on its own
+            resolved, column_score = self._column_anywhere(found.group("column"))
+            if resolved is None:
+                return None
+            (table, column), table_score = resolved, column_score
+        if column is None:
+            return None
+        if function in ("AVG", "SUM") and not self._column_type(table, column).startswith(_NUMERIC_TYPES):
+            return None
+
+        alias = f"{function.lower()}_{column.lower()}"
+        if not found.group("group"):
+            sql = f"SELECT {function}({quote_identifier(column)}) AS {quote_identifier(alias)} FROM {quote_identifier(table)}"
+            return sql, min(table_score, column_score)
+
+        grouping = self._grouping(table, found.group("group"))
+        if grouping is None:
+            return None
+        expression, source, group_by, group_score = grouping
+        qualified = f"t.{quote_identifier(column)}" if source != quote_identifier(table) else quote_identifier(column)
+        sql = (
+            f"SELECT {expression}, {function}({qualified}) AS {quote_identifier(alias)} FROM {source} "
+            f"GROUP BY {group_by} ORDER BY {quote_identifier(alias)} DESC NULLS LAST"
+        )
+        return sql, min(table_score, column_score, group_score)
+
+
+class FastPath:
+    """Holds a FastPathMatcher per database and counts how often it answers"""
+
+    def __init__(self, min_confidence: float = 0.9):
+        """
+        Initialize the fast path
+
+        Args:
+            min_confidence: Confidence a match needs to be used instead of the LLM
+        """
+        self.min_confidence = min_confidence
+        self._matchers: Dict[str, Tuple[str, FastPathMatcher]] = {}
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._low_confidence = 0
+        self._fallbacks = 0
+
+    def for_entry(self, entry: CatalogEntry) -> FastPathMatcher:
+        """Matcher for a catalog entry, rebuilt when the schema hash changes"""
+        with self._lock:
+            cached = self._matchers.get(entry.database)
+        if cached is not None and cached[0] == entry.content_hash:
+            return cached[1]
+
+        matcher = FastPathMatcher(entry.tables)
+        with self._lock:
+            self._matchers[entry.database] = (entry.content_hash, matcher)
+        return matcher
+
+    def lookup(self, entry: CatalogEntry, question: str) -> Optional[FastPathMatch]:
+        """
+        Match a question, counting the outcome
+
+        Returns:
+            The match, even below min_confidence (callers decide; see confident)
+        """
+        match = self.for_entry(entry).match(question)
+        with self._lock:
+            self._lookups += 1
+            if match is not None:
+                if self.confident(match):
+                    self._hits += 1
+                else:
+                    self._low_confidence += 1
+        return match
+
+    def confident(self, match: Optional[FastPathMatch]) -> bool:
+        """Whether a match is good enough to skip the LLM"""
+        return match is not None and match.confidence >= self.min_confidence
+
+    def record_fallback(self) -> None:
+        """Count a low-confidence match used because the LLM call failed"""
+        with self._lock:
+            self._fallbacks += 1
+
+    def invalidate(self, database: str) -> None:
+        """Forget the matcher for a database"""
+        with self._lock:
+            self._matchers.pop(database, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups, confident hits, low-confidence matches, LLM-failure fallbacks and hit rate"""
+        with self._lock:
+            return {
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "low_confidence": self._low_confidence,
+                "fallbacks": self._fallbacks,
+                "hit_rate": self._hits / self._lookups if self._lookups else 0.0,
+            }
+
+
+fast_path = FastPath(min_confidence=settings.FAST_PATH_MIN_CONFIDENCE)
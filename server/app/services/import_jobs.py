@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class ImportQueueFullError(Exception):
+    """Raised when too many imports are already waiting"""
+
+
+class ImportJob:
+    """State and progress of one schema import"""
+
+    def __init__(self, database: str, filename: str, path: str, tenant_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.database = database
+        # Only this tenant may see the job
+        self.tenant_id = tenant_id
+        self.filename = filename
+        self.path = path
+        self.status = QUEUED
+        self.statements_executed = 0
+        self.bytes_processed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly snapshot for the /jobs endpoint"""
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "database": self.database,
+            "filename": self.filename,
+            "status": self.status,
+            "statements_executed": self.statements_executed,
+            "bytes_processed": self.bytes_processed,
+            "elapsed_seconds": round(elapsed, 3),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class ImportJobManager:
+    """Runs schema imports on a bounded worker pool and tracks their progress"""
+
+    def __init__(
+        self,
+        load: Callable[..., Dict[str, Any]],
+        max_workers: int = 2,
+        max_queued: int = 16,
+        jobs_retained: int = 200,
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            load: Blocking callable (database, fileobj, filename, progress=...) doing the import
+            max_workers: Imports running at the same time
+            max_queued: Imports allowed to wait for a worker
+            jobs_retained: Finished jobs kept for status queries
+        """
+        self._load = load
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import-worker")
+        self.max_queued = max_queued
+        self.jobs_retained = jobs_retained
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        database: str,
+        path: str,
+        filename: str,
+        on_finish: Optional[Callable[[ImportJob], None]] = None,
+        tenant_id: Optional[str] = None,
+    ) -> ImportJob:
+        """
+        Queue an import of a spooled upload
+
+        The file at path is deleted once the job finishes.
+
+        Args:
+            database: Target database
+            path: Temporary file holding the upload
+            filename: Original file name (selects decompression)
+            on_finish: Optional callback run in the worker once the import ends
+                (job.error is None on success), before the job is marked finished
+            tenant_id: Tenant that started the import
+
+        Returns:
+            The queued ImportJob
+
+        Raises:
+            ImportQueueFullError: If max_queued jobs are already waiting
+        """
+        job = ImportJob(database, filename, path, tenant_id)
+        with self._lock:
+            queued = sum(1 for existing in self._jobs.values() if existing.status == QUEUED)
+            if queued >= self.max_queued:
+                raise ImportQueueFullError("Too many imports are queued; try again later.")
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, on_finish)
+        return job
+
+    def get(self, job_id: str, tenant_id: Optional[str] = None) -> Optional[ImportJob]:
+        """Job by id, if it is still retained (and, given a tenant, was started by it)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (tenant_id is not None and job.tenant_id != tenant_id):
+            return None
+        return job
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs; running imports are left to finish"""
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job: ImportJob, on_finish: Optional[Callable[[ImportJob], None]]) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def progress(statements: int, bytes_processed: int) -> None:
+            job.statements_executed = statements
+            job.bytes_processed = bytes_processed
+
+        try:
+            with open(job.path, "rb") as fileobj:
+                result = self._load(job.database, fileobj, job.filename, progress=progress)
+            job.statements_executed = result["statements_executed"]
+            job.bytes_processed = result["bytes_processed"]
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+        # Post-processing (cache invalidation, database swap) happens before the
+        # job reports completion, so pollers never observe a half-applied import
+        if on_finish is not None:
+            try:
+                on_finish(job)
+            except Exception as e:
+                logger.warning("Import job %s post-processing failed: %s", job.id, e)
+
+        job.finished_at = time.time()
+        job.status = FAILED if job.error else SUCCEEDED
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.jobs_retained)]:
+            del self._jobs[job_id]
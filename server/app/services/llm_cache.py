@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip(" ?.!;")
+
+
+def schema_fingerprint(schema: str) -> str:
+    """Stable content hash of a schema description"""
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache of generated SQL: in-memory LRU plus optional SQLite file
+
+    The SQLite tier is only touched from its own thread: writes are queued
+    there (the memory tier already has the entry), and async callers use
+    aget() so a disk lookup never runs on the event loop.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400.0, db_path: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum entries kept in memory (least recently used evicted first)
+            ttl_seconds: Seconds an entry stays valid in either tier
+            db_path: SQLite file for the persistent tier (disabled when empty)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+        self._disk = None
+        self._disk_executor = None
+        if db_path:
+            self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+            self._disk = sqlite3.connect(db_path, check_same_thread=False)
+            self._disk.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    database TEXT,
+                    sql TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS llm_cache_database ON llm_cache (database)")
+            self._disk.commit()
+
+    @staticmethod
+    def make_key(question: str, schema: str, model: str) -> str:
+        """Cache key from the normalized question, schema fingerprint and model"""
+        raw = "\0".join([normalize_question(question), schema_fingerprint(schema), model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, schema: str, model: str) -> Optional[str]:
+        """
+        Look up generated SQL
+
+        Args:
+            question: Natural language question
+            schema: Schema the SQL was generated against
+            model: Model name
+
+        Returns:
+            Cached SQL, or None on a miss
+        """
+        key = self.make_key(question, schema, model)
+        sql = self._get_memory(key)
+        if sql is not None or self._disk is None:
+            return sql
+        return self._disk_executor.submit(self._get_disk, key).result()
+
+    async def aget(self, question: str, schema: str, model: str) -> Optional[str]:
+        """Async variant of get(); a disk lookup runs on the cache's own thread"""
+        key = self.make_key(question, schema, model)
+        sql = self._get_memory(key)
+        if sql is not None or self._disk is None:
+            return sql
+        return await asyncio.wrap_future(self._disk_executor.submit(self._get_disk, key))
+
+    def set(self, question: str, schema: str, model: str, sql: str, database: Optional[str] = None) -> None:
+        """
+        Store generated SQL
+
+        Args:
+            question: Natural language question
+            schema: Schema the SQL was generated against
+            model: Model name
+            sql: Generated SQL
+            database: Database the schema belongs to (used for invalidation)
+        """
+        key = self.make_key(question, schema, model)
+        expires_at = time.time() + self.ttl_seconds
+
+        with self._lock:
+            self._remember(key, sql, database, expires_at)
+        if self._disk is not None:
+            # Written behind: readers find the entry in memory meanwhile
+            self._disk_executor.submit(
+                self._write_disk,
+                "INSERT OR REPLACE INTO llm_cache (key, database, sql, expires_at) VALUES (?, ?, ?, ?)",
+                (key, database, sql, expires_at),
+            )
+
+    def delete(self, question: str, schema: str, model: str) -> None:
+        """
+        Drop the entry for a question (e.g. its SQL failed to plan and could not be repaired)
+
+        Args:
+            question: Natural language question
+            schema: Schema the SQL was generated against
+            model: Model name
+        """
+        key = self.make_key(question, schema, model)
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._disk is not None:
+            # Written behind, after any pending write of the same entry
+            self._disk_executor.submit(self._write_disk, "DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def invalidate_database(self, database: str) -> int:
+        """
+        Drop every entry generated for a database
+
+        Args:
+            database: Database name
+
+        Returns:
+            Number of in-memory entries removed
+        """
+        removed = self.evict_database(database)
+        if self._disk is not None:
+            # Queued behind pending writes, so none of them can resurrect an entry
+            self._disk_executor.submit(
+                self._write_disk, "DELETE FROM llm_cache WHERE database = ?", (database,)
+            ).result()
+        return removed
+
+    def evict_database(self, database: str) -> int:
+        """Drop a database's in-memory entries (the disk tier, shared by workers, is kept)"""
+        with self._lock:
+            stale = [key for key, (_, db, _) in self._memory.items() if db == database]
+            for key in stale:
+                del self._memory[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry in both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk_executor.submit(self._write_disk, "DELETE FROM llm_cache", ()).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "disk_hits": self._disk_hits,
+                "entries": len(self._memory),
+            }
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                sql, _, expires_at = entry
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return sql
+                del self._memory[key]
+            if self._disk is None:
+                self._misses += 1
+            return None
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        # Runs on the disk thread
+        row = self._disk.execute(
+            "SELECT sql, database, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        with self._lock:
+            if row is not None and row[2] > time.time():
+                self._remember(key, row[0], row[1], row[2])
+                self._hits += 1
+                self._disk_hits += 1
+                return row[0]
+            self._misses += 1
+            return None
+
+    def _write_disk(self, statement: str, params: tuple) -> None:
+        # Runs on the disk thread
+        try:
+            self._disk.execute(statement, params)
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def _remember(self, key: str, sql: str, database: Optional[str], expires_at: float) -> None:
+        self._memory[key] = (sql, database, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -1,19 +1,191 @@
+import asyncio
+import logging
 import openai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 import os
+import random
+import time
 from dotenv import load_dotenv
 
+from app.db.connection import get_connection
+from app.db.executor import fetch_all, resolve_statement_timeout
+from app.db.query_guard import query_guard
+from app.services.llm_cache import LLMCache, normalize_question
+from app.services.similarity_cache import SimilarityCache
+from app.utils.metrics import FALLBACKS, LLM_TOKENS, observe_stage, timed
+from app.utils.rate_limit import AsyncRateLimiter
+from app.utils.utils import validate_sql_safety
+from config import settings
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Returned when generation fails; never cached
+FALLBACK_SQL = "SELECT * FROM products LIMIT 10"
+
+# Shared cache for every client created through get_openai_client
+llm_cache = LLMCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL,
+    db_path=settings.LLM_CACHE_PATH or None
+)
+
+similarity_cache = SimilarityCache(
+    threshold=settings.SIMILARITY_CACHE_THRESHOLD,
+    dims=settings.SIMILARITY_CACHE_DIMS,
+    max_entries=settings.SIMILARITY_CACHE_MAX_ENTRIES,
+    max_schemas=settings.SIMILARITY_CACHE_MAX_SCHEMAS
+) if settings.SIMILARITY_CACHE_ENABLED else None
+
+# Shared by every async completion request so batches cannot exceed the quota
+llm_rate_limiter = AsyncRateLimiter(
+    rate=settings.OPENAI_RATE_LIMIT_PER_SECOND,
+    burst=settings.OPENAI_RATE_LIMIT_BURST
+)
+
+_client: Optional["OpenAIClient"] = None
+
+# Failures worth retrying: rate limiting, server errors and transient network issues
+_RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, _RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, "http_status", None)
+    return status is not None and (status == 429 or status >= 500)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Exponential backoff with jitter, or the server's Retry-After if it sent one"""
+    headers = getattr(error, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None:
+        return min(retry_after, settings.OPENAI_RETRY_MAX_DELAY)
+    delay = settings.OPENAI_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay, settings.OPENAI_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+def _record_usage(response) -> None:
+    """Record prompt and completion token counts reported with a response"""
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = usage.get(kind)
+        if count is not None:
+            LLM_TOKENS.observe(count, kind=kind.split("_")[0])
+
+# Characters that may belong to a closing markdown fence at the end of a response
+_FENCE_TAIL_CHARS = "` \t\r\n"
+
+# Info strings a model puts after an opening fence
+_FENCE_LANGUAGES = {"sql", "postgresql", "postgres", "pgsql", "psql", "plpgsql"}
+
+def _after_opening_fence(line: str) -> str:
+    """
+    SQL on the line of an opening fence (the text after ``` and its info string)
+    
+    Args:
+        line: Text following the ``` on the fence's line
+        
+    Returns:
+        The SQL part of the line; empty when the line is only an info string
+    """
+    words = line.strip().split(None, 1)
+    if not words:
+        return ""
+    if words[0].lower() in _FENCE_LANGUAGES:
+        return words[1] if len(words) > 1 else ""
+    # A lone word is an info string ("```mysql"); anything longer is SQL ("```SELECT 1")
+    return line.strip() if len(words) > 1 else ""
+
+class FenceStripper:
+    """Removes markdown code fences from a model response as it streams in"""
+    
+    def __init__(self):
+        self._head = ""
+        self._tail = ""
+        self._started = False
+    
+    def feed(self, text: str) -> str:
+        """
+        Add a chunk of the response
+        
+        Args:
+            text: Next piece of the response
+            
+        Returns:
+            Text that is known to be SQL (possibly empty); anything that could
+            still turn out to be a fence is held back
+        """
+        if not self._started:
+            self._head += text
+            head = self._head.lstrip()
+            if head.startswith("```"):
+                newline = head.find("\n")
+                if newline == -1:
+                    return ""
+                first_line = _after_opening_fence(head[3:newline])
+                text = (first_line + "\n" if first_line else "") + head[newline + 1:]
+            elif not head or "```".startswith(head):
+                return ""
+            else:
+                text = head
+            self._started = True
+            self._head = ""
+        
+        text = self._tail + text
+        keep = len(text.rstrip(_FENCE_TAIL_CHARS))
+        self._tail = text[keep:]
+        return text[:keep]
+    
+    def finish(self) -> str:
+        """
+        End of the response
+        
+        Returns:
+            Remaining SQL text, without the closing fence and trailing whitespace
+        """
+        if not self._started:
+            # One-line response, possibly fenced on that line ("```sql SELECT 1```")
+            head = self._head.strip()
+            self._head = ""
+            if not head.startswith("```"):
+                return "" if "```".startswith(head) else head
+            body = head[3:]
+            if body.endswith("```"):
+                body = body[:-3]
+            return _after_opening_fence(body).rstrip()
+        tail = self._tail.rstrip()
+        if tail.endswith("```"):
+            tail = tail[:-3]
+        self._tail = ""
+        return tail.rstrip()
+
 class OpenAIClient:
     """OpenAI client for SQL query generation and processing"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[LLMCache] = None,
+        similarity_cache: Optional[SimilarityCache] = None
+    ):
         """
         Initialize OpenAI client
         
         Args:
             api_key: OpenAI API key (optional, can use environment variable)
+            cache: Optional cache of previously generated SQL (exact question match)
+            similarity_cache: Optional cache reusing SQL for reworded questions
         """
         api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -21,20 +193,326 @@ class OpenAIClient:
         
         openai.api_key = api_key
         self.model = "gpt-3.5-turbo"  # Default model
+        self.cache = cache
+        self.similarity_cache = similarity_cache
     
-    def generate_sql_query(self, user_question: str, schema: str) -> str:
+    def generate_sql_query(self, user_question: str, schema: str, database: Optional[str] = None) -> str:
         """
         Generate SQL query from natural language question
         
         Args:
             user_question: Natural language question from user
             schema: Database schema string
+            database: Database the schema belongs to (used to scope cache entries)
+            
+        Returns:
+            Generated SQL query as string
+        """
+        cached = self._lookup_cached_sql(user_question, schema)
+        if cached is not None:
+            return cached
+        
+        try:
+            with timed("llm"):
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=self._build_messages(user_question, schema),
+                    max_tokens=200,
+                    temperature=0.1,
+                    request_timeout=settings.OPENAI_REQUEST_TIMEOUT
+                )
+            _record_usage(response)
+            
+            sql_query = self._clean_sql_response(response.choices[0].message.content)
+            
+        except Exception as e:
+            logger.warning("Error generating SQL query: %s", e)
+            # Fallback to a simple query
+            FALLBACKS.inc(kind="fallback_sql")
+            return FALLBACK_SQL
+        
+        self._remember_sql(user_question, schema, sql_query, database)
+        return sql_query
+    
+    async def agenerate_sql_query(self, user_question: str, schema: str, database: Optional[str] = None) -> str:
+        """
+        Async variant of generate_sql_query that does not block the event loop
+        
+        Args:
+            user_question: Natural language question from user
+            schema: Database schema string
+            database: Database the schema belongs to (used to scope cache entries)
             
         Returns:
             Generated SQL query as string
         """
         try:
-            prompt = f"""
+            return await self.agenerate_sql_query_strict(user_question, schema, database=database)
+        except Exception as e:
+            logger.warning("Error generating SQL query: %s", e)
+            # Fallback to a simple query
+            FALLBACKS.inc(kind="fallback_sql")
+            return FALLBACK_SQL
+    
+    async def agenerate_sql_query_strict(
+        self,
+        user_question: str,
+        schema: str,
+        database: Optional[str] = None,
+        concurrency: Optional[asyncio.Semaphore] = None
+    ) -> str:
+        """
+        Generate SQL asynchronously, raising on failure instead of falling back
+        
+        Rate-limited (429) and server-side (5xx) failures are retried with
+        exponential backoff before giving up.
+        
+        Args:
+            user_question: Natural language question from user
+            schema: Database schema string
+            database: Database the schema belongs to (used to scope cache entries)
+            concurrency: Optional semaphore bounding completion requests in flight
+            
+        Returns:
+            Generated SQL query as string
+            
+        Raises:
+            openai.error.OpenAIError: If the request still fails after retries
+        """
+        cached = await self._alookup_cached_sql(user_question, schema)
+        if cached is not None:
+            return cached
+        
+        with timed("prompt_construction"):
+            messages = self._build_messages(user_question, schema)
+        if concurrency is None:
+            response = await self._acreate_with_retry(messages)
+        else:
+            async with concurrency:
+                response = await self._acreate_with_retry(messages)
+        
+        sql_query = self._clean_sql_response(response.choices[0].message.content)
+        self._remember_sql(user_question, schema, sql_query, database)
+        return sql_query
+    
+    async def arepair_sql_query(
+        self,
+        user_question: str,
+        schema: str,
+        sql_query: str,
+        error: str,
+        database: Optional[str] = None
+    ) -> str:
+        """
+        Ask the model to fix a query that failed to validate or plan
+        
+        The repaired query replaces the broken one in the caches, including
+        similarity cache entries of other questions that were served it.
+        
+        Args:
+            user_question: Natural language question the query answers
+            schema: Database schema string used for generation
+            sql_query: Query that failed
+            error: Database or validation error it produced
+            database: Database the schema belongs to (used to scope cache entries)
+            
+        Returns:
+            Repaired SQL query as string
+            
+        Raises:
+            openai.error.OpenAIError: If the request still fails after retries
+        """
+        response = await self._acreate_with_retry(
+            self._build_repair_messages(user_question, schema, sql_query, error)
+        )
+        repaired = self._clean_sql_response(response.choices[0].message.content)
+        if self.similarity_cache is not None:
+            self.similarity_cache.discard(schema, sql_query)
+        self._remember_sql(user_question, schema, repaired, database)
+        return repaired
+    
+    async def agenerate_sql_batch(
+        self,
+        items: List[Tuple[str, str]],
+        database: Optional[str] = None,
+        concurrency: int = settings.BATCH_CONCURRENCY
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Generate SQL for many questions with at most `concurrency` requests in flight
+        
+        Repeated questions in the batch share one generation.
+        
+        Args:
+            items: (question, schema) pairs
+            database: Database the schemas belong to (used to scope cache entries)
+            concurrency: Completion requests allowed in flight at once
+            
+        Returns:
+            (sql_query, error) per item, in input order; exactly one is None
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        tasks: Dict[Tuple[str, str], asyncio.Future] = {}
+        for question, schema in items:
+            key = (normalize_question(question), schema)
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(
+                    self.agenerate_sql_query_strict(question, schema, database=database, concurrency=semaphore)
+                )
+        
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        results = []
+        for question, schema in items:
+            task = tasks[(normalize_question(question), schema)]
+            error = task.exception()
+            results.append((None, str(error) or type(error).__name__) if error else (task.result(), None))
+        return results
+    
+    async def _acreate_with_retry(self, messages: List[Dict[str, str]]):
+        """Chat completion request that retries 429/5xx responses with backoff"""
+        attempt = 0
+        while True:
+            await llm_rate_limiter.acquire()
+            try:
+                with timed("llm"):
+                    response = await openai.ChatCompletion.acreate(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=200,
+                        temperature=0.1,
+                        request_timeout=settings.OPENAI_REQUEST_TIMEOUT
+                    )
+                _record_usage(response)
+                return response
+            except Exception as e:
+                if attempt >= settings.OPENAI_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                logger.info("OpenAI request failed (%s); retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+    
+    async def astream_sql_query(
+        self,
+        user_question: str,
+        schema: str,
+        database: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        """
+        Generate SQL with the chat API's streaming mode
+        
+        Partial SQL is yielded as the model produces it, with markdown fences
+        removed on the fly. A cached answer is yielded as a single token.
+        
+        Args:
+            user_question: Natural language question from user
+            schema: Database schema string
+            database: Database the schema belongs to (used to scope cache entries)
+            
+        Yields:
+            {"type": "token", "text": str} for each piece of SQL, then
+            {"type": "sql", "sql_query": str} with the complete query
+            
+        Raises:
+            Exception: If the completion request fails (no fallback query is used)
+        """
+        cached = await self._alookup_cached_sql(user_question, schema)
+        if cached is not None:
+            yield {"type": "token", "text": cached}
+            yield {"type": "sql", "sql_query": cached}
+            return
+        
+        with timed("prompt_construction"):
+            messages = self._build_messages(user_question, schema)
+        await llm_rate_limiter.acquire()
+        started = time.perf_counter()
+        response = await openai.ChatCompletion.acreate(
+            model=self.model,
+            messages=messages,
+            max_tokens=200,
+            temperature=0.1,
+            request_timeout=settings.OPENAI_REQUEST_TIMEOUT,
+            stream=True
+        )
+        
+        stripper = FenceStripper()
+        parts = []
+        first_chunk = True
+        async for chunk in response:
+            if first_chunk:
+                observe_stage("llm_first_token", time.perf_counter() - started)
+                first_chunk = False
+            text = stripper.feed(chunk.choices[0].delta.get("content") or "")
+            if text:
+                parts.append(text)
+                yield {"type": "token", "text": text}
+        
+        text = stripper.finish()
+        if text:
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        
+        observe_stage("llm", time.perf_counter() - started)
+        
+        sql_query = "".join(parts).strip()
+        self._remember_sql(user_question, schema, sql_query, database)
+        yield {"type": "sql", "sql_query": sql_query}
+    
+    def _lookup_cached_sql(self, user_question: str, schema: str) -> Optional[str]:
+        """Check the exact cache, then the similarity cache"""
+        if self.cache is not None:
+            cached = self.cache.get(user_question, schema, self.model)
+            if cached is not None:
+                return cached
+        
+        if self.similarity_cache is not None:
+            match = self.similarity_cache.lookup(user_question, schema)
+            if match is not None:
+                return match[0]
+        
+        return None
+    
+    async def _alookup_cached_sql(self, user_question: str, schema: str) -> Optional[str]:
+        """_lookup_cached_sql for async callers: the exact cache's disk tier is read off the event loop"""
+        if self.cache is not None:
+            cached = await self.cache.aget(user_question, schema, self.model)
+            if cached is not None:
+                return cached
+        
+        if self.similarity_cache is not None:
+            match = self.similarity_cache.lookup(user_question, schema)
+            if match is not None:
+                return match[0]
+        
+        return None
+    
+    def _remember_sql(self, user_question: str, schema: str, sql_query: str, database: Optional[str]) -> None:
+        """Store freshly generated SQL in every configured cache (empty SQL never is)"""
+        if not sql_query or not sql_query.strip():
+            return
+        if self.cache is not None:
+            self.cache.set(user_question, schema, self.model, sql_query, database=database)
+        if self.similarity_cache is not None:
+            self.similarity_cache.add(user_question, schema, sql_query, database=database)
+    
+    def forget_sql(self, user_question: str, schema: str, sql_query: str) -> None:
+        """
+        Drop SQL that failed to plan from every configured cache
+        
+        Args:
+            user_question: Question the SQL was generated (or served) for
+            schema: Schema text used for generation
+            sql_query: The failing SQL
+        """
+        if self.cache is not None:
+            self.cache.delete(user_question, schema, self.model)
+        if self.similarity_cache is not None:
+            self.similarity_cache.discard(schema, sql_query)
+    
+    @staticmethod
+    def _build_messages(user_question: str, schema: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a question against a schema"""
+        prompt = f"""
             You are a SQL expert. Given this database schema:
             
             {schema}
@@ -44,70 +522,89 @@ class OpenAIClient:
             
             Return ONLY the SQL query, no explanations or additional text.
             """
-            
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a SQL expert. Return only SQL queries, no explanations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.1
-            )
-            
-            sql_query = response.choices[0].message.content.strip()
-            
-            # Clean up the response (remove markdown code blocks if present)
-            if sql_query.startswith("```sql"):
-                sql_query = sql_query[6:]
-            if sql_query.endswith("```"):
-                sql_query = sql_query[:-3]
-            
-            return sql_query.strip()
-            
-        except Exception as e:
-            print(f"Error generating SQL query: {e}")
-            # Fallback to a simple query
-            return "SELECT * FROM products LIMIT 10"
+        
+        return [
+            {"role": "system", "content": "You are a SQL expert. Return only SQL queries, no explanations."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _build_repair_messages(user_question: str, schema: str, sql_query: str, error: str) -> List[Dict[str, str]]:
+        """Build the chat messages asking for a failed query to be corrected"""
+        messages = OpenAIClient._build_messages(user_question, schema)
+        messages.append({"role": "assistant", "content": sql_query})
+        messages.append({
+            "role": "user",
+            "content": f"PostgreSQL rejected that query with this error:\n{error}\n\n"
+                       "Return ONLY the corrected SQL query, no explanations or additional text."
+        })
+        return messages
     
-    def get_query_response(self, sql_query: str) -> Dict[str, Any]:
+    @staticmethod
+    def _clean_sql_response(content: str) -> str:
+        """Strip markdown code fences from a model response"""
+        stripper = FenceStripper()
+        sql_query = stripper.feed(content) + stripper.finish()
+        return sql_query.strip()
+    
+    def get_query_response(self, sql_query: str, database: str) -> Dict[str, Any]:
         """
         Execute SQL query and return formatted response
         
+        The query is validated, checked by the cost guard and run on a pooled
+        connection with the configured statement timeout.
+        
         Args:
             sql_query: SQL query to execute
+            database: Database to run it against
             
         Returns:
             Dictionary containing query results and metadata
+            
+        Raises:
+            ValueError: If the SQL is not a safe read-only query
         """
-        # TODO: Implement database execution and response formatting
-        # This is a placeholder implementation
+        validation = validate_sql_safety(sql_query)
+        if not validation["is_safe"]:
+            raise ValueError(validation["message"])
+        
+        started = time.perf_counter()
+        limited_sql, row_limit = query_guard.apply_row_limit(database, sql_query)
+        plan = None
+        with get_connection(database) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL statement_timeout = %s", (resolve_statement_timeout(None),))
+                if query_guard.enabled:
+                    plan = query_guard.check(cur, database, sql_query)
+                cur.execute(limited_sql)
+                result = query_guard.finish(fetch_all(cur), row_limit, plan)
+        
         return {
             "sql_query": sql_query,
-            "results": [
-                {"product_id": 1, "product_name": "Chai", "unit_price": 18.00},
-                {"product_id": 2, "product_name": "Chang", "unit_price": 19.00}
-            ],
-            "row_count": 2,
-            "execution_time": 0.05
+            "results": [dict(zip(result.columns, row)) for row in result.rows],
+            "row_count": len(result.rows),
+            "truncated": result.truncated,
+            "plan": result.plan,
+            "execution_time": round(time.perf_counter() - started, 3)
         }
     
-    def process_natural_language_query(self, question: str, schema: str) -> Dict[str, Any]:
+    def process_natural_language_query(self, question: str, schema: str, database: str) -> Dict[str, Any]:
         """
         End-to-end processing: natural language → SQL → results
         
         Args:
             question: Natural language question
             schema: Database schema
+            database: Database the schema describes and the query runs against
             
         Returns:
             Complete response with SQL and results
         """
         # Generate SQL from natural language
-        sql_query = self.generate_sql_query(question, schema)
+        sql_query = self.generate_sql_query(question, schema, database=database)
         
         # Execute SQL and get results
-        response = self.get_query_response(sql_query)
+        response = self.get_query_response(sql_query, database)
         
         # Add original question to response
         response["original_question"] = question
@@ -135,3 +632,29 @@ class OpenAIClient:
             "provider": "OpenAI",
             "status": "configured"
         }
+
+def get_openai_client() -> OpenAIClient:
+    """
+    Get the process-wide OpenAI client (created on first use)
+    
+    Returns:
+        OpenAIClient wired to the shared LLM and similarity caches
+    """
+    global _client
+    if _client is None:
+        _client = OpenAIClient(cache=llm_cache, similarity_cache=similarity_cache)
+    return _client
+
+def set_openai_client(client: Optional[OpenAIClient]) -> Optional[OpenAIClient]:
+    """
+    Replace the process-wide client (e.g. with a stand-in for benchmarks)
+    
+    Args:
+        client: Client to hand out from get_openai_client (None recreates the default)
+    
+    Returns:
+        The client that was replaced
+    """
+    global _client
+    previous, _client = _client, client
+    return previous
@@ -0,0 +1,148 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.db.executor import QueryResult
+from app.utils.utils import normalize_sql
+
+# Queries calling these can return different rows on every run
+_VOLATILE = re.compile(
+    r"\b(random|now|clock_timestamp|statement_timestamp|timeofday|current_timestamp|current_time|"
+    r"localtime|localtimestamp|current_date|nextval|currval|setval|gen_random_uuid|uuid_generate_v\d|"
+    r"txid_current|pg_sleep)\b",
+    re.I,
+)
+
+# Rows inspected when estimating the memory held by a result
+_SIZE_SAMPLE_ROWS = 100
+
+
+def estimate_result_size(result: QueryResult) -> int:
+    """Approximate bytes held by a result, extrapolated from a sample of rows"""
+    rows = result.rows
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sampled = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample)
+    return sys.getsizeof(rows) + sampled * len(rows) // len(sample)
+
+
+def is_cacheable(sql: str) -> bool:
+    """False for queries whose result can change without the data changing"""
+    return _VOLATILE.search(sql) is None
+
+
+class ResultCache:
+    """LRU cache of query results bounded by estimated memory, with a TTL"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Memory budget for cached results (least recently used evicted first)
+            ttl_seconds: Seconds a result stays valid
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # Results larger than this would flush most of the cache; never store them
+        self.max_entry_bytes = max_bytes // 4
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[QueryResult, int, float]]" = OrderedDict()
+        self._bytes = 0
+        # Bumped on invalidation so results computed before it are not stored after it
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, database: str, sql: str) -> Optional[QueryResult]:
+        """
+        Cached result of a query
+
+        Args:
+            database: Database name
+            sql: SQL query (whitespace and trailing semicolons are ignored)
+
+        Returns:
+            The QueryResult, or None on a miss
+        """
+        key = (database, normalize_sql(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, size, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return result
+                self._drop(key)
+            self._misses += 1
+            return None
+
+    def generation(self, database: str) -> int:
+        """Current invalidation generation of a database (read before executing a query)"""
+        with self._lock:
+            return self._generations.get(database, 0)
+
+    def set(self, database: str, sql: str, result: QueryResult, generation: Optional[int] = None) -> bool:
+        """
+        Store a query result
+
+        Args:
+            database: Database name
+            sql: SQL query
+            result: Rows and column metadata
+            generation: Value of generation(database) taken before the query ran;
+                the result is discarded if the database was invalidated since
+
+        Returns:
+            True if the result was cached
+        """
+        if not is_cacheable(sql):
+            return False
+        size = estimate_result_size(result)
+        if size > self.max_entry_bytes:
+            return False
+
+        key = (database, normalize_sql(sql))
+        with self._lock:
+            if generation is not None and generation != self._generations.get(database, 0):
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, size, time.time() + self.ttl_seconds)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return True
+
+    def invalidate_database(self, database: str) -> int:
+        """
+        Drop every result cached for a database
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._generations[database] = self._generations.get(database, 0) + 1
+            stale = [key for key in self._entries if key[0] == database]
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.db.get_db_schema import introspect_tables, render_schema, schema_signature
+from app.services.tenant_registry import TenantStore, tenant_store
+from app.utils.metrics import timed
+from config import settings
+
+
+class CatalogEntry:
+    """Introspected schema of one database in structured, text and serialized form"""
+
+    def __init__(self, database: str, tables: List[Dict[str, Any]], signature: Optional[str] = None):
+        self.database = database
+        self.tables = tables
+        self.text = render_schema(tables)
+        self.serialized = json.dumps(tables, sort_keys=True, separators=(",", ":"))
+        self.content_hash = hashlib.sha256(self.serialized.encode("utf-8")).hexdigest()
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+
+
+class SchemaCatalog:
+    """Introspects each database once and serves its schema from memory"""
+
+    def __init__(
+        self,
+        staleness_interval: float = 0.0,
+        introspect: Callable[[str], List[Dict[str, Any]]] = introspect_tables,
+        signature: Callable[[str], str] = schema_signature,
+        store: Optional[TenantStore] = None,
+    ):
+        """
+        Initialize the catalog
+
+        Args:
+            staleness_interval: Seconds between checks that the live schema still
+                matches the cached one (0 trusts the cache until invalidated)
+            introspect: Callable returning the structured tables of a database
+            signature: Callable returning a DDL fingerprint of a database
+            store: Optional store sharing introspected schemas between processes
+        """
+        self.staleness_interval = staleness_interval
+        self._introspect = introspect
+        self._signature = signature
+        self.store = store
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._database_locks: Dict[str, threading.Lock] = {}
+
+    def peek(self, database: str) -> Optional[CatalogEntry]:
+        """
+        Cached entry without touching the database
+
+        Returns:
+            The entry, or None when it is missing or due for a staleness check
+        """
+        with self._lock:
+            entry = self._entries.get(database)
+        if entry is None or self._check_due(entry):
+            return None
+        return entry
+
+    def get(self, database: str) -> CatalogEntry:
+        """
+        Entry for a database, introspecting on first use (blocking)
+
+        Concurrent callers for the same database share one introspection.
+
+        Args:
+            database: Database name
+
+        Returns:
+            CatalogEntry for the database
+        """
+        with self._database_lock(database):
+            with self._lock:
+                entry = self._entries.get(database)
+
+            if entry is not None and self._check_due(entry):
+                entry.checked_at = time.monotonic()
+                with timed("schema_signature"):
+                    if self._signature(database) != entry.signature:
+                        entry = None
+
+            if entry is None:
+                entry = self._load_stored(database)
+                if entry is None:
+                    with timed("schema_introspection"):
+                        signature = self._signature(database) if self.staleness_interval > 0 else None
+                        entry = CatalogEntry(database, self._introspect(database), signature)
+                    if self.store is not None:
+                        self.store.set_schema(database, entry.serialized, signature)
+                with self._lock:
+                    self._entries[database] = entry
+
+            return entry
+
+    def invalidate(self, database: str) -> None:
+        """Drop the cached schema for a database (e.g. after an upload)"""
+        self.evict(database)
+        if self.store is not None:
+            self.store.delete_schema(database)
+
+    def evict(self, database: str) -> None:
+        """Free the in-memory copy of a database's schema (the stored copy is kept)"""
+        with self._lock:
+            self._entries.pop(database, None)
+
+    def _load_stored(self, database: str) -> Optional[CatalogEntry]:
+        """Entry from the shared store, if it has one that is still current"""
+        if self.store is None:
+            return None
+        stored = self.store.get_schema(database)
+        if stored is None:
+            return None
+        tables, signature = stored
+        if self.staleness_interval > 0:
+            # A signature query is much cheaper than introspecting again
+            with timed("schema_signature"):
+                if signature is None or self._signature(database) != signature:
+                    return None
+        return CatalogEntry(database, tables, signature)
+
+    def _check_due(self, entry: CatalogEntry) -> bool:
+        return self.staleness_interval > 0 and time.monotonic() - entry.checked_at >= self.staleness_interval
+
+    def _database_lock(self, database: str) -> threading.Lock:
+        with self._lock:
+            return self._database_locks.setdefault(database, threading.Lock())
+
+
+schema_catalog = SchemaCatalog(staleness_interval=settings.SCHEMA_CATALOG_STALENESS_INTERVAL, store=tenant_store)
@@ -0,0 +1,202 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.db.get_db_schema import render_schema
+from app.services.schema_catalog import CatalogEntry
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no table/column signal in questions or comments
+_STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or", "is", "are",
+    "was", "were", "be", "all", "me", "show", "list", "give", "get", "find", "what", "which",
+    "who", "how", "many", "much", "each", "per", "from", "that", "this", "their", "its",
+    "it", "do", "does", "did", "have", "has", "top", "count", "number", "total",
+}
+
+# Relative weight of a token depending on where it appears in a table
+_TABLE_NAME_WEIGHT = 3.0
+_COLUMN_NAME_WEIGHT = 1.0
+_COMMENT_WEIGHT = 0.5
+
+
+def stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens with stop words removed and plurals folded"""
+    if not text:
+        return []
+    return [stem(token) for token in _TOKEN.findall(text.lower()) if token not in _STOP_WORDS]
+
+
+class SchemaIndex:
+    """Token index over one database's tables, columns, comments and foreign keys"""
+
+    def __init__(self, tables: List[Dict[str, Any]]):
+        """
+        Build the index
+
+        Args:
+            tables: Output of introspect_tables
+        """
+        self.tables = tables
+        self.full_schema = render_schema(tables)
+        self._full_schema_with_stats: Optional[Tuple[Dict[str, Any], int, str]] = None
+        self._weights: Dict[str, Dict[str, float]] = {}
+        self._neighbours: Dict[str, Set[str]] = defaultdict(set)
+
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for table in tables:
+            weights: Dict[str, float] = defaultdict(float)
+            for token in tokenize(table["name"].replace("_", " ")):
+                weights[token] = max(weights[token], _TABLE_NAME_WEIGHT)
+            for token in tokenize(table.get("comment")):
+                weights[token] = max(weights[token], _COMMENT_WEIGHT)
+            for column in table["columns"]:
+                for token in tokenize(column["name"].replace("_", " ")):
+                    weights[token] = max(weights[token], _COLUMN_NAME_WEIGHT)
+                for token in tokenize(column.get("comment")):
+                    weights[token] = max(weights[token], _COMMENT_WEIGHT)
+            self._weights[table["name"]] = weights
+            for token in weights:
+                document_frequency[token] += 1
+
+            for fk in table["foreign_keys"]:
+                self._neighbours[table["name"]].add(fk["references_table"])
+                self._neighbours[fk["references_table"]].add(table["name"])
+
+        table_count = max(len(tables), 1)
+        self._idf = {
+            token: math.log(1 + table_count / frequency)
+            for token, frequency in document_frequency.items()
+        }
+
+    def select_tables(self, question: str, max_tables: int) -> List[str]:
+        """
+        Pick the tables a question most likely needs
+
+        Tables are ranked by weighted token overlap with the question; the best
+        matches are then extended with the tables they join to via foreign keys.
+
+        Args:
+            question: Natural language question
+            max_tables: Upper bound on tables returned
+
+        Returns:
+            Table names, best match first (empty when nothing matched)
+        """
+        question_tokens = set(tokenize(question))
+        scores = {}
+        for name, weights in self._weights.items():
+            score = sum(weights[token] * self._idf[token] for token in question_tokens if token in weights)
+            if score > 0:
+                scores[name] = score
+
+        ranked = sorted(scores, key=lambda name: (-scores[name], name))
+        selected = ranked[:max_tables]
+
+        for name in list(selected):
+            for neighbour in sorted(self._neighbours[name], key=lambda n: (-scores.get(n, 0), n)):
+                if len(selected) >= max_tables:
+                    return selected
+                if neighbour not in selected:
+                    selected.append(neighbour)
+
+        return selected
+
+    def schema_for_question(
+        self,
+        question: str,
+        max_tables: int,
+        max_chars: int,
+        stats: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_distinct: int = 20
+    ) -> str:
+        """
+        Schema text to prompt with for a question
+
+        The full schema is used when it already fits in max_chars or when no
+        table matches the question; otherwise only the selected tables are rendered,
+        dropping the lowest-ranked ones until the text fits.
+
+        Args:
+            question: Natural language question
+            max_tables: Upper bound on tables included
+            max_chars: Character budget for the rendered schema
+            stats: Optional column statistics per table, rendered with the schema
+            max_distinct: Columns with at most this many distinct values get them listed
+
+        Returns:
+            Schema text as produced by render_schema
+        """
+        full_schema = self._full_schema(stats, max_distinct)
+        if len(full_schema) <= max_chars:
+            return full_schema
+
+        selected = self.select_tables(question, max_tables)
+        if not selected:
+            return full_schema
+
+        schema = render_schema(self.tables, only=selected, stats=stats, max_distinct=max_distinct)
+        while len(schema) > max_chars and len(selected) > 1:
+            selected.pop()
+            schema = render_schema(self.tables, only=selected, stats=stats, max_distinct=max_distinct)
+        return schema
+
+    def _full_schema(self, stats: Optional[Dict[str, Dict[str, Any]]], max_distinct: int) -> str:
+        if not stats:
+            return self.full_schema
+        # Statistics are replaced as a whole on refresh, so identity tells whether they changed
+        cached = self._full_schema_with_stats
+        if cached is not None and cached[0] is stats and cached[1] == max_distinct:
+            return cached[2]
+        text = render_schema(self.tables, stats=stats, max_distinct=max_distinct)
+        self._full_schema_with_stats = (stats, max_distinct, text)
+        return text
+
+
+class SchemaRetriever:
+    """Holds a SchemaIndex per database, rebuilt whenever its catalog entry changes"""
+
+    def __init__(self):
+        self._indexes: Dict[str, Tuple[str, SchemaIndex]] = {}
+        self._lock = threading.Lock()
+
+    def for_entry(self, entry: CatalogEntry) -> SchemaIndex:
+        """
+        Index for a catalog entry, built on first use or when the schema hash changes
+
+        Args:
+            entry: Schema catalog entry of a database
+
+        Returns:
+            SchemaIndex over the entry's tables
+        """
+        with self._lock:
+            cached = self._indexes.get(entry.database)
+        if cached is not None and cached[0] == entry.content_hash:
+            return cached[1]
+
+        schema_index = SchemaIndex(entry.tables)
+        with self._lock:
+            self._indexes[entry.database] = (entry.content_hash, schema_index)
+        return schema_index
+
+    def invalidate(self, database: str) -> None:
+        """Forget the index for a database"""
+        with self._lock:
+            self._indexes.pop(database, None)
+
+
+schema_retriever = SchemaRetriever()
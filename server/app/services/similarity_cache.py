@@ -0,0 +1,302 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.llm_cache import normalize_question, schema_fingerprint
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_WORD = re.compile(r"[a-z]+(?:'t)?")
+_QUOTED = re.compile(r"['\"]([^'\"]+)['\"]")
+_CAPITALIZED = re.compile(r"(?<=\S\s)[A-Z][\w-]*")
+
+# Lines of render_schema output: "table(col type, col type, ...)"
+_SCHEMA_TABLE = re.compile(r"^(\w+)\((.*)\)", re.MULTILINE)
+
+# Words that flip or change what a question asks for while barely changing its
+# characters ("with"/"without", "ascending"/"descending", "more"/"less"). Two
+# questions can only share SQL when they contain exactly the same ones.
+_NEGATIONS = {
+    "not", "no", "none", "never", "without", "except", "excluding", "exclude", "excludes",
+    "neither", "nor", "don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't",
+    "haven't", "hasn't", "hadn't", "won't", "can't", "non", "unpaid", "unshipped",
+}
+_DIRECTIONS = {
+    "asc", "ascending", "desc", "descending", "top", "bottom", "first", "last", "highest",
+    "lowest", "most", "least", "largest", "smallest", "biggest", "fewest", "max", "maximum",
+    "min", "minimum", "earliest", "latest", "oldest", "newest", "recent", "cheapest",
+    "expensive", "longest", "shortest", "best", "worst", "increasing", "decreasing", "reverse",
+}
+_COMPARISONS = {
+    "more", "less", "fewer", "greater", "over", "under", "above", "below", "before", "after",
+    "since", "until", "between", "exceed", "exceeds", "exceeding", "equal", "equals", "exactly",
+    "than", "within", "outside", "older", "younger", "higher", "lower", "larger", "smaller",
+    "earlier", "later", "only", "any", "all", "each", "every", "average", "avg", "sum", "total",
+    "count", "number", "distinct", "unique", "per",
+}
+_CRITICAL_WORDS = _NEGATIONS | _DIRECTIONS | _COMPARISONS
+
+
+class _Partition:
+    """Vectors and SQL for every cached question against one schema"""
+
+    def __init__(self, dims: int, database: Optional[str]):
+        self.database = database
+        self.vectors = np.zeros((16, dims), dtype=np.float32)
+        self.sql: List[str] = []
+        self.guards: List[Tuple] = []
+        self.questions: List[str] = []
+        # Normalized question -> slot, so a question is indexed at most once
+        self.slots: Dict[str, int] = {}
+        self.next_slot = 0
+        self.identifiers: FrozenSet[str] = frozenset()
+
+    @property
+    def size(self) -> int:
+        """Number of questions indexed"""
+        return len(self.slots)
+
+
+class SimilarityCache:
+    """
+    Offline nearest-neighbour cache reusing SQL for reworded questions
+
+    Character n-grams cannot tell "with" from "without" or "ascending" from
+    "descending", so a similar question is only reused when it also has the
+    same guard: the same numbers, negation, sort-direction and comparison
+    words, schema identifiers and literal values (quoted or capitalized words).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        dims: int = 512,
+        ngram: int = 3,
+        max_entries: int = 20000,
+        max_schemas: int = 64
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            dims: Width of the hashed character n-gram vectors
+            ngram: Character n-gram length
+            max_entries: Maximum questions kept per schema (oldest overwritten first)
+            max_schemas: Maximum schemas indexed (least recently used dropped first)
+        """
+        self.threshold = threshold
+        self.dims = dims
+        self.ngram = ngram
+        self.max_entries = max_entries
+        self.max_schemas = max(1, max_schemas)
+        self._partitions: "OrderedDict[str, _Partition]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def vectorize(self, question: str) -> np.ndarray:
+        """
+        Hash a question's character n-grams into an L2-normalized vector
+
+        Counts are log-scaled so repeated fragments do not dominate.
+        """
+        text = f" {normalize_question(question)} "
+        n = self.ngram
+        grams = [text[i:i + n] for i in range(max(1, len(text) - n + 1))]
+        indices = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) % self.dims for gram in grams),
+            dtype=np.int64,
+            count=len(grams),
+        )
+        vector = np.bincount(indices, minlength=self.dims).astype(np.float32)
+        np.log1p(vector, out=vector)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+    def lookup(self, question: str, schema: str) -> Optional[Tuple[str, float]]:
+        """
+        Find SQL generated for a similar question against the same schema
+
+        Questions with different guards (numbers, negations, sort directions,
+        comparisons, schema identifiers or literal values) never match.
+
+        Args:
+            question: Natural language question
+            schema: Schema the SQL must have been generated against
+
+        Returns:
+            (sql, similarity) for the best match above the threshold, else None
+        """
+        vector = self.vectorize(question)
+        fingerprint = schema_fingerprint(schema)
+
+        with self._lock:
+            partition = self._partitions.get(fingerprint)
+            if partition is None or not partition.sql:
+                self._misses += 1
+                return None
+            self._partitions.move_to_end(fingerprint)
+            guard = self.guard(question, partition.identifiers)
+
+            scores = partition.vectors[:len(partition.sql)] @ vector
+            # Only the few best candidates need ordering
+            top = min(5, scores.shape[0])
+            candidates = np.argpartition(scores, -top)[-top:]
+            for index in candidates[np.argsort(scores[candidates])[::-1]]:
+                score = float(scores[index])
+                if score < self.threshold:
+                    break
+                if partition.guards[index] == guard:
+                    self._hits += 1
+                    return partition.sql[index], score
+
+            self._misses += 1
+            return None
+
+    def add(self, question: str, schema: str, sql: str, database: Optional[str] = None) -> None:
+        """
+        Index SQL generated for a question
+
+        SQL already indexed for the same question (e.g. before a repair) is replaced.
+
+        Args:
+            question: Natural language question
+            schema: Schema the SQL was generated against
+            sql: Generated SQL
+            database: Database the schema belongs to (used for invalidation)
+        """
+        vector = self.vectorize(question)
+        fingerprint = schema_fingerprint(schema)
+
+        with self._lock:
+            partition = self._partitions.get(fingerprint)
+            if partition is None:
+                partition = self._partitions[fingerprint] = _Partition(self.dims, database)
+                partition.identifiers = schema_identifiers(schema)
+                while len(self._partitions) > self.max_schemas:
+                    self._partitions.popitem(last=False)
+            self._partitions.move_to_end(fingerprint)
+            guard = self.guard(question, partition.identifiers)
+            normalized = normalize_question(question)
+
+            slot = partition.slots.get(normalized)
+            if slot is not None:
+                partition.sql[slot] = sql
+                partition.guards[slot] = guard
+            else:
+                slot = partition.next_slot
+                if slot == len(partition.sql):
+                    if slot == partition.vectors.shape[0]:
+                        capacity = min(self.max_entries, slot * 2)
+                        grown = np.zeros((capacity, self.dims), dtype=np.float32)
+                        grown[:slot] = partition.vectors
+                        partition.vectors = grown
+                    partition.sql.append(sql)
+                    partition.guards.append(guard)
+                    partition.questions.append(normalized)
+                else:
+                    partition.slots.pop(partition.questions[slot], None)
+                    partition.sql[slot] = sql
+                    partition.guards[slot] = guard
+                    partition.questions[slot] = normalized
+                partition.slots[normalized] = slot
+                partition.next_slot = (slot + 1) % self.max_entries
+
+            partition.vectors[slot] = vector
+
+    def discard(self, schema: str, sql: str) -> int:
+        """
+        Stop serving some SQL for any question against a schema (e.g. it failed to plan)
+
+        Args:
+            schema: Schema the SQL was generated against
+            sql: The SQL to forget
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            partition = self._partitions.get(schema_fingerprint(schema))
+            if partition is None:
+                return 0
+            removed = 0
+            for slot, cached in enumerate(partition.sql):
+                if cached == sql:
+                    # A zero vector never reaches the threshold; the slot is reused in turn
+                    partition.vectors[slot] = 0.0
+                    partition.sql[slot] = ""
+                    partition.slots.pop(partition.questions[slot], None)
+                    partition.questions[slot] = ""
+                    removed += 1
+            return removed
+
+    def invalidate_database(self, database: str) -> int:
+        """
+        Drop every indexed question for a database
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            stale = [key for key, partition in self._partitions.items() if partition.database == database]
+            removed = sum(self._partitions[key].size for key in stale)
+            for key in stale:
+                del self._partitions[key]
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": sum(partition.size for partition in self._partitions.values()),
+            }
+
+    @staticmethod
+    def guard(question: str, identifiers: FrozenSet[str] = frozenset()) -> Tuple:
+        """
+        Parts of a question that must be identical for two questions to share SQL
+
+        Args:
+            question: Natural language question
+            identifiers: Words of the schema's table and column names (see schema_identifiers)
+
+        Returns:
+            (numbers in order, critical words, schema identifiers, literal values)
+        """
+        words = [_fold(word) for word in _WORD.findall(question.lower().replace("\u2019", "'"))]
+        literals = _QUOTED.findall(question) + _CAPITALIZED.findall(question)
+        return (
+            tuple(_NUMBER.findall(question)),
+            tuple(sorted(word for word in words if word in _CRITICAL_WORDS)),
+            tuple(sorted({word for word in words if word in identifiers})),
+            tuple(sorted({literal.lower() for literal in literals})),
+        )
+
+
+def _fold(word: str) -> str:
+    """Fold simple plurals so that "customers" matches the identifier customer"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss") and word not in _CRITICAL_WORDS:
+        return word[:-1]
+    return word
+
+
+def schema_identifiers(schema: str) -> FrozenSet[str]:
+    """Words (split on underscores, plurals folded) of the table and column names in schema text"""
+    identifiers = set()
+    for table, columns in _SCHEMA_TABLE.findall(schema):
+        names = [table] + [column.strip().split(" ")[0] for column in columns.split(",")]
+        for name in names:
+            for word in name.lower().split("_"):
+                if len(word) > 2 and not word.isdigit():
+                    identifiers.add(_fold(word))
+    return frozenset(identifiers - _CRITICAL_WORDS)
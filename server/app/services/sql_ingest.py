@@ -0,0 +1,386 @@
+import gzip
+import io
+import re
+import zipfile
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+from app.db.connection import get_connection
+
+# Longest PostgreSQL identifier (63) plus the two "$" of a dollar-quote tag
+_LOOKAHEAD = 65
+
+# Characters that can change the lexical state outside quotes and comments
+_NORMAL_SPECIAL = re.compile(r";|'|\"|--|/\*|\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$|\\")
+_BLOCK_COMMENT = re.compile(r"/\*|\*/")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_LEADING_WORDS = re.compile(r"[A-Za-z_]+")
+_COPY_FROM_STDIN = re.compile(r"^copy\b.*\bfrom\s+stdin\b", re.I | re.S)
+
+SUPPORTED_EXTENSIONS = (".sql", ".sql.gz", ".zip")
+
+# Statements an uploaded script may not run, by leading keywords
+FORBIDDEN_STATEMENTS = {("drop", "database"), ("create", "database")}
+
+
+class ForbiddenStatementError(Exception):
+    """Raised when an uploaded script contains a statement it may not run"""
+
+
+class CountingReader(io.RawIOBase):
+    """Binary stream wrapper that counts the bytes read through it"""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+def open_sql_source(fileobj: BinaryIO, filename: str) -> BinaryIO:
+    """
+    Open the SQL payload of an upload as a binary stream, decompressing on the fly
+
+    Args:
+        fileobj: Seekable binary file holding the upload
+        filename: Original file name (selects .sql, .sql.gz or .zip handling)
+
+    Returns:
+        Binary stream of the SQL script
+
+    Raises:
+        ValueError: If the file type is unsupported or a zip holds no .sql file
+    """
+    name = filename.lower()
+    if name.endswith(".sql.gz"):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if name.endswith(".zip"):
+        archive = zipfile.ZipFile(fileobj)
+        members = [info.filename for info in archive.infolist() if info.filename.lower().endswith(".sql")]
+        if not members:
+            raise ValueError("Zip archive does not contain a .sql file.")
+        return archive.open(members[0])
+    if name.endswith(".sql"):
+        return fileobj
+    raise ValueError(f"Only {', '.join(SUPPORTED_EXTENSIONS)} files are supported.")
+
+
+def iter_text_chunks(source: BinaryIO, chunk_size: int = 65536) -> Iterator[str]:
+    """Decode a binary stream as UTF-8 in chunks of at most chunk_size characters"""
+    text = io.TextIOWrapper(source, encoding="utf-8", newline="")
+    while True:
+        chunk = text.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def leading_keywords(sql: str, count: int = 2) -> tuple:
+    """First keywords of a statement, lowercased, ignoring comments"""
+    return tuple(word.lower() for word in _LEADING_WORDS.findall(_COMMENTS.sub(" ", sql[:4096]))[:count])
+
+
+class Statement:
+    """One SQL statement; COPY ... FROM stdin statements carry a reader for their data"""
+
+    def __init__(self, sql: str, copy_data: Optional["CopyDataReader"] = None):
+        self.sql = sql
+        self.copy_data = copy_data
+
+
+class CopyDataReader(io.TextIOBase):
+    """File-like view over the inline data of a COPY ... FROM stdin block"""
+
+    def __init__(self, splitter: "StatementSplitter"):
+        self._splitter = splitter
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        return self._splitter._read_copy_data(size if size and size > 0 else 65536)
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        return self._splitter._read_copy_data(1)
+
+    def drain(self) -> None:
+        while self.read(65536):
+            pass
+
+
+class StatementSplitter:
+    """
+    Incremental SQL script splitter
+
+    Pulls text chunks on demand and yields complete statements, so a dump of
+    any size is processed with a buffer of roughly one statement. Semicolons
+    inside quotes, quoted identifiers, comments and dollar-quoted bodies do not
+    end a statement. The inline data of COPY ... FROM stdin is exposed as a
+    stream ending at the "\\." line, and psql meta-commands (e.g. "\\c db") are skipped.
+    """
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._start = 0  # where the current statement begins in _buf
+        self._eof = False
+        self._copy_done = True
+
+    def __iter__(self) -> Iterator[Statement]:
+        while True:
+            sql = self._next_statement()
+            if sql is None:
+                return
+            if _COPY_FROM_STDIN.match(_COMMENTS.sub(" ", sql).strip()):
+                self._begin_copy()
+                reader = CopyDataReader(self)
+                yield Statement(sql, copy_data=reader)
+                # Skip whatever the consumer did not read
+                reader.drain()
+            else:
+                yield Statement(sql)
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at end of input"""
+        if self._eof:
+            return False
+        try:
+            self._buf += next(self._chunks)
+            return True
+        except StopIteration:
+            self._eof = True
+            return False
+
+    def _trim(self) -> None:
+        """Drop text belonging to statements already returned"""
+        if self._start:
+            self._buf = self._buf[self._start:]
+            self._start = 0
+
+    def _find(self, needle: str, pos: int) -> int:
+        """Index of needle at or after pos, pulling chunks as needed; -1 at end of input"""
+        while True:
+            found = self._buf.find(needle, pos)
+            if found >= 0:
+                return found
+            pos = max(pos, len(self._buf) - len(needle) + 1)
+            if not self._fill():
+                return -1
+
+    def _next_statement(self) -> Optional[str]:
+        self._trim()
+        pos = 0
+        while True:
+            match = _NORMAL_SPECIAL.search(self._buf, pos)
+            if match is None:
+                # Rescan the tail next time: it may hold the start of a split token
+                pos = max(pos, len(self._buf) - _LOOKAHEAD)
+                if not self._fill():
+                    return self._take_final()
+                continue
+
+            token, (token_start, token_end) = match.group(), match.span()
+            if token == ";":
+                statement = self._buf[self._start:token_end].strip()
+                self._start = pos = token_end
+                if _COMMENTS.sub("", statement).strip(" \t\r\n;"):
+                    return statement
+            elif token == "\\":
+                at_line_start = token_start == 0 or self._buf[token_start - 1] == "\n"
+                if at_line_start and not _COMMENTS.sub("", self._buf[self._start:token_start]).strip():
+                    # psql meta-command: drop it up to the end of its line
+                    end = self._find("\n", token_end)
+                    self._start = pos = end + 1 if end >= 0 else len(self._buf)
+                else:
+                    pos = token_end
+            elif token == "'":
+                escapes = token_start > 0 and self._buf[token_start - 1] in "eE" and (
+                    token_start == 1 or not (self._buf[token_start - 2].isalnum() or self._buf[token_start - 2] == "_")
+                )
+                pos = self._skip_quoted("'", token_end, escapes)
+            elif token == '"':
+                pos = self._skip_quoted('"', token_end, False)
+            elif token == "--":
+                end = self._find("\n", token_end)
+                pos = end + 1 if end >= 0 else len(self._buf)
+            elif token == "/*":
+                pos = self._skip_block_comment(token_end)
+            else:
+                # Dollar-quoted body: runs to the same tag
+                end = self._find(token, token_end)
+                pos = end + len(token) if end >= 0 else len(self._buf)
+
+    def _skip_quoted(self, quote: str, pos: int, backslash_escapes: bool) -> int:
+        while True:
+            end = self._find(quote, pos)
+            if end < 0:
+                return len(self._buf)
+            if backslash_escapes:
+                backslashes = 0
+                while end - backslashes - 1 >= pos and self._buf[end - backslashes - 1] == "\\":
+                    backslashes += 1
+                if backslashes % 2:
+                    pos = end + 1
+                    continue
+            # A doubled quote is an escaped quote, not the end
+            if end + 1 >= len(self._buf):
+                self._fill()
+            if end + 1 < len(self._buf) and self._buf[end + 1] == quote:
+                pos = end + 2
+                continue
+            return end + 1
+
+    def _skip_block_comment(self, pos: int) -> int:
+        depth = 1
+        while depth:
+            match = _BLOCK_COMMENT.search(self._buf, pos)
+            if match is None:
+                pos = max(pos, len(self._buf) - 1)
+                if not self._fill():
+                    return len(self._buf)
+                continue
+            depth += 1 if match.group() == "/*" else -1
+            pos = match.end()
+        return pos
+
+    def _take_final(self) -> Optional[str]:
+        statement = self._buf[self._start:].strip()
+        self._buf, self._start = "", 0
+        if statement and _COMMENTS.sub("", statement).strip(" \t\r\n;"):
+            return statement
+        return None
+
+    def _begin_copy(self) -> None:
+        """Position the buffer at the first data line after a COPY ... FROM stdin statement"""
+        self._trim()
+        end = self._find("\n", 0)
+        self._start = end + 1 if end >= 0 else len(self._buf)
+        self._trim()
+        self._copy_done = False
+
+    def _read_copy_data(self, size: int) -> str:
+        """Whole data lines totalling about size characters; "" once the "\\." line is consumed"""
+        if self._copy_done:
+            return ""
+
+        pieces, taken, pos = [], 0, 0
+        while taken < size:
+            newline = self._buf.find("\n", pos)
+            if newline < 0:
+                if self._fill():
+                    continue
+                line_end = len(self._buf)
+            else:
+                line_end = newline + 1
+
+            line = self._buf[pos:line_end]
+            pos = line_end
+            if not line or line.rstrip("\r\n") == "\\.":
+                self._copy_done = True
+                break
+            pieces.append(line)
+            taken += len(line)
+
+        self._buf = self._buf[pos:]
+        return "".join(pieces)
+
+
+def execute_script(
+    conn,
+    statements: Iterator[Statement],
+    batch_size: int = 500,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Execute statements on a connection, committing every batch_size statements
+
+    Args:
+        conn: psycopg2 connection (not in autocommit mode)
+        statements: Statements from a StatementSplitter
+        batch_size: Statements per transaction
+        progress: Optional callback receiving the number of statements executed so far
+
+    Returns:
+        Number of statements executed
+
+    Raises:
+        ForbiddenStatementError: If a statement is not allowed in uploads
+    """
+    executed = 0
+    with conn.cursor() as cur:
+        for statement in statements:
+            if leading_keywords(statement.sql) in FORBIDDEN_STATEMENTS:
+                conn.rollback()
+                raise ForbiddenStatementError("SQL script contains forbidden commands.")
+
+            if statement.copy_data is not None:
+                cur.copy_expert(statement.sql, statement.copy_data)
+            else:
+                cur.execute(statement.sql)
+
+            executed += 1
+            if executed % batch_size == 0:
+                conn.commit()
+                if progress is not None:
+                    progress(executed)
+
+    conn.commit()
+    if progress is not None:
+        progress(executed)
+    return executed
+
+
+def load_sql_script(
+    database: str,
+    fileobj: BinaryIO,
+    filename: str,
+    chunk_size: int = 65536,
+    batch_size: int = 500,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Create the database if needed and stream an uploaded script into it (blocking)
+
+    The script is decompressed, decoded and split into statements on the fly,
+    and committed every batch_size statements, so memory use does not grow
+    with the size of the dump.
+
+    Args:
+        database: Target database (created when missing)
+        fileobj: Binary file holding the upload
+        filename: Original file name (.sql, .sql.gz or .zip)
+        chunk_size: Characters decoded per read
+        batch_size: Statements per transaction
+        progress: Optional callback receiving (statements executed, bytes processed)
+
+    Returns:
+        dict with statements_executed and bytes_processed
+    """
+    source = CountingReader(open_sql_source(fileobj, filename))
+    statements = StatementSplitter(iter_text_chunks(io.BufferedReader(source), chunk_size))
+
+    # Connect to postgres to create database
+    with get_connection("postgres") as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # Check if database exists
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database,))
+            if cur.fetchone() is None:
+                cur.execute(f"CREATE DATABASE {database}")
+
+    def report(executed: int) -> None:
+        if progress is not None:
+            progress(executed, source.bytes_read)
+
+    # Now connect to the target database and execute the schema SQL
+    with get_connection(database) as conn:
+        executed = execute_script(conn, statements, batch_size=batch_size, progress=report)
+
+    return {"statements_executed": executed, "bytes_processed": source.bytes_read}
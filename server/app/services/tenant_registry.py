@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tenant of requests that identify no session or API key (the single-user behaviour)
+DEFAULT_TENANT = "default"
+
+
+class TenantStore:
+    """
+    SQLite file shared by every worker process: tenant -> database mappings,
+    introspected schemas, column statistics and a generation per database
+    bumped on every import, so a worker can serve a tenant it has never seen
+    without asking it to upload again or introspecting the database, and
+    notices when another worker re-imported a database it has cached
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the store
+
+        Args:
+            db_path: SQLite file (created if missing)
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10.0)
+        # WAL lets workers read while another one writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tenants (
+                tenant_id TEXT PRIMARY KEY,
+                database TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schemas (
+                database TEXT PRIMARY KEY,
+                tables TEXT NOT NULL,
+                signature TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS imports (
+                database TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS column_stats (
+                database TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (database, table_name)
+            )
+            """
+        )
+        self._db.commit()
+
+    def get_database(self, tenant_id: str) -> Optional[str]:
+        """Database bound to a tenant, if any"""
+        with self._lock:
+            row = self._db.execute("SELECT database FROM tenants WHERE tenant_id = ?", (tenant_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_database(self, tenant_id: str, database: str) -> None:
+        """Bind a tenant to a database"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tenants (tenant_id, database, updated_at) VALUES (?, ?, ?)",
+                (tenant_id, database, time.time()),
+            )
+            self._db.commit()
+
+    def get_schema(self, database: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Stored (tables, signature) of a database, if any"""
+        with self._lock:
+            row = self._db.execute("SELECT tables, signature FROM schemas WHERE database = ?", (database,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set_schema(self, database: str, serialized_tables: str, signature: Optional[str]) -> None:
+        """Store the introspected tables (as JSON) of a database"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO schemas (database, tables, signature, updated_at) VALUES (?, ?, ?, ?)",
+                (database, serialized_tables, signature, time.time()),
+            )
+            self._db.commit()
+
+    def delete_schema(self, database: str) -> None:
+        """Forget the stored schema of a database (e.g. after a re-import)"""
+        with self._lock:
+            self._db.execute("DELETE FROM schemas WHERE database = ?", (database,))
+            self._db.commit()
+
+    def get_import_generation(self, database: str) -> int:
+        """Number of imports into a database so far"""
+        with self._lock:
+            row = self._db.execute("SELECT generation FROM imports WHERE database = ?", (database,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_import_generation(self, database: str) -> int:
+        """Record an import into a database; returns its new generation"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO imports (database, generation, updated_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(database) DO UPDATE SET generation = generation + 1, updated_at = excluded.updated_at",
+                (database, time.time()),
+            )
+            row = self._db.execute("SELECT generation FROM imports WHERE database = ?", (database,)).fetchone()
+            self._db.commit()
+        return row[0]
+
+    def get_column_stats(self, database: str) -> Dict[str, Dict[str, Any]]:
+        """Stored column statistics of a database, per table"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT table_name, stats FROM column_stats WHERE database = ?", (database,)
+            ).fetchall()
+        return {table: json.loads(stats) for table, stats in rows}
+
+    def update_column_stats(
+        self,
+        database: str,
+        tables: Dict[str, Dict[str, Any]],
+        removed: Sequence[str] = ()
+    ) -> None:
+        """Store refreshed statistics of some tables and forget those of dropped ones"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO column_stats (database, table_name, stats, updated_at) VALUES (?, ?, ?, ?)",
+                [(database, table, json.dumps(stats, separators=(",", ":")), now) for table, stats in tables.items()],
+            )
+            self._db.executemany(
+                "DELETE FROM column_stats WHERE database = ? AND table_name = ?",
+                [(database, table) for table in removed],
+            )
+            self._db.commit()
+
+    def delete_column_stats(self, database: str) -> None:
+        """Forget the stored column statistics of a database"""
+        with self._lock:
+            self._db.execute("DELETE FROM column_stats WHERE database = ?", (database,))
+            self._db.commit()
+
+
+class Tenant:
+    """A session or API key, the database it works on and its request slots"""
+
+    def __init__(self, tenant_id: str, database: str, max_concurrency: int):
+        self.tenant_id = tenant_id
+        self.database = database
+        # Created on first use, inside the event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self._semaphore is None and self.max_concurrency > 0:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
+class TenantRegistry:
+    """
+    Maps tenants to their databases, with per-tenant concurrency limits
+
+    Bindings (tenant -> database) are kept in a bounded map, least recently
+    used dropped first, and in the optional store, which is also how worker
+    processes share them. Active tenants (request slots, in-flight counts)
+    are kept separately in LRU order: past max_tenants, or after idle_timeout
+    without a request, a tenant is dropped from memory, and when no remaining
+    tenant uses its database, on_evict is called so the database's pool and
+    cached schema can be released. The binding survives that, so the tenant's
+    next request works on the same database. A database a tenant was rebound
+    away from is released the same way. With a store, the import generation
+    of a tenant's database is read again every store_refresh seconds, and
+    on_reimport is called when another worker re-imported it, so this
+    worker's cached schema and results are dropped. From the event loop
+    (aget, limit) both callbacks run on a worker thread.
+    """
+
+    def __init__(
+        self,
+        max_tenants: int = 100,
+        idle_timeout: float = 1800.0,
+        max_concurrency: int = 0,
+        store: Optional[TenantStore] = None,
+        on_evict: Optional[Callable[[str], None]] = None,
+        max_bindings: int = 100000,
+        store_refresh: float = 5.0,
+        on_reimport: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Initialize the registry
+
+        Args:
+            max_tenants: Tenants kept active in memory (least recently used evicted first)
+            idle_timeout: Seconds without a request before a tenant is evicted (0 disables)
+            max_concurrency: Requests a tenant may have in flight (0 for no limit)
+            store: Optional shared store of mappings
+            on_evict: Called with a database no tenant in memory uses any more
+            max_bindings: Tenant -> database bindings kept in memory
+            store_refresh: Seconds a binding or import generation read from the
+                store is trusted before it is read again (another worker may
+                have rebound the tenant or re-imported the database)
+            on_reimport: Called with a database another worker re-imported
+        """
+        self.max_tenants = max(1, max_tenants)
+        self.idle_timeout = idle_timeout
+        self.max_concurrency = max_concurrency
+        self.store = store
+        self.on_evict = on_evict
+        self.max_bindings = max(1, max_bindings)
+        self.store_refresh = store_refresh
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        # tenant_id -> (database or None, monotonic time it was read from the store)
+        self._bindings: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self.on_reimport = on_reimport
+        # database -> (import generation last seen, monotonic time it was read)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def database_for(self, tenant_id: str) -> Optional[str]:
+        """
+        Database bound to a tenant (may read the store; see adatabase_for)
+
+        Args:
+            tenant_id: Tenant identifier
+
+        Returns:
+            Database name, or None if the tenant has not uploaded one
+        """
+        tenant = self.get(tenant_id)
+        return tenant.database if tenant is not None else None
+
+    async def adatabase_for(self, tenant_id: str) -> Optional[str]:
+        """database_for for the event loop: a store read runs on a worker thread"""
+        tenant = await self.aget(tenant_id)
+        return tenant.database if tenant is not None else None
+
+    def get(self, tenant_id: str) -> Optional[Tenant]:
+        """Active entry for a tenant, created from its binding if needed (may read the store)"""
+        fresh, database = self._cached_binding(tenant_id)
+        if not fresh:
+            database = self.store.get_database(tenant_id)
+            self._remember_binding(tenant_id, database)
+        tenant, released = self._activate(tenant_id, database)
+        self._release(released)
+        if tenant is not None and self._generation_due(tenant.database):
+            self._check_generation(tenant.database, self.store.get_import_generation(tenant.database))
+        return tenant
+
+    async def aget(self, tenant_id: str) -> Optional[Tenant]:
+        """get for the event loop: bindings are served from memory, a store read runs on a worker thread"""
+        fresh, database = self._cached_binding(tenant_id)
+        if not fresh:
+            database = await asyncio.to_thread(self.store.get_database, tenant_id)
+            self._remember_binding(tenant_id, database)
+        tenant, released = self._activate(tenant_id, database)
+        if released:
+            await asyncio.to_thread(self._release, released)
+        if tenant is not None and self._generation_due(tenant.database):
+            generation = await asyncio.to_thread(self.store.get_import_generation, tenant.database)
+            if self._note_generation(tenant.database, generation) and self.on_reimport is not None:
+                await asyncio.to_thread(self._reimported, tenant.database)
+        return tenant
+
+    def bind(self, tenant_id: str, database: str) -> None:
+        """Point a tenant at a database (e.g. after its upload finishes; blocking)"""
+        if self.store is not None:
+            self.store.set_database(tenant_id, database)
+        self._remember_binding(tenant_id, database)
+        _, released = self._activate(tenant_id, database)
+        self._release(released)
+
+    def record_import(self, database: str) -> None:
+        """Tell other workers a database was (re-)imported here (blocking)"""
+        if self.store is not None:
+            self._note_generation(database, self.store.bump_import_generation(database))
+
+    @asynccontextmanager
+    async def limit(self, tenant_id: str):
+        """Hold one of a tenant's request slots, waiting while all are taken"""
+        tenant = await self.aget(tenant_id)
+        if tenant is None:
+            yield
+            return
+
+        semaphore = tenant.semaphore
+        with self._lock:
+            tenant.active += 1
+        try:
+            if semaphore is None:
+                yield
+            else:
+                async with semaphore:
+                    yield
+        finally:
+            with self._lock:
+                tenant.active -= 1
+                tenant.last_used = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Tenants in memory, bindings cached, requests in flight, databases in use and evictions so far"""
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "bindings": len(self._bindings),
+                "active_requests": sum(tenant.active for tenant in self._tenants.values()),
+                "databases": len({tenant.database for tenant in self._tenants.values()}),
+                "evictions": self._evictions,
+            }
+
+    def _cached_binding(self, tenant_id: str) -> Tuple[bool, Optional[str]]:
+        """(whether the in-memory binding can be used, the bound database)"""
+        with self._lock:
+            entry = self._bindings.get(tenant_id)
+            if entry is not None:
+                self._bindings.move_to_end(tenant_id)
+        if self.store is None:
+            return True, entry[0] if entry is not None else None
+        if entry is not None and time.monotonic() - entry[1] < self.store_refresh:
+            return True, entry[0]
+        return False, None
+
+    def _remember_binding(self, tenant_id: str, database: Optional[str]) -> None:
+        with self._lock:
+            self._bindings[tenant_id] = (database, time.monotonic())
+            self._bindings.move_to_end(tenant_id)
+            while len(self._bindings) > self.max_bindings:
+                self._bindings.popitem(last=False)
+
+    def _generation_due(self, database: str) -> bool:
+        if self.store is None:
+            return False
+        with self._lock:
+            seen = self._generations.get(database)
+        return seen is None or time.monotonic() - seen[1] >= self.store_refresh
+
+    def _note_generation(self, database: str, generation: int) -> bool:
+        """Remember a database's import generation; True if it changed since last seen"""
+        with self._lock:
+            seen = self._generations.get(database)
+            self._generations[database] = (generation, time.monotonic())
+        return seen is not None and seen[0] != generation
+
+    def _check_generation(self, database: str, generation: int) -> None:
+        if self._note_generation(database, generation) and self.on_reimport is not None:
+            self._reimported(database)
+
+    def _reimported(self, database: str) -> None:
+        try:
+            self.on_reimport(database)
+        except Exception as e:
+            logger.warning("Dropping cached state of re-imported '%s' failed: %s", database, e)
+
+    def _activate(self, tenant_id: str, database: Optional[str]) -> Tuple[Optional[Tenant], List[str]]:
+        """(active entry of the tenant, databases to release)"""
+        released = []
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None and database is None:
+                return None, released
+            if tenant is None:
+                tenant = self._tenants[tenant_id] = Tenant(tenant_id, database, self.max_concurrency)
+            elif database is not None and database != tenant.database:
+                # Rebound by an upload (here or in another worker)
+                previous, tenant.database = tenant.database, database
+                if self._unused(previous):
+                    released.append(previous)
+            self._tenants.move_to_end(tenant_id)
+            tenant.last_used = time.monotonic()
+        return tenant, released + self._evict()
+
+    def _evict(self) -> List[str]:
+        """Drop least recently used or idle tenants (their bindings are kept); returns databases to release"""
+        now = time.monotonic()
+        released = []
+        with self._lock:
+            for tenant_id, tenant in list(self._tenants.items()):
+                over_capacity = len(self._tenants) > self.max_tenants
+                idle = self.idle_timeout > 0 and now - tenant.last_used >= self.idle_timeout
+                if not (over_capacity or idle):
+                    # LRU order: everything after this entry was used more recently
+                    break
+                if tenant.active:
+                    continue
+                del self._tenants[tenant_id]
+                self._evictions += 1
+                if self._unused(tenant.database):
+                    released.append(tenant.database)
+        return released
+
+    def _unused(self, database: str) -> bool:
+        """Whether no tenant in memory works on a database (called with the lock held)"""
+        return all(tenant.database != database for tenant in self._tenants.values())
+
+    def _release(self, databases: List[str]) -> None:
+        """Call on_evict for each database (blocking: it closes their pools)"""
+        if self.on_evict is not None:
+            for database in databases:
+                try:
+                    self.on_evict(database)
+                except Exception as e:
+                    logger.warning("Releasing '%s' failed: %s", database, e)
+
+
+# Shared store for multi-worker deployments (TENANT_STORE_PATH enables it)
+tenant_store = TenantStore(settings.TENANT_STORE_PATH) if settings.TENANT_STORE_PATH else None
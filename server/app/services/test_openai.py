@@ -1,18 +1,21 @@
 #!/usr/bin/env python3
 """
 Simple test for OpenAI client
+
+Calls the real OpenAI API. Run from the server directory:
+    python -m app.services.test_openai <database>
 """
 
 import sys
 import os
 
-# Add the app directory to the path
-sys.path.append('..')
+# Add the server directory to the path so the app package resolves when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from openai_client import OpenAIClient
-from db.get_db_schema import get_db_schema
+from app.services.openai_client import OpenAIClient
+from app.db.get_db_schema import get_db_schema
 
-def test_openai_client():
+def test_openai_client(database: str = "northwind"):
     """Test the OpenAI client with a simple example"""
     
     # Simple database schema
@@ -21,7 +24,7 @@ def test_openai_client():
     # categories(category_id smallint, category_name varchar, description text)
     # """
 
-    schema = get_db_schema()
+    schema = get_db_schema(database)
     
     # Test question
     question = "Show me all orders"
@@ -36,7 +39,7 @@ def test_openai_client():
         client = OpenAIClient()
         
         # Generate SQL
-        sql_query = client.generate_sql_query(question, schema)
+        sql_query = client.generate_sql_query(question, schema, database=database)
         
         print(f"Generated SQL: {sql_query}")
         print("✅ Test completed!")
@@ -46,4 +49,4 @@ def test_openai_client():
         print("Make sure you have OPENAI_API_KEY in your .env file")
 
 if __name__ == "__main__":
-    test_openai_client()
\ No newline at end of file
+    test_openai_client(*sys.argv[1:2])
\ No newline at end of file
@@ -0,0 +1,201 @@
+import base64
+import datetime
+import decimal
+import io
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional dependency
+    pyarrow = None
+
+# Result formats accepted by /run-sql
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+FORMAT_ARROW = "arrow"
+
+MEDIA_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_COLUMNAR: "application/vnd.nlpsql.columnar+json",
+    FORMAT_MSGPACK: "application/x-msgpack",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+}
+
+_ACCEPT_FORMATS = {
+    "application/vnd.nlpsql.columnar+json": FORMAT_COLUMNAR,
+    "application/x-msgpack": FORMAT_MSGPACK,
+    "application/msgpack": FORMAT_MSGPACK,
+    "application/vnd.apache.arrow.stream": FORMAT_ARROW,
+}
+
+# Names for the PostgreSQL type OIDs psycopg2 reports in cursor.description
+PG_TYPE_NAMES = {
+    16: "boolean",
+    17: "bytea",
+    18: "char",
+    19: "name",
+    20: "bigint",
+    21: "smallint",
+    23: "integer",
+    25: "text",
+    26: "oid",
+    114: "json",
+    700: "real",
+    701: "double precision",
+    1042: "character",
+    1043: "character varying",
+    1082: "date",
+    1083: "time",
+    1114: "timestamp",
+    1184: "timestamptz",
+    1186: "interval",
+    1266: "timetz",
+    1700: "numeric",
+    2950: "uuid",
+    3802: "jsonb",
+}
+
+
+class UnsupportedFormatError(Exception):
+    """Raised when a requested result format is unknown or its library is missing"""
+
+
+def negotiate_format(format_param: Optional[str], accept: Optional[str]) -> str:
+    """
+    Pick the result format from a query parameter, falling back to Accept
+
+    Args:
+        format_param: Explicit ?format= value, if any
+        accept: Accept header value, if any
+
+    Returns:
+        One of the FORMAT_* constants
+
+    Raises:
+        UnsupportedFormatError: If the format is unknown or unavailable
+    """
+    if format_param:
+        fmt = format_param.lower()
+    else:
+        fmt = FORMAT_JSON
+        for media_range in (accept or "").split(","):
+            media_type = media_range.split(";")[0].strip().lower()
+            if media_type in _ACCEPT_FORMATS:
+                fmt = _ACCEPT_FORMATS[media_type]
+                break
+
+    if fmt not in MEDIA_TYPES:
+        raise UnsupportedFormatError(f"Unknown result format '{fmt}'")
+    if fmt == FORMAT_MSGPACK and msgpack is None:
+        raise UnsupportedFormatError("MessagePack output requires the 'msgpack' package")
+    if fmt == FORMAT_ARROW and pyarrow is None:
+        raise UnsupportedFormatError("Arrow output requires the 'pyarrow' package")
+    return fmt
+
+
+def type_names(type_codes: Sequence[int]) -> List[str]:
+    """Map psycopg2 type OIDs to PostgreSQL type names"""
+    return [PG_TYPE_NAMES.get(code, str(code)) for code in type_codes]
+
+
+def encode_value(value: Any) -> Any:
+    """
+    Convert a psycopg2 value that JSON/MessagePack cannot represent natively
+
+    Decimals become strings so numeric precision survives, temporal values
+    become ISO 8601 strings, intervals become seconds and binary becomes base64.
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def encode_json_number(value: Any) -> Any:
+    """
+    encode_value for the default JSON shape, which has always returned numeric
+    values as JSON numbers (integral ones as integers, others as floats)
+    """
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.is_finite() and value.as_tuple().exponent >= 0 else float(value)
+    return encode_value(value)
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON encoding that understands psycopg2 value types"""
+    return json.dumps(obj, default=encode_value, separators=(",", ":"))
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def encode_json(columns: List[str], type_codes: Sequence[int], rows: List[tuple], **extra) -> bytes:
+    """
+    Encode rows as {"data": [{column: value}, ...]} JSON (the default /run-sql shape)
+
+    Unlike the other formats, numeric values stay JSON numbers here, as
+    existing clients expect; use the columnar or MessagePack format to get
+    them as exact strings.
+    """
+    payload = {"data": [dict(zip(columns, row)) for row in rows]}
+    payload.update(extra)
+    return json.dumps(payload, default=encode_json_number, separators=(",", ":")).encode("utf-8")
+
+
+def encode_columnar(columns: List[str], type_codes: Sequence[int], rows: List[tuple], **extra) -> bytes:
+    """
+    Encode rows as {"columns", "types", "rows": [[...]]} JSON
+
+    Cursor tuples are serialized directly; no per-row dict is built.
+    """
+    payload = {"columns": columns, "types": type_names(type_codes), "rows": rows}
+    payload.update(extra)
+    return dumps(payload).encode("utf-8")
+
+
+def encode_msgpack(columns: List[str], type_codes: Sequence[int], rows: List[tuple], **extra) -> bytes:
+    """Encode rows in the columnar layout using MessagePack"""
+    payload = {"columns": columns, "types": type_names(type_codes), "rows": rows}
+    payload.update(extra)
+    return msgpack.packb(payload, default=encode_value, use_bin_type=True)
+
+
+def encode_arrow(columns: List[str], type_codes: Sequence[int], rows: List[tuple], **extra) -> bytes:
+    """Encode rows as an Arrow IPC stream (one record batch)"""
+    arrays = [pyarrow.array(list(column)) for column in zip(*rows)] if rows else [
+        pyarrow.array([], type=pyarrow.null()) for _ in columns
+    ]
+    metadata: Dict[str, str] = {"pg_types": dumps(type_names(type_codes))}
+    metadata.update({key: dumps(value) for key, value in extra.items()})
+    table = pyarrow.Table.from_arrays(arrays, names=columns).replace_schema_metadata(metadata)
+
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+ENCODERS = {
+    FORMAT_JSON: encode_json,
+    FORMAT_COLUMNAR: encode_columnar,
+    FORMAT_MSGPACK: encode_msgpack,
+    FORMAT_ARROW: encode_arrow,
+}
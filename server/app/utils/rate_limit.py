@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """Token bucket limiting how often an async operation may start"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the limiter
+
+        Args:
+            rate: Operations allowed per second on average (0 disables limiting)
+            burst: Operations allowed back to back after an idle period
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until an operation may start"""
+        if self.rate <= 0:
+            return
+
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
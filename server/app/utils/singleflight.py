@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple, Type
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls with the same key into one execution"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._calls = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._errors = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        retry_on: Tuple[Type[BaseException], ...] = (),
+    ) -> Any:
+        """
+        Run func once for every caller that arrives while it is in flight
+
+        The first caller starts the work as a separate task, so a waiter being
+        cancelled never cancels the work for the others. Every waiter gets the
+        same result, or the same exception re-raised.
+
+        Args:
+            key: Identity of the work (e.g. endpoint, database and normalized text)
+            func: Zero-argument coroutine function doing the work
+            retry_on: Exceptions after which a coalesced waiter runs the work
+                again instead of sharing the failure (e.g. a cancellation caused
+                by the leading caller's own client going away)
+
+        Returns:
+            Whatever func returns
+        """
+        self._calls += 1
+        while True:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                self._executions += 1
+                task = asyncio.ensure_future(self._run(key, func, future))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            else:
+                self._coalesced += 1
+
+            try:
+                return await asyncio.shield(future)
+            except retry_on:
+                if leader:
+                    raise
+
+    async def _run(self, key: Hashable, func: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._errors += 1
+            future.cancel()
+        except BaseException as e:
+            self._errors += 1
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # Mark the exception as observed even if every waiter went away
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters: calls received, executions started, calls coalesced, failed executions"""
+        return {
+            "calls": self._calls,
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "errors": self._errors,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,172 @@
+import re
+from typing import List, NamedTuple
+
+WORD = "word"
+QUOTED_IDENTIFIER = "quoted_identifier"
+STRING = "string"
+NUMBER = "number"
+PARAMETER = "parameter"
+SEMICOLON = "semicolon"
+OPEN_PAREN = "open_paren"
+CLOSE_PAREN = "close_paren"
+OPERATOR = "operator"
+
+_WORD = re.compile(r"[A-Za-z_\u0080-\U0010ffff][A-Za-z0-9_$\u0080-\U0010ffff]*")
+_NUMBER = re.compile(r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_PARAMETER = re.compile(r"\$\d+")
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+_BLOCK_COMMENT_MARK = re.compile(r"/\*|\*/")
+_OPERATOR_CHARS = "+-*/<>=~!@#%^&|`?:.,[]"
+
+
+class SQLLexError(ValueError):
+    """Raised for an unterminated string, quoted identifier or comment"""
+
+
+class Token(NamedTuple):
+    """One lexical token; words are lowercased, depth is the parenthesis nesting level"""
+    kind: str
+    value: str
+    start: int
+    end: int
+    depth: int
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    Split SQL into tokens in a single linear pass
+
+    Whitespace and comments (including nested block comments) are dropped.
+    String literals (standard, E'' escape and dollar-quoted) and quoted
+    identifiers become single tokens, so keywords inside them are never seen
+    as keywords.
+
+    Args:
+        sql: SQL text (one or more statements)
+
+    Returns:
+        List of tokens
+
+    Raises:
+        SQLLexError: If a string, quoted identifier or comment is not terminated
+    """
+    tokens = []
+    depth = 0
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch.isspace():
+            i += 1
+            continue
+
+        if ch == "-" and sql.startswith("--", i):
+            newline = sql.find("\n", i)
+            i = n if newline == -1 else newline + 1
+            continue
+
+        if ch == "/" and sql.startswith("/*", i):
+            i = _skip_block_comment(sql, i)
+            continue
+
+        start = i
+        if ch == "'":
+            i = _skip_quoted(sql, i, "'")
+            tokens.append(Token(STRING, sql[start:i], start, i, depth))
+        elif ch in "eE" and sql.startswith("'", i + 1):
+            i = _skip_escape_string(sql, i + 1)
+            tokens.append(Token(STRING, sql[start:i], start, i, depth))
+        elif ch == '"':
+            i = _skip_quoted(sql, i, '"')
+            tokens.append(Token(QUOTED_IDENTIFIER, sql[start + 1:i - 1].replace('""', '"'), start, i, depth))
+        elif ch == "$":
+            tag = _DOLLAR_TAG.match(sql, i)
+            if tag:
+                close = sql.find(tag.group(), tag.end())
+                if close == -1:
+                    raise SQLLexError("Unterminated dollar-quoted string")
+                i = close + len(tag.group())
+                tokens.append(Token(STRING, sql[start:i], start, i, depth))
+            else:
+                match = _PARAMETER.match(sql, i)
+                i = match.end() if match else i + 1
+                tokens.append(Token(PARAMETER if match else OPERATOR, sql[start:i], start, i, depth))
+        elif ch.isdigit() or (ch == "." and i + 1 < n and sql[i + 1].isdigit()):
+            i = _NUMBER.match(sql, i).end()
+            tokens.append(Token(NUMBER, sql[start:i], start, i, depth))
+        elif ch == "_" or ch.isalpha() or ord(ch) >= 0x80:
+            i = _WORD.match(sql, i).end()
+            tokens.append(Token(WORD, sql[start:i].lower(), start, i, depth))
+        elif ch == ";":
+            i += 1
+            tokens.append(Token(SEMICOLON, ch, start, i, depth))
+        elif ch == "(":
+            i += 1
+            tokens.append(Token(OPEN_PAREN, ch, start, i, depth))
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+            i += 1
+            tokens.append(Token(CLOSE_PAREN, ch, start, i, depth))
+        else:
+            i += 1
+            while i < n and sql[i] in _OPERATOR_CHARS and not sql.startswith(("--", "/*"), i):
+                i += 1
+            tokens.append(Token(OPERATOR, sql[start:i], start, i, depth))
+    return tokens
+
+
+def split_statements(tokens: List[Token]) -> List[List[Token]]:
+    """Group tokens into statements at semicolons, dropping empty statements"""
+    statements = []
+    current = []
+    for token in tokens:
+        if token.kind == SEMICOLON:
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def _skip_quoted(sql: str, i: int, quote: str) -> int:
+    # Doubled quotes escape the quote character
+    while True:
+        close = sql.find(quote, i + 1)
+        if close == -1:
+            raise SQLLexError("Unterminated string or quoted identifier")
+        if sql.startswith(quote, close + 1):
+            i = close + 1
+            continue
+        return close + 1
+
+
+def _skip_escape_string(sql: str, i: int) -> int:
+    # E'...': backslash escapes as well as doubled quotes
+    n = len(sql)
+    i += 1
+    while i < n:
+        ch = sql[i]
+        if ch == "\\":
+            i += 2
+        elif ch == "'":
+            if sql.startswith("'", i + 1):
+                i += 2
+            else:
+                return i + 1
+        else:
+            i += 1
+    raise SQLLexError("Unterminated string")
+
+
+def _skip_block_comment(sql: str, i: int) -> int:
+    # PostgreSQL block comments nest
+    nesting = 0
+    for mark in _BLOCK_COMMENT_MARK.finditer(sql, i):
+        nesting += 1 if mark.group() == "/*" else -1
+        if nesting == 0:
+            return mark.end()
+    raise SQLLexError("Unterminated comment")
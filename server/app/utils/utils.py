@@ -1,4 +1,13 @@
+import hashlib
 import os
+import re
+import threading
+from collections import OrderedDict
+
+from app.utils.metrics import VALIDATION_REJECTIONS
+from app.utils.sql_lexer import WORD, SQLLexError, split_statements, tokenize
+
+_WHITESPACE = re.compile(r"\s+")
 
 def print_tree(dir_path, prefix="", depth=3):
     if depth == 0:
@@ -15,38 +24,95 @@ def print_tree(dir_path, prefix="", depth=3):
             new_prefix = prefix + ("    " if index == len(items) - 1 else "│   ")
             print_tree(path, new_prefix, depth - 1)
 
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and drop trailing semicolons so equivalent statements compare equal"""
+    return _WHITESPACE.sub(" ", sql.strip()).rstrip("; ")
+
+# Statements a query may start with; everything else is rejected
+READ_ONLY_STATEMENTS = {"select", "with", "values", "table", "explain", "show"}
+
+# Keywords that write data or change the schema wherever they appear in a
+# statement (e.g. a data-modifying CTE, SELECT INTO or EXPLAIN ANALYZE DELETE).
+# Statement-only commands (VACUUM, GRANT, ...) are caught by the leading keyword.
+FORBIDDEN_KEYWORDS = {
+    "drop", "alter", "truncate", "rename", "create", "insert", "update", "delete",
+    "merge", "into", "execute",
+}
+
+# Words rejected in natural-language questions (matched as whole words)
+_QUESTION_FORBIDDEN = re.compile(
+    r"\b(drop|delete|alter|truncate|rename|create|insert|update|select)\b", re.IGNORECASE
+)
+
+_VERDICT_CACHE_SIZE = 4096
+_verdict_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+_verdict_lock = threading.Lock()
+
 def validate_sql_safety(sql: str, include_select: bool = False) -> dict:
         """
         Validate SQL query for forbidden/unsafe commands
         
+        The SQL is tokenized in one pass, so keywords inside string literals,
+        comments and identifiers (e.g. created_at, last_update) are ignored.
+        A query must be a single statement starting with a read-only keyword
+        and containing no data-modifying or DDL keyword. Verdicts are cached
+        by a hash of the text.
+        
         Args:
             sql: SQL query string to validate
-            include_select: Whether to include SELECT in forbidden words
+            include_select: Validate a natural-language question instead: reject
+                it if it contains a SQL command word, including SELECT
             
         Returns:
             dict containing:
                 is_safe (bool): Whether SQL is safe
                 message (str): Error message if unsafe
         """
-        sql = sql.strip().lower()
-        
-        # Define forbidden words
-        forbidden = ["drop", "delete", "alter", "truncate", "rename", 
-                    "create", "insert", "update", "delete"]
-        
-        # Optionally include SELECT in forbidden words
-        if include_select:
-            forbidden.append("select")
-            
-        # Check for forbidden words
-        for word in forbidden:
-            if word in sql:
-                return {
-                    "is_safe": False,
-                    "message": f"Forbidden word '{word}' detected in query"
-                }
-                
-        return {
-            "is_safe": True,
-            "message": "SQL query is safe"
-        }
+        key = hashlib.blake2b(sql.encode("utf-8"), digest_size=16, person=b"q" if include_select else b"s").digest()
+        with _verdict_lock:
+            verdict = _verdict_cache.get(key)
+            if verdict is not None:
+                _verdict_cache.move_to_end(key)
+
+        if verdict is None:
+            verdict = _check_question(sql) if include_select else _check_statement(sql)
+            with _verdict_lock:
+                _verdict_cache[key] = verdict
+                if len(_verdict_cache) > _VERDICT_CACHE_SIZE:
+                    _verdict_cache.popitem(last=False)
+
+        if not verdict["is_safe"]:
+            VALIDATION_REJECTIONS.inc(kind="question" if include_select else "sql")
+        return dict(verdict)
+
+def _unsafe(message: str) -> dict:
+    return {"is_safe": False, "message": message}
+
+_SAFE = {"is_safe": True, "message": "SQL query is safe"}
+
+def _check_question(question: str) -> dict:
+    match = _QUESTION_FORBIDDEN.search(question)
+    if match:
+        return _unsafe(f"Forbidden word '{match.group(1).lower()}' detected in query")
+    return dict(_SAFE)
+
+def _check_statement(sql: str) -> dict:
+    try:
+        statements = split_statements(tokenize(sql))
+    except SQLLexError as e:
+        return _unsafe(str(e))
+
+    if not statements:
+        return _unsafe("Empty query")
+    if len(statements) > 1:
+        return _unsafe("Multiple statements are not allowed")
+
+    statement = statements[0]
+    leading = statement[0]
+    if leading.kind != WORD or leading.value not in READ_ONLY_STATEMENTS:
+        return _unsafe(f"Only read-only queries are allowed, got '{leading.value}'")
+
+    for token in statement:
+        if token.kind == WORD and token.value in FORBIDDEN_KEYWORDS:
+            return _unsafe(f"Forbidden word '{token.value}' detected in query")
+    return dict(_SAFE)
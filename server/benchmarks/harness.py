@@ -0,0 +1,127 @@
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Latency summary keys compared against a baseline (lower is better)
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Percentile of a list by linear interpolation between closest ranks
+
+    Args:
+        values: Samples (need not be sorted)
+        p: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed_s: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles for one endpoint run"""
+    requests = len(latencies_ms) + errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+
+
+async def drive(
+    send: Callable[[int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Issue requests with at most `concurrency` in flight and measure each one
+
+    Args:
+        send: Coroutine function sending request number i
+        requests: Requests to send
+        concurrency: Requests in flight at once
+
+    Returns:
+        Summary from summarize(), plus the first few error messages
+    """
+    latencies = []
+    failures: List[str] = []
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await send(index)
+                ok = response.status_code < 400
+                error = None if ok else f"HTTP {response.status_code}: {response.text[:200]}"
+            except Exception as e:
+                ok, error = False, f"{type(e).__name__}: {e}"
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                failures.append(error)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    summary = summarize(latencies, len(failures), time.perf_counter() - started)
+    if failures:
+        summary["sample_errors"] = failures[:3]
+    return summary
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    Find endpoints that got slower or less reliable than in a baseline run
+
+    Args:
+        current: Results of this run
+        baseline: Results of an earlier run
+        tolerance: Allowed relative slowdown (0.1 = 10%)
+        min_delta_ms: Latency increases smaller than this are treated as noise
+
+    Returns:
+        One message per regression (empty if none)
+    """
+    regressions = []
+    for dataset, endpoints in current["results"].items():
+        for endpoint, stats in endpoints.items():
+            before: Optional[Dict[str, Any]] = baseline.get("results", {}).get(dataset, {}).get(endpoint)
+            if before is None:
+                continue
+            name = f"{dataset} {endpoint}"
+            for key in LATENCY_KEYS:
+                slower = stats[key] - before.get(key, 0)
+                if before.get(key) and stats[key] > before[key] * (1 + tolerance) and slower >= min_delta_ms:
+                    regressions.append(f"{name}: {key} {before[key]:.1f} -> {stats[key]:.1f}")
+            if before.get("throughput_rps") and stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: throughput_rps {before['throughput_rps']:.1f} -> {stats['throughput_rps']:.1f}"
+                )
+            if stats["errors"] > before.get("errors", 0):
+                regressions.append(f"{name}: errors {before.get('errors', 0)} -> {stats['errors']}")
+    return regressions
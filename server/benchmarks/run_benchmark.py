@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the API with a stub LLM backend
+
+Drives the FastAPI app in-process (no network hop) against a real
+PostgreSQL: each bundled dump is uploaded through /upload-schema, then
+/generate-sql, /run-sql and /schema are called under the requested
+concurrency. The LLM is replaced by a deterministic stub with tunable
+latency, so runs are reproducible and cost nothing.
+
+The database comes from the usual DB_HOST/DB_PORT/DB_USER/DB_PASS settings,
+or from a throwaway embedded server with --embedded (needs `pip install pgserver`).
+
+Usage (from the server directory):
+    python -m benchmarks.run_benchmark --concurrency 16 --requests 400
+    python -m benchmarks.run_benchmark --baseline benchmarks/results/previous.json
+
+Results are written as JSON (benchmarks/results/<timestamp>.json by default).
+With --baseline, the run exits with status 1 if any endpoint's p50/p95/p99
+latency or throughput regressed by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import psycopg2
+from psycopg2 import sql
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from benchmarks.harness import compare, drive, summarize
+from benchmarks.workloads import DATASETS, strip_database_commands
+
+RESULTS_DIR = os.path.join(SERVER_DIR, "benchmarks", "results")
+
+
+def parse_args(argv=None):
+    """Command-line options"""
+    parser = argparse.ArgumentParser(description="Benchmark the NL-to-SQL API with a stub LLM")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help="Comma-separated datasets to load")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight per endpoint")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument(
+        "--tenants", type=int, default=1,
+        help="Sessions the requests are spread over"
+    )
+    parser.add_argument(
+        "--tenant-max-concurrency", type=int, default=0,
+        help="Requests each session may have in flight (overrides TENANT_MAX_CONCURRENCY; 0 for no cap)"
+    )
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Stub LLM base latency")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Stub LLM extra latency (fixed per question)")
+    parser.add_argument(
+        "--caches", action="store_true",
+        help="Keep the LLM, similarity and result caches on (by default every request does the full work)"
+    )
+    parser.add_argument("--no-fast-path", action="store_true", help="Send every question to the (stub) LLM")
+    parser.add_argument("--embedded", action="store_true", help="Run against a temporary embedded PostgreSQL")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency increases below this")
+    return parser.parse_args(argv)
+
+
+def start_embedded_postgres(data_dir):
+    """Start a private PostgreSQL server and point the DB_* settings at it"""
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--embedded needs the pgserver package: pip install pgserver")
+
+    server = pgserver.get_server(data_dir, cleanup_mode="stop")
+    params = psycopg2.extensions.parse_dsn(server.get_uri())
+    os.environ["DB_HOST"] = params.get("host", "")
+    os.environ["DB_PORT"] = params.get("port", "5432")
+    os.environ["DB_USER"] = params.get("user", "postgres")
+    os.environ["DB_PASS"] = params.get("password", "")
+    return server
+
+
+def drop_database(name):
+    """Remove a benchmark database left by an earlier run"""
+    from config.database import get_connection_params
+
+    conn = psycopg2.connect(**get_connection_params("postgres"))
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+    finally:
+        conn.close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def session_headers(index):
+    return {"X-Session-Id": f"benchmark-{index}"}
+
+
+async def upload(client, dataset, database):
+    """Load a dump through /upload-schema and wait for the import job to finish"""
+    with open(dataset.dump, encoding="utf-8") as f:
+        script = strip_database_commands(f.read())
+
+    with tempfile.NamedTemporaryFile("w", suffix=".sql", encoding="utf-8", delete=False) as f:
+        f.write(script)
+        path = f.name
+    try:
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            response = await client.post(
+                "/upload-schema",
+                params={"database": database},
+                headers=session_headers(0),
+                files={"file": (os.path.basename(dataset.dump), f, "text/x-sql")},
+            )
+        response.raise_for_status()
+        status_url = response.json()["status_url"]
+        while True:
+            job = (await client.get(status_url, headers=session_headers(0))).json()
+            if job["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        os.remove(path)
+
+    if job["status"] != "succeeded":
+        raise RuntimeError(f"Import of {dataset.name} failed: {job.get('error')}")
+    summary = summarize([elapsed * 1000], 0, elapsed)
+    summary["statements"] = job.get("statements_executed")
+    return summary
+
+
+async def bench_dataset(client, main, dataset, args):
+    """Upload a dataset, then measure each query endpoint against it"""
+    from app.services.openai_client import llm_cache, set_openai_client, similarity_cache
+    from benchmarks.stub_llm import StubLLMClient
+
+    database = f"bench_{dataset.name}"
+    await asyncio.to_thread(drop_database, database)
+    results = {"upload-schema": await upload(client, dataset, database)}
+    # The upload bound the first session; the others work on the same database
+    for index in range(1, args.tenants):
+        main.tenant_registry.bind(f"session:benchmark-{index}", database)
+
+    stub = StubLLMClient(
+        dataset.questions,
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        cache=llm_cache if args.caches else None,
+        similarity_cache=similarity_cache if args.caches else None,
+    )
+    set_openai_client(stub)
+
+    questions = list(dataset.questions)
+    queries = dataset.queries
+    tenants = max(1, args.tenants)
+    endpoints = {
+        "generate-sql": lambda i: client.post(
+            "/generate-sql", json={"question": questions[i % len(questions)]}, headers=session_headers(i % tenants)
+        ),
+        "run-sql": lambda i: client.post(
+            "/run-sql", json={"sql": queries[i % len(queries)]}, headers=session_headers(i % tenants)
+        ),
+        "schema": lambda i: client.get("/schema", headers=session_headers(i % tenants)),
+    }
+    for endpoint, send in endpoints.items():
+        if args.warmup:
+            await drive(send, args.warmup, args.concurrency)
+        stub.requests = 0
+        results[endpoint] = await drive(send, args.requests, args.concurrency)
+        if endpoint == "generate-sql":
+            results[endpoint]["llm_requests"] = stub.requests
+        print_row(dataset.name, endpoint, results[endpoint])
+    return results
+
+
+def print_row(dataset, endpoint, stats):
+    print(
+        f"{dataset:<10} {endpoint:<14} {stats['requests']:>6} req {stats['errors']:>4} err "
+        f"{stats['throughput_rps']:>9.1f} rps  p50 {stats['p50_ms']:>8.1f}  "
+        f"p95 {stats['p95_ms']:>8.1f}  p99 {stats['p99_ms']:>8.1f} ms"
+    )
+    for error in stats.get("sample_errors", []):
+        print(f"    {error}")
+
+
+async def run(args):
+    from config import settings
+
+    # Settings are read when the app is imported, so they are overridden first
+    if args.no_fast_path:
+        settings.FAST_PATH_ENABLED = False
+    if args.caches:
+        settings.SIMILARITY_CACHE_ENABLED = True
+    else:
+        # A zero-byte result cache stores nothing
+        settings.RESULT_CACHE_MAX_BYTES = 0
+        settings.RESULT_CACHE_TTL = 0
+    # The per-session cap would otherwise throttle --concurrency
+    settings.TENANT_MAX_CONCURRENCY = max(0, args.tenant_max_concurrency)
+
+    import app.api.main as main
+
+    # httpx logs every in-process request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for name in args.datasets.split(","):
+            dataset = DATASETS[name.strip()]
+            print(f"📦 {dataset.name}: loading {os.path.basename(dataset.dump)}...")
+            results[dataset.name] = await bench_dataset(client, main, dataset, args)
+            print_row(dataset.name, "upload-schema", results[dataset.name]["upload-schema"])
+    main.shutdown_executor()
+    return results
+
+
+def main():
+    args = parse_args()
+
+    server = None
+    if args.embedded:
+        data_dir = tempfile.mkdtemp(prefix="nlpsql-bench-")
+        server = start_embedded_postgres(data_dir)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance", "min_delta_ms")},
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+from openai.openai_object import OpenAIObject
+
+from app.services.llm_cache import LLMCache, normalize_question
+from app.services.openai_client import OpenAIClient
+from app.services.similarity_cache import SimilarityCache
+
+# Pulls the question back out of the prompt built by OpenAIClient._build_messages
+_QUESTION_IN_PROMPT = re.compile(r'Convert this natural language question to SQL:\s*"(.*)"', re.DOTALL)
+
+# Rough characters per token, for the usage numbers reported with each response
+_CHARS_PER_TOKEN = 4
+
+
+class StubLLMClient(OpenAIClient):
+    """
+    Deterministic stand-in for the OpenAI backend
+
+    Only the completion request is replaced: caching, prompt construction,
+    rate limiting and response cleanup run exactly as in production. Each
+    question is answered from a fixed table after a simulated delay that is
+    derived from the question, so repeated runs see the same latencies.
+    """
+
+    def __init__(
+        self,
+        answers: Dict[str, str],
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        default_sql: str = "SELECT 1",
+        cache: Optional[LLMCache] = None,
+        similarity_cache: Optional[SimilarityCache] = None
+    ):
+        """
+        Initialize the stub
+
+        Args:
+            answers: SQL to return per question
+            latency_ms: Base delay per completion request
+            jitter_ms: Extra delay of up to this much, fixed per question
+            default_sql: SQL returned for questions not in answers
+            cache: Optional cache of previously generated SQL (exact question match)
+            similarity_cache: Optional cache reusing SQL for reworded questions
+        """
+        super().__init__(api_key="stub", cache=cache, similarity_cache=similarity_cache)
+        self.model = "stub"
+        self.answers = {normalize_question(question): sql for question, sql in answers.items()}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.default_sql = default_sql
+        self.requests = 0
+
+    def delay(self, question: str) -> float:
+        """Simulated completion time in seconds for a question"""
+        digest = hashlib.blake2b(question.encode("utf-8"), digest_size=8).digest()
+        fraction = int.from_bytes(digest, "big") / 2 ** 64
+        return (self.latency_ms + self.jitter_ms * fraction) / 1000
+
+    async def _acreate_with_retry(self, messages: List[Dict[str, str]]):
+        """Answer a completion request from the table after the simulated delay"""
+        self.requests += 1
+        match = _QUESTION_IN_PROMPT.search(messages[1]["content"])
+        question = match.group(1) if match else ""
+        sql = self.answers.get(normalize_question(question), self.default_sql)
+
+        await asyncio.sleep(self.delay(question))
+
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return OpenAIObject.construct_from({
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": sql}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_chars // _CHARS_PER_TOKEN,
+                "completion_tokens": len(sql) // _CHARS_PER_TOKEN,
+            },
+        })
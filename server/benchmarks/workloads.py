@@ -0,0 +1,96 @@
+import os
+import re
+from typing import Dict, List, NamedTuple
+
+DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db")
+
+# Statements an upload may not run; psql meta-commands (\c) would be skipped anyway
+_DATABASE_COMMAND = re.compile(r"^\s*((drop|create)\s+database\b[^;\n]*;|\\c\b.*)$", re.IGNORECASE | re.MULTILINE)
+
+
+class Dataset(NamedTuple):
+    """A bundled dump and the questions asked of it"""
+    name: str
+    dump: str
+    # Question -> SQL the stub LLM answers with; each SQL is also run through /run-sql
+    questions: Dict[str, str]
+
+    @property
+    def queries(self) -> List[str]:
+        return list(self.questions.values())
+
+
+def strip_database_commands(sql: str) -> str:
+    """
+    Remove DROP/CREATE DATABASE and \\c lines from a dump
+
+    The Chinook script creates and switches to its own database, which the
+    upload endpoint refuses; the benchmark loads it into the database it names.
+    """
+    return _DATABASE_COMMAND.sub("", sql)
+
+
+NORTHWIND = Dataset(
+    name="northwind",
+    dump=os.path.join(DB_DIR, "northwind.sql"),
+    questions={
+        "How many products are there?":
+            "SELECT COUNT(*) FROM products",
+        "List all customers in Germany":
+            "SELECT company_name, city FROM customers WHERE country = 'Germany'",
+        "What are the ten most expensive products?":
+            "SELECT product_name, unit_price FROM products ORDER BY unit_price DESC LIMIT 10",
+        "Total sales per category":
+            "SELECT c.category_name, SUM(d.unit_price * d.quantity * (1 - d.discount)) AS sales "
+            "FROM order_details d JOIN products p ON p.product_id = d.product_id "
+            "JOIN categories c ON c.category_id = p.category_id "
+            "GROUP BY c.category_name ORDER BY sales DESC",
+        "Number of orders per employee":
+            "SELECT e.first_name, e.last_name, COUNT(o.order_id) AS orders "
+            "FROM employees e LEFT JOIN orders o ON o.employee_id = e.employee_id "
+            "GROUP BY e.employee_id, e.first_name, e.last_name ORDER BY orders DESC",
+        "Which customers placed more than ten orders?":
+            "SELECT c.company_name, COUNT(*) AS orders FROM customers c "
+            "JOIN orders o ON o.customer_id = c.customer_id "
+            "GROUP BY c.company_name HAVING COUNT(*) > 10 ORDER BY orders DESC",
+        "Average freight by shipper":
+            "SELECT s.company_name, AVG(o.freight) AS avg_freight FROM orders o "
+            "JOIN shippers s ON s.shipper_id = o.ship_via GROUP BY s.company_name",
+        "Monthly order counts in 1997":
+            "SELECT date_trunc('month', order_date) AS month, COUNT(*) FROM orders "
+            "WHERE order_date >= '1997-01-01' AND order_date < '1998-01-01' GROUP BY month ORDER BY month",
+    },
+)
+
+CHINOOK = Dataset(
+    name="chinook",
+    dump=os.path.join(DB_DIR, "Chinook_PostgreSql.sql"),
+    questions={
+        "How many tracks are there?":
+            "SELECT COUNT(*) FROM track",
+        "List the albums by AC/DC":
+            "SELECT al.title FROM album al JOIN artist ar ON ar.artist_id = al.artist_id "
+            "WHERE ar.name = 'AC/DC'",
+        "Top five genres by number of tracks":
+            "SELECT g.name, COUNT(*) AS tracks FROM track t JOIN genre g ON g.genre_id = t.genre_id "
+            "GROUP BY g.name ORDER BY tracks DESC LIMIT 5",
+        "Total invoiced per country":
+            "SELECT billing_country, SUM(total) AS total FROM invoice "
+            "GROUP BY billing_country ORDER BY total DESC",
+        "Best selling artists":
+            "SELECT ar.name, SUM(il.unit_price * il.quantity) AS revenue FROM invoice_line il "
+            "JOIN track t ON t.track_id = il.track_id JOIN album al ON al.album_id = t.album_id "
+            "JOIN artist ar ON ar.artist_id = al.artist_id GROUP BY ar.name ORDER BY revenue DESC LIMIT 10",
+        "Longest tracks":
+            "SELECT name, milliseconds FROM track ORDER BY milliseconds DESC LIMIT 10",
+        "Customers per support representative":
+            "SELECT e.first_name, e.last_name, COUNT(c.customer_id) AS customers FROM employee e "
+            "JOIN customer c ON c.support_rep_id = e.employee_id GROUP BY e.employee_id, e.first_name, e.last_name",
+        "Playlists with the most tracks":
+            "SELECT p.name, COUNT(*) AS tracks FROM playlist p "
+            "JOIN playlist_track pt ON pt.playlist_id = p.playlist_id "
+            "GROUP BY p.playlist_id, p.name ORDER BY tracks DESC LIMIT 5",
+    },
+)
+
+DATASETS = {dataset.name: dataset for dataset in (NORTHWIND, CHINOOK)}
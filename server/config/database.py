@@ -0,0 +1,24 @@
+import os
+from typing import Dict, Any
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def get_connection_params(database: str) -> Dict[str, Any]:
+    """
+    Build psycopg2 connection parameters for a database
+
+    Args:
+        database: Name of the database to connect to
+
+    Returns:
+        Keyword arguments for psycopg2.connect
+    """
+    return {
+        "dbname": database,
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASS"),
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT"),
+    }
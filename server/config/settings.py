@@ -0,0 +1,155 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# Connection pool settings (one pool per database)
+DB_POOL_MIN_SIZE = _int_env("DB_POOL_MIN_SIZE", 1)
+DB_POOL_MAX_SIZE = _int_env("DB_POOL_MAX_SIZE", 10)
+DB_POOL_MAX_POOLS = _int_env("DB_POOL_MAX_POOLS", 8)
+DB_POOL_ACQUIRE_TIMEOUT = _float_env("DB_POOL_ACQUIRE_TIMEOUT", 10.0)
+DB_POOL_IDLE_TIMEOUT = _float_env("DB_POOL_IDLE_TIMEOUT", 300.0)
+DB_POOL_HEALTH_CHECK_INTERVAL = _float_env("DB_POOL_HEALTH_CHECK_INTERVAL", 30.0)
+
+# Blocking database work is offloaded to a bounded thread pool
+DB_EXECUTOR_WORKERS = _int_env("DB_EXECUTOR_WORKERS", DB_POOL_MAX_SIZE)
+QUERY_STATEMENT_TIMEOUT_MS = _int_env("QUERY_STATEMENT_TIMEOUT_MS", 30000)
+QUERY_MAX_STATEMENT_TIMEOUT_MS = _int_env("QUERY_MAX_STATEMENT_TIMEOUT_MS", 300000)
+DISCONNECT_POLL_INTERVAL = _float_env("DISCONNECT_POLL_INTERVAL", 0.25)
+
+# OpenAI settings
+OPENAI_REQUEST_TIMEOUT = _float_env("OPENAI_REQUEST_TIMEOUT", 60.0)
+# Retries with exponential backoff on 429 and 5xx responses (async calls)
+OPENAI_MAX_RETRIES = _int_env("OPENAI_MAX_RETRIES", 3)
+OPENAI_RETRY_BASE_DELAY = _float_env("OPENAI_RETRY_BASE_DELAY", 0.5)
+OPENAI_RETRY_MAX_DELAY = _float_env("OPENAI_RETRY_MAX_DELAY", 20.0)
+# Process-wide limit on completion requests started per second (0 disables)
+OPENAI_RATE_LIMIT_PER_SECOND = _float_env("OPENAI_RATE_LIMIT_PER_SECOND", 0.0)
+OPENAI_RATE_LIMIT_BURST = _int_env("OPENAI_RATE_LIMIT_BURST", 10)
+
+# Streaming /run-sql results
+STREAM_FETCH_SIZE = _int_env("STREAM_FETCH_SIZE", 1000)
+STREAM_MAX_ROWS = _int_env("STREAM_MAX_ROWS", 100000)
+
+# LLM response cache (LLM_CACHE_PATH enables the on-disk SQLite tier)
+LLM_CACHE_MAX_ENTRIES = _int_env("LLM_CACHE_MAX_ENTRIES", 1000)
+LLM_CACHE_TTL = _float_env("LLM_CACHE_TTL", 86400.0)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+# Similarity cache for near-duplicate questions (threshold is cosine similarity).
+# Off by default: it answers a question with SQL generated for a different one.
+SIMILARITY_CACHE_ENABLED = os.getenv("SIMILARITY_CACHE_ENABLED", "false").lower() == "true"
+SIMILARITY_CACHE_THRESHOLD = _float_env("SIMILARITY_CACHE_THRESHOLD", 0.9)
+SIMILARITY_CACHE_DIMS = _int_env("SIMILARITY_CACHE_DIMS", 512)
+SIMILARITY_CACHE_MAX_ENTRIES = _int_env("SIMILARITY_CACHE_MAX_ENTRIES", 20000)
+SIMILARITY_CACHE_MAX_SCHEMAS = _int_env("SIMILARITY_CACHE_MAX_SCHEMAS", 64)
+
+# Relevant-table retrieval for prompts (full schema is sent when it fits the budget)
+SCHEMA_RETRIEVAL_MAX_TABLES = _int_env("SCHEMA_RETRIEVAL_MAX_TABLES", 8)
+SCHEMA_RETRIEVAL_MAX_CHARS = _int_env("SCHEMA_RETRIEVAL_MAX_CHARS", 4000)
+
+# Schema catalog staleness check (seconds between DDL signature checks, 0 disables)
+SCHEMA_CATALOG_STALENESS_INTERVAL = _float_env("SCHEMA_CATALOG_STALENESS_INTERVAL", 0.0)
+
+# Streaming /upload-schema ingestion
+UPLOAD_CHUNK_SIZE = _int_env("UPLOAD_CHUNK_SIZE", 65536)
+UPLOAD_BATCH_SIZE = _int_env("UPLOAD_BATCH_SIZE", 500)
+
+# Background schema import jobs
+IMPORT_WORKERS = _int_env("IMPORT_WORKERS", 2)
+IMPORT_MAX_QUEUED = _int_env("IMPORT_MAX_QUEUED", 16)
+IMPORT_JOBS_RETAINED = _int_env("IMPORT_JOBS_RETAINED", 200)
+
+# Result cache for read-only /run-sql queries (size is an estimate of memory held)
+RESULT_CACHE_MAX_BYTES = _int_env("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+RESULT_CACHE_TTL = _float_env("RESULT_CACHE_TTL", 300.0)
+
+# EXPLAIN-based cost guard for /run-sql (0 disables a threshold). Above the confirm
+# thresholds a query needs confirm=true; above the reject thresholds it never runs.
+# Row-returning queries without a LIMIT get QUERY_GUARD_ROW_LIMIT added.
+# QUERY_GUARD_THRESHOLDS overrides any of these per database, as JSON:
+# {"northwind": {"confirm_cost": 50000, "row_limit": 500}}
+QUERY_GUARD_ENABLED = os.getenv("QUERY_GUARD_ENABLED", "true").lower() == "true"
+QUERY_GUARD_CONFIRM_COST = _float_env("QUERY_GUARD_CONFIRM_COST", 1e6)
+QUERY_GUARD_REJECT_COST = _float_env("QUERY_GUARD_REJECT_COST", 1e8)
+QUERY_GUARD_CONFIRM_ROWS = _float_env("QUERY_GUARD_CONFIRM_ROWS", 1e6)
+QUERY_GUARD_REJECT_ROWS = _float_env("QUERY_GUARD_REJECT_ROWS", 1e8)
+QUERY_GUARD_ROW_LIMIT = _int_env("QUERY_GUARD_ROW_LIMIT", 1000)
+QUERY_GUARD_THRESHOLDS = json.loads(os.getenv("QUERY_GUARD_THRESHOLDS") or "{}")
+
+# /generate-sql/batch (concurrency is the number of LLM calls in flight per batch)
+BATCH_CONCURRENCY = _int_env("BATCH_CONCURRENCY", 8)
+BATCH_MAX_QUESTIONS = _int_env("BATCH_MAX_QUESTIONS", 100)
+
+# Rule-based fast path answering simple question shapes without the LLM
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_CONFIDENCE = _float_env("FAST_PATH_MIN_CONFIDENCE", 0.9)
+
+# Dry-run validation and repair of generated SQL (/generate-sql with dry_run=true)
+DRY_RUN_TIMEOUT_MS = _int_env("DRY_RUN_TIMEOUT_MS", 5000)
+SQL_REPAIR_MAX_ATTEMPTS = _int_env("SQL_REPAIR_MAX_ATTEMPTS", 2)
+
+# Requests slower than this are logged with their stage timings and a fingerprint
+# of their SQL; the SQL itself is only logged at DEBUG level (0 disables)
+SLOW_REQUEST_MS = _float_env("SLOW_REQUEST_MS", 0.0)
+
+# Level of the server's own log messages (DEBUG, INFO, WARNING, ...)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Tenants (sessions or API keys) and the database each one works on. Idle tenants
+# are dropped from memory, releasing their database's pool and cached schema;
+# their bindings (up to TENANT_MAX_BINDINGS) are kept. TENANT_STORE_PATH is a
+# SQLite file shared by worker processes (empty keeps bindings in process
+# memory only); bindings read from it are trusted for TENANT_STORE_REFRESH seconds,
+# which is also how long other workers may serve a re-imported database from
+# their old cached schema and results.
+TENANT_MAX_ACTIVE = _int_env("TENANT_MAX_ACTIVE", 100)
+TENANT_IDLE_TIMEOUT = _float_env("TENANT_IDLE_TIMEOUT", 1800.0)
+TENANT_MAX_CONCURRENCY = _int_env("TENANT_MAX_CONCURRENCY", 4)
+TENANT_MAX_BINDINGS = _int_env("TENANT_MAX_BINDINGS", 100000)
+TENANT_STORE_PATH = os.getenv("TENANT_STORE_PATH", "")
+TENANT_STORE_REFRESH = _float_env("TENANT_STORE_REFRESH", 5.0)
+
+# Session ids (X-Session-Id or ?session_id) are not authenticated: whoever sends
+# an id works on that session's database. Set this to require an X-API-Key on
+# every tenant-scoped request instead, e.g. when the API is reachable by others.
+TENANT_REQUIRE_API_KEY = os.getenv("TENANT_REQUIRE_API_KEY", "false").lower() == "true"
+
+# /export: COPY output is sent in chunks of EXPORT_CHUNK_BYTES with at most
+# EXPORT_BUFFER_CHUNKS waiting for a slow client; Parquet is written one row
+# group of EXPORT_ROW_GROUP_SIZE rows at a time. Exports run on their own
+# threads (EXPORT_MAX_CONCURRENT) so long downloads never tie up query workers.
+# The statement timeout covers the whole transfer, hence its own default.
+EXPORT_CHUNK_BYTES = _int_env("EXPORT_CHUNK_BYTES", 65536)
+EXPORT_BUFFER_CHUNKS = _int_env("EXPORT_BUFFER_CHUNKS", 8)
+EXPORT_ROW_GROUP_SIZE = _int_env("EXPORT_ROW_GROUP_SIZE", 50000)
+EXPORT_MAX_CONCURRENT = _int_env("EXPORT_MAX_CONCURRENT", 4)
+EXPORT_STATEMENT_TIMEOUT_MS = _int_env("EXPORT_STATEMENT_TIMEOUT_MS", QUERY_MAX_STATEMENT_TIMEOUT_MS)
+
+# Column statistics (row counts, null fractions, distinct counts, common values)
+# read from pg_stats after ANALYZE when an upload finishes. Every
+# COLUMN_STATS_REFRESH_INTERVAL seconds (0 disables) a background check
+# re-analyzes only tables with more than COLUMN_STATS_ANALYZE_THRESHOLD of their
+# rows changed. Prompts list the common values of columns with at most
+# COLUMN_STATS_PROMPT_MAX_DISTINCT distinct values. Statistics are kept between
+# restarts (and shared by workers) in the SQLite file COLUMN_STATS_STORE_PATH:
+# the tenant store when TENANT_STORE_PATH is set, else column_stats.sqlite3 in
+# the working directory (empty keeps them in memory only).
+COLUMN_STATS_ENABLED = os.getenv("COLUMN_STATS_ENABLED", "true").lower() == "true"
+COLUMN_STATS_MAX_VALUES = _int_env("COLUMN_STATS_MAX_VALUES", 10)
+COLUMN_STATS_REFRESH_INTERVAL = _float_env("COLUMN_STATS_REFRESH_INTERVAL", 300.0)
+COLUMN_STATS_ANALYZE_THRESHOLD = _float_env("COLUMN_STATS_ANALYZE_THRESHOLD", 0.1)
+COLUMN_STATS_PROMPT_MAX_DISTINCT = _int_env("COLUMN_STATS_PROMPT_MAX_DISTINCT", 20)
+COLUMN_STATS_STORE_PATH = os.getenv("COLUMN_STATS_STORE_PATH", TENANT_STORE_PATH or "column_stats.sqlite3")
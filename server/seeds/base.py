@@ -1,7 +1,11 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
+import csv
+import io
 import os
+from itertools import islice
 
 load_dotenv()
 
@@ -69,10 +73,84 @@ class BaseSeeder:
         return result['exists'] if result else False
     
     def table_is_empty(self, table_name):
-        """Check if a table is empty"""
-        query = f"SELECT COUNT(*) as count FROM {table_name};"
-        result = self.fetch_one(query)
-        return result['count'] == 0 if result else True
+        """Check if a table is empty (stops at the first row instead of counting)"""
+        return not self.rows_exist(table_name)
+    
+    def rows_exist(self, table_name, where=None, params=None):
+        """Check if a table has any row, optionally matching a WHERE clause"""
+        query = sql.SQL("SELECT EXISTS (SELECT 1 FROM {} {} LIMIT 1) AS exists").format(
+            sql.Identifier(table_name),
+            sql.SQL("WHERE " + where) if where else sql.SQL("")
+        )
+        result = self.fetch_one(query, params)
+        return result['exists'] if result else False
+    
+    def count_rows(self, table_name, where=None, params=None):
+        """Number of rows in a table, optionally matching a WHERE clause"""
+        query = sql.SQL("SELECT count(*) AS count FROM {} {}").format(
+            sql.Identifier(table_name),
+            sql.SQL("WHERE " + where) if where else sql.SQL("")
+        )
+        result = self.fetch_one(query, params)
+        return result['count'] if result else 0
+    
+    def bulk_insert(self, table_name, columns, rows, batch_size=10000, on_conflict=None):
+        """
+        Insert many rows, one transaction per batch
+        
+        Rows are streamed with COPY FROM STDIN; with on_conflict (e.g.
+        "(category_id) DO NOTHING"), which COPY cannot express, they are sent
+        as multi-row INSERTs with execute_values instead.
+        
+        Args:
+            table_name: Table to load
+            columns: Column names, in row order
+            rows: Iterable of row tuples (consumed lazily, batch by batch)
+            batch_size: Rows per transaction
+            on_conflict: Optional ON CONFLICT clause body
+        
+        Returns:
+            Number of rows sent
+        """
+        total = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return total
+            try:
+                if on_conflict:
+                    statement = sql.SQL("INSERT INTO {} VALUES %s ON CONFLICT " + on_conflict).format(
+                        self._target(table_name, columns)
+                    )
+                    execute_values(self.cursor, statement, batch, page_size=len(batch))
+                else:
+                    self.copy_rows(table_name, columns, batch)
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            total += len(batch)
+    
+    def copy_rows(self, table_name, columns, rows):
+        """Stream rows into a table with COPY FROM STDIN (the caller commits)"""
+        statement = sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv)").format(self._target(table_name, columns))
+        self.cursor.copy_expert(statement, self._csv_buffer(rows))
+    
+    @staticmethod
+    def _target(table_name, columns):
+        return sql.SQL("{} ({})").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+    
+    @staticmethod
+    def _csv_buffer(rows):
+        """Rows as CSV for COPY (None and empty strings are written as empty fields, i.e. NULL)"""
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        buffer.seek(0)
+        return buffer
     
     def run(self):
         """Main method to run the seeder - override in child classes"""
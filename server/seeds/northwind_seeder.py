@@ -42,16 +42,12 @@ class NorthwindSeeder(BaseSeeder):
             (8, 'Seafood', 'Seaweed and fish')
         ]
         
-        for category_id, category_name, description in categories_data:
-            query = """
-                INSERT INTO categories (category_id, category_name, description)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (category_id) DO NOTHING;
-            """
-            if self.execute(query, (category_id, category_name, description)):
-                print(f"  ✅ Added category: {category_name}")
-            else:
-                print(f"  ❌ Failed to add category: {category_name}")
+        self.insert_all(
+            'categories',
+            ['category_id', 'category_name', 'description'],
+            categories_data,
+            '(category_id) DO NOTHING'
+        )
     
     def seed_products(self):
         """Seed products table"""
@@ -72,19 +68,13 @@ class NorthwindSeeder(BaseSeeder):
             (8, 'Northwoods Cranberry Sauce', 3, '12 - 12 oz jars', 40.00, 6, 0, 0, 0)
         ]
         
-        for (product_id, product_name, supplier_id, quantity_per_unit, 
-             unit_price, units_in_stock, units_on_order, reorder_level, discontinued) in products_data:
-            query = """
-                INSERT INTO products (product_id, product_name, supplier_id, quantity_per_unit, 
-                                    unit_price, units_in_stock, units_on_order, reorder_level, discontinued)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (product_id) DO NOTHING;
-            """
-            if self.execute(query, (product_id, product_name, supplier_id, quantity_per_unit,
-                                   unit_price, units_in_stock, units_on_order, reorder_level, discontinued)):
-                print(f"  ✅ Added product: {product_name}")
-            else:
-                print(f"  ❌ Failed to add product: {product_name}")
+        self.insert_all(
+            'products',
+            ['product_id', 'product_name', 'supplier_id', 'quantity_per_unit',
+             'unit_price', 'units_in_stock', 'units_on_order', 'reorder_level', 'discontinued'],
+            products_data,
+            '(product_id) DO NOTHING'
+        )
     
     def seed_customers(self):
         """Seed customers table"""
@@ -105,16 +95,18 @@ class NorthwindSeeder(BaseSeeder):
              '120 Hanover Sq.', 'London', None, 'WA1 1DP', 'UK', '(171) 555-7788', '(171) 555-6750')
         ]
         
-        for (customer_id, company_name, contact_name, contact_title, address, city, 
-             region, postal_code, country, phone, fax) in customers_data:
-            query = """
-                INSERT INTO customers (customer_id, company_name, contact_name, contact_title,
-                                     address, city, region, postal_code, country, phone, fax)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (customer_id) DO NOTHING;
-            """
-            if self.execute(query, (customer_id, company_name, contact_name, contact_title,
-                                   address, city, region, postal_code, country, phone, fax)):
-                print(f"  ✅ Added customer: {company_name}")
-            else:
-                print(f"  ❌ Failed to add customer: {company_name}") 
\ No newline at end of file
+        self.insert_all(
+            'customers',
+            ['customer_id', 'company_name', 'contact_name', 'contact_title',
+             'address', 'city', 'region', 'postal_code', 'country', 'phone', 'fax'],
+            customers_data,
+            '(customer_id) DO NOTHING'
+        )
+    
+    def insert_all(self, table_name, columns, rows, on_conflict):
+        """Insert a table's sample rows in one statement"""
+        try:
+            self.bulk_insert(table_name, columns, rows, on_conflict=on_conflict)
+            print(f"  ✅ Added {len(rows)} rows to {table_name}")
+        except Exception as e:
+            print(f"  ❌ Failed to seed {table_name}: {e}") 
\ No newline at end of file
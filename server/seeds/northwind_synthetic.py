@@ -0,0 +1,376 @@
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from psycopg2 import sql
+
+from .base import BaseSeeder
+
+logger = logging.getLogger(__name__)
+
+# Rows per table at scale factor 1 (the size of the original Northwind data)
+BASE_ROWS = {'customers': 91, 'products': 77, 'orders': 830}
+
+# Synthetic products and orders are numbered from here, clear of the sample data
+SYNTHETIC_ID_START = 100000
+
+# Key columns that are smallint in northwind.sql and must hold synthetic ids
+WIDENED_KEYS = [
+    ('orders', 'order_id'),
+    ('order_details', 'order_id'),
+    ('products', 'product_id'),
+    ('order_details', 'product_id'),
+]
+
+CUSTOMER_COLUMNS = ['customer_id', 'company_name', 'contact_name', 'contact_title',
+                    'address', 'city', 'region', 'postal_code', 'country', 'phone', 'fax']
+PRODUCT_COLUMNS = ['product_id', 'product_name', 'supplier_id', 'category_id', 'quantity_per_unit',
+                   'unit_price', 'units_in_stock', 'units_on_order', 'reorder_level', 'discontinued']
+ORDER_COLUMNS = ['order_id', 'customer_id', 'employee_id', 'order_date', 'required_date', 'shipped_date',
+                 'ship_via', 'freight', 'ship_name', 'ship_address', 'ship_city', 'ship_region',
+                 'ship_postal_code', 'ship_country']
+ORDER_DETAIL_COLUMNS = ['order_id', 'product_id', 'unit_price', 'quantity', 'discount']
+
+_CITIES = [
+    ('Berlin', None, 'Germany'), ('Hamburg', None, 'Germany'), ('London', None, 'UK'),
+    ('Paris', None, 'France'), ('Lyon', None, 'France'), ('Madrid', None, 'Spain'),
+    ('Lisboa', None, 'Portugal'), ('Torino', None, 'Italy'), ('Stockholm', None, 'Sweden'),
+    ('Seattle', 'WA', 'USA'), ('Portland', 'OR', 'USA'), ('Boise', 'ID', 'USA'),
+    ('Vancouver', 'BC', 'Canada'), ('Montréal', 'Québec', 'Canada'), ('México D.F.', None, 'Mexico'),
+    ('Sao Paulo', 'SP', 'Brazil'), ('Buenos Aires', None, 'Argentina'), ('Caracas', 'DF', 'Venezuela'),
+]
+_FIRST_NAMES = ['Maria', 'Ana', 'Antonio', 'Thomas', 'Christina', 'Hanna', 'Frédérique', 'Martín',
+                'Laurence', 'Elizabeth', 'Victoria', 'Patricio', 'Francisco', 'Yang', 'Pedro', 'Aria']
+_LAST_NAMES = ['Anders', 'Trujillo', 'Moreno', 'Hardy', 'Berglund', 'Moos', 'Citeaux', 'Sommer',
+               'Lebihan', 'Lincoln', 'Ashworth', 'Simpson', 'Chang', 'Afonso', 'Cruz', 'Wang']
+_TITLES = ['Owner', 'Sales Representative', 'Order Administrator', 'Marketing Manager',
+           'Accounting Manager', 'Sales Associate', 'Sales Agent']
+_COMPANY_WORDS = ['Alpine', 'Bottom', 'Cactus', 'Eastern', 'Folk', 'Great', 'Island', 'Lonesome',
+                  'Maison', 'North', 'Old', 'Queen', 'Rattlesnake', 'Royal', 'Wolski', 'Wilman']
+_COMPANY_SUFFIXES = ['Trading', 'Markets', 'Delicatessen', 'Imports', 'Foods', 'Store', 'Comidas', 'Kala']
+_STREETS = ['Obere Str.', 'Mataderos', 'Hanover Sq.', 'Berguvsvägen', 'Forsterstr.', 'Grenzacherweg',
+            'Kirchgasse', 'Rua Orós', 'Avda. Azteca', 'Walserweg', 'Garden St.', 'Keskuskatu']
+_PRODUCT_WORDS = ['Chai', 'Chang', 'Syrup', 'Seasoning', 'Gumbo', 'Spread', 'Pears', 'Sauce', 'Beef',
+                  'Ikura', 'Queso', 'Konbu', 'Tofu', 'Pavlova', 'Crab', 'Scones', 'Biscuits', 'Tarte']
+_PRODUCT_ADJECTIVES = ['Organic', 'Dried', 'Smoked', 'Spicy', 'Sweet', 'Classic', 'Northern', 'Royal']
+_PACKAGING = ['10 boxes x 20 bags', '24 - 12 oz bottles', '12 - 550 ml bottles', '48 - 6 oz jars',
+              '36 boxes', '12 - 8 oz jars', '12 - 1 lb pkgs.', '24 - 500 g pkgs.', '20 - 1 kg tins']
+_DISCOUNTS = [0, 0, 0, 0, 0.05, 0.1, 0.15, 0.2, 0.25]
+_FIRST_ORDER_DATE = date(2020, 1, 1)
+_ORDER_DAYS = 5 * 365
+
+_BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def synthetic_customer_id(n):
+    """
+    Five-character customer id for the n-th synthetic customer
+
+    Ids start with a digit so they never collide with the sample data's
+    all-letter ids (ALFKI, ...); this allows 10 * 36^4 (about 16.8M) customers.
+    """
+    digits = []
+    rest = n % 36 ** 4
+    for _ in range(4):
+        rest, digit = divmod(rest, 36)
+        digits.append(_BASE36[digit])
+    return str(n // 36 ** 4) + ''.join(reversed(digits))
+
+
+def _chunk_rng(seed, table, chunk):
+    # Each chunk has its own generator so chunks can be built in any order or in parallel
+    return random.Random(f'{seed}:{table}:{chunk}')
+
+
+def _phone(rng):
+    return f'({rng.randint(1, 999)}) 555-{rng.randint(0, 9999):04d}'
+
+
+def generate_customers(seed, chunk, start, stop):
+    """Customer rows for synthetic customers [start, stop)"""
+    rng = _chunk_rng(seed, 'customers', chunk)
+    for n in range(start, stop):
+        city, region, country = rng.choice(_CITIES)
+        company = f'{rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_SUFFIXES)}'
+        yield (
+            synthetic_customer_id(n),
+            company[:40],
+            f'{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}'[:30],
+            rng.choice(_TITLES),
+            f'{rng.choice(_STREETS)} {rng.randint(1, 9999)}',
+            city,
+            region,
+            f'{rng.randint(1000, 99999)}',
+            country,
+            _phone(rng),
+            _phone(rng) if rng.random() < 0.5 else None,
+        )
+
+
+def generate_products(seed, chunk, start, stop, supplier_ids, category_ids):
+    """Product rows for synthetic products [start, stop)"""
+    rng = _chunk_rng(seed, 'products', chunk)
+    for n in range(start, stop):
+        yield (
+            SYNTHETIC_ID_START + n,
+            f'{rng.choice(_PRODUCT_ADJECTIVES)} {rng.choice(_PRODUCT_WORDS)} {n}'[:40],
+            rng.choice(supplier_ids) if supplier_ids else None,
+            rng.choice(category_ids) if category_ids else None,
+            rng.choice(_PACKAGING),
+            round(rng.uniform(2, 250), 2),
+            rng.randint(0, 150),
+            rng.choice([0, 0, 0, 10, 20, 40, 70, 100]),
+            rng.choice([0, 5, 10, 15, 20, 25, 30]),
+            1 if rng.random() < 0.05 else 0,
+        )
+
+
+def generate_orders(seed, chunk, start, stop, customers, products, employee_ids, shipper_ids):
+    """
+    Order rows for synthetic orders [start, stop) and their order_details rows
+
+    Returns:
+        (orders, order_details) lists
+    """
+    rng = _chunk_rng(seed, 'orders', chunk)
+    orders = []
+    details = []
+    for n in range(start, stop):
+        order_id = SYNTHETIC_ID_START + n
+        order_date = _FIRST_ORDER_DATE + timedelta(days=rng.randrange(_ORDER_DAYS))
+        shipped = order_date + timedelta(days=rng.randint(1, 35)) if rng.random() < 0.97 else None
+        city, region, country = rng.choice(_CITIES)
+        orders.append((
+            order_id,
+            synthetic_customer_id(rng.randrange(customers)),
+            rng.choice(employee_ids) if employee_ids else None,
+            order_date,
+            order_date + timedelta(days=28),
+            shipped,
+            rng.choice(shipper_ids) if shipper_ids else None,
+            round(rng.uniform(0, 500), 2),
+            f'{rng.choice(_COMPANY_WORDS)} {rng.choice(_COMPANY_SUFFIXES)}',
+            f'{rng.choice(_STREETS)} {rng.randint(1, 9999)}',
+            city,
+            region,
+            f'{rng.randint(1000, 99999)}',
+            country,
+        ))
+        # Northwind averages about 2.6 lines per order
+        for product in rng.sample(range(products), min(products, rng.choice([1, 1, 2, 2, 3, 3, 4, 5]))):
+            details.append((
+                order_id,
+                SYNTHETIC_ID_START + product,
+                round(rng.uniform(2, 250), 2),
+                rng.randint(1, 120),
+                rng.choice(_DISCOUNTS),
+            ))
+    return orders, details
+
+
+class NorthwindSyntheticSeeder(BaseSeeder):
+    """
+    Seeded, reproducible synthetic Northwind data for load testing
+
+    Scale factor 1 adds as many customers, products and orders as the
+    original data set (91, 77 and 830, with about 2.6 order lines each);
+    scale 1000 adds 91k customers, 77k products, 830k orders and about 2.2M
+    order lines. The same seed and scale always produce the same rows.
+    Each batch is generated from its own seeded random generator and loaded
+    with COPY; a table is loaded in one transaction (orders together with
+    their lines), tables in parallel on a pool of worker connections. A table
+    that already holds the expected number of synthetic rows is skipped; one
+    with a different number (an interrupted run or another scale) is cleared
+    and reloaded.
+    """
+
+    def __init__(self, scale=1.0, seed=42, workers=4, batch_size=10000):
+        super().__init__()
+        self.scale = scale
+        self.random_seed = seed
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._local = threading.local()
+        self._loaders = []
+        self._loaders_lock = threading.Lock()
+
+    def run(self):
+        """Main seeding method"""
+        logger.info("🌱 Generating synthetic Northwind data (scale %s, seed %s)...", self.scale, self.random_seed)
+
+        for table in ('customers', 'products', 'orders', 'order_details'):
+            if not self.table_exists(table):
+                logger.error("❌ %s table does not exist. Please load northwind.sql first.", table)
+                return
+
+        self.widen_keys()
+
+        counts = {table: max(1, math.ceil(rows * self.scale)) for table, rows in BASE_ROWS.items()}
+        supplier_ids = self.ids('suppliers', 'supplier_id')
+        category_ids = self.ids('categories', 'category_id')
+        employee_ids = self.ids('employees', 'employee_id')
+        shipper_ids = self.ids('shippers', 'shipper_id')
+
+        customers = ('customers', counts['customers'], [('customers', "customer_id ~ '^[0-9]'", None)],
+                     lambda loader, chunk, start, stop: self.copy_batch(
+                         loader, 'customers', CUSTOMER_COLUMNS, generate_customers(self.random_seed, chunk, start, stop)))
+        products = ('products', counts['products'], [('products', 'product_id >= %s', (SYNTHETIC_ID_START,))],
+                    lambda loader, chunk, start, stop: self.copy_batch(
+                        loader, 'products', PRODUCT_COLUMNS,
+                        generate_products(self.random_seed, chunk, start, stop, supplier_ids, category_ids)))
+        # Order lines are removed before their orders, and always loaded with them
+        orders = ('orders', counts['orders'], [('order_details', 'order_id >= %s', (SYNTHETIC_ID_START,)),
+                                               ('orders', 'order_id >= %s', (SYNTHETIC_ID_START,))],
+                  lambda loader, chunk, start, stop: self.copy_orders(
+                      loader, chunk, start, stop, counts['customers'], counts['products'], employee_ids, shipper_ids))
+
+        pending = [spec for spec in (customers, products, orders) if not self.is_loaded(*spec[:3])]
+        if (customers in pending or products in pending) and orders not in pending:
+            # Synthetic orders reference the rows about to be replaced
+            pending.append(orders)
+        try:
+            if orders in pending:
+                # Cleared up front: the orders hold foreign keys to customers and products
+                self.load_table(*orders[:3], None)
+            # Orders reference customers and products, so those are loaded first
+            self.load_phase([spec for spec in (customers, products) if spec in pending])
+            self.load_phase([orders] if orders in pending else [])
+        finally:
+            self.close_loaders()
+
+        logger.info("🎉 Synthetic Northwind data loaded!")
+
+    def widen_keys(self):
+        """Change smallint key columns to integer so they can hold synthetic ids"""
+        for table, column in WIDENED_KEYS:
+            result = self.fetch_one(
+                """
+                    SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s;
+                """,
+                (table, column)
+            )
+            if result and result['data_type'] == 'smallint':
+                logger.info("  🔧 Widening %s.%s to integer", table, column)
+                query = sql.SQL("ALTER TABLE {} ALTER COLUMN {} TYPE integer;").format(
+                    sql.Identifier(table), sql.Identifier(column)
+                )
+                if not self.execute(query):
+                    raise RuntimeError(f"Could not widen {table}.{column}")
+
+    def ids(self, table, column):
+        """Existing ids of a referenced table (empty if the table does not exist)"""
+        if not self.table_exists(table):
+            return []
+        query = sql.SQL("SELECT {column} FROM {table} ORDER BY {column};").format(
+            column=sql.Identifier(column), table=sql.Identifier(table)
+        )
+        return [row[column] for row in self.fetch_all(query)]
+
+    def is_loaded(self, table, rows, synthetic):
+        """
+        Whether a table holds exactly the synthetic rows expected at this scale
+
+        Args:
+            table: Table name
+            rows: Expected number of synthetic rows
+            synthetic: (table, WHERE clause, params) selecting synthetic rows; the
+                first entry for this table is counted
+        """
+        where, params = next((where, params) for name, where, params in synthetic if name == table)
+        found = self.count_rows(table, where, params)
+        if found == rows:
+            logger.info("⏭️ %s already has its %d synthetic rows, skipping...", table, rows)
+            return True
+        if found:
+            logger.info("♻️ %s has %d of %d synthetic rows, reloading...", table, found, rows)
+        return False
+
+    def load_phase(self, tables):
+        """
+        Load tables in parallel, each in a single transaction
+
+        Args:
+            tables: (table, rows, synthetic-row selectors, load(loader, chunk, start, stop)) per table
+        """
+        if not tables:
+            return
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            loaded = sum(executor.map(lambda spec: self.load_table(*spec), tables))
+        elapsed = time.perf_counter() - started
+        logger.info("  ✅ %d rows in %.1fs (%s rows/s)", loaded, elapsed, f"{loaded / max(elapsed, 1e-9):,.0f}")
+
+    def load_table(self, table, rows, synthetic, load):
+        """
+        Replace a table's synthetic rows in one transaction
+
+        Existing synthetic rows (e.g. from an interrupted or smaller run) are
+        deleted, then the rows are generated and copied batch by batch on
+        this thread's connection. A failure leaves the table as it was.
+
+        Args:
+            table: Table name
+            rows: Number of synthetic rows to load
+            synthetic: (table, WHERE clause, params) selecting the rows to delete first
+            load: load(loader, chunk, start, stop) copying one batch and returning its row count,
+                or None to only delete
+
+        Returns:
+            Number of rows loaded
+        """
+        loader = self.loader()
+        loaded = 0
+        try:
+            for name, where, params in synthetic:
+                loader.cursor.execute(
+                    sql.SQL("DELETE FROM {} WHERE " + where).format(sql.Identifier(name)), params
+                )
+            if load is not None:
+                logger.info("📦 Loading %d synthetic %s...", rows, table)
+                for chunk, start in enumerate(range(0, rows, self.batch_size)):
+                    loaded += load(loader, chunk, start, min(start + self.batch_size, rows))
+            loader.connection.commit()
+        except Exception:
+            loader.connection.rollback()
+            raise
+        return loaded
+
+    @staticmethod
+    def copy_batch(loader, table, columns, rows):
+        """Copy one batch of rows (the caller commits)"""
+        rows = list(rows)
+        loader.copy_rows(table, columns, rows)
+        return len(rows)
+
+    def copy_orders(self, loader, chunk, start, stop, customers, products, employee_ids, shipper_ids):
+        """Copy a batch of orders and their lines (the caller commits)"""
+        orders, details = generate_orders(
+            self.random_seed, chunk, start, stop, customers, products, employee_ids, shipper_ids
+        )
+        loader.copy_rows('orders', ORDER_COLUMNS, orders)
+        loader.copy_rows('order_details', ORDER_DETAIL_COLUMNS, details)
+        return len(orders) + len(details)
+
+    def loader(self):
+        """This worker thread's connection (opened on first use)"""
+        loader = getattr(self._local, 'loader', None)
+        if loader is None:
+            loader = BaseSeeder()
+            loader.connect()
+            self._local.loader = loader
+            with self._loaders_lock:
+                self._loaders.append(loader)
+        return loader
+
+    def close_loaders(self):
+        """Close every worker connection"""
+        with self._loaders_lock:
+            loaders, self._loaders = self._loaders, []
+        for loader in loaders:
+            loader.disconnect()
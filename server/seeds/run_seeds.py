@@ -3,6 +3,8 @@
 Command-line script to run database seeders
 """
 
+import argparse
+import logging
 import sys
 import os
 
@@ -10,9 +12,26 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from seeds.northwind_seeder import NorthwindSeeder
+from seeds.northwind_synthetic import NorthwindSyntheticSeeder
+
+def parse_args(argv=None):
+    """Command-line options"""
+    parser = argparse.ArgumentParser(description="Seed the Northwind database")
+    parser.add_argument(
+        "--scale", type=float, default=0,
+        help="Add synthetic customers, products and orders at this multiple of the Northwind sizes "
+             "(1000 gives about 3M rows; 0 loads only the sample data)"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument("--jobs", type=int, default=4, help="Tables loaded in parallel")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows generated and copied per batch")
+    return parser.parse_args(argv)
 
 def main():
     """Main function to run seeders"""
+    args = parse_args()
+    # The synthetic seeder reports progress through logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🚀 Database Seeder Tool")
     print("=" * 40)
     
@@ -27,6 +46,15 @@ def main():
         seeder = NorthwindSeeder()
         seeder.seed()
         
+        if args.scale > 0:
+            print("\n🌱 Running synthetic Northwind seeder...")
+            NorthwindSyntheticSeeder(
+                scale=args.scale,
+                seed=args.seed,
+                workers=args.jobs,
+                batch_size=args.batch_size
+            ).seed()
+        
         print("\n✅ All seeders completed successfully!")
         
     except Exception as e:
@@ -0,0 +1,5 @@
+import os
+
+# Keep the column statistics store out of the working tree; every other
+# setting keeps its default
+os.environ.setdefault("COLUMN_STATS_STORE_PATH", "")
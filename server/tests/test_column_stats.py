@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+
+import psycopg2
+
+from app.db import column_stats
+
+
+class ScriptedConnection:
+    """Connection stand-in whose cursor fails for tables listed in bad_tables unless common values are off"""
+
+    def __init__(self, bad_tables):
+        self.bad_tables = set(bad_tables)
+        self.calls = []
+        self.rollbacks = 0
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def execute(self, query, params):
+        self.calls.append((list(params["tables"]), params["with_values"]))
+        if params["with_values"] and self.bad_tables.intersection(params["tables"]):
+            raise psycopg2.DataError("malformed array literal")
+        self._rows = [
+            (table, 100.0, None, [{
+                "name": "a", "null_frac": 0.0, "n_distinct": -0.5,
+                "common_values": ["x"] if params["with_values"] else None,
+                "common_freqs": [0.5] if params["with_values"] else None,
+            }])
+            for table in params["tables"]
+        ]
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_unreadable_common_values_only_cost_the_failing_table(monkeypatch):
+    conn = ScriptedConnection(bad_tables=["odd"])
+
+    @contextmanager
+    def connect(database):
+        yield conn
+
+    monkeypatch.setattr(column_stats, "get_connection", connect)
+
+    stats = column_stats.read_column_stats("db", ["plain", "odd"], max_values=5)
+
+    assert stats["plain"]["columns"]["a"] == {"null_frac": 0.0, "distinct": 50, "common_values": ["x"], "common_freqs": [0.5]}
+    assert stats["odd"]["columns"]["a"] == {"null_frac": 0.0, "distinct": 50, "common_values": [], "common_freqs": []}
+    assert conn.calls == [(["plain", "odd"], True), (["plain"], True), (["odd"], True), (["odd"], False)]
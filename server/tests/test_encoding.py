@@ -0,0 +1,20 @@
+import datetime
+import decimal
+import json
+
+from app.utils.encoding import encode_columnar, encode_json
+
+
+def test_default_json_keeps_numerics_as_numbers():
+    rows = [(decimal.Decimal("12.50"), decimal.Decimal("3"), datetime.date(2024, 1, 2))]
+
+    payload = json.loads(encode_json(["price", "quantity", "day"], [1700, 1700, 1082], rows, cached=False))
+
+    assert payload == {"data": [{"price": 12.5, "quantity": 3, "day": "2024-01-02"}], "cached": False}
+
+
+def test_columnar_keeps_numeric_precision():
+    payload = json.loads(encode_columnar(["price"], [1700], [(decimal.Decimal("12.50"),)]))
+
+    assert payload["rows"] == [["12.50"]]
+    assert payload["types"] == ["numeric"]
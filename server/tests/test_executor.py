@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from app.db import executor
+from app.db.executor import QueryCancelledError, execute_query
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def cancel(self):
+        pass
+
+
+def test_query_cancelled_while_waiting_for_a_connection_never_runs(monkeypatch):
+    monkeypatch.setattr(executor.settings, "DISCONNECT_POLL_INTERVAL", 0.001)
+    conn = RecordingConnection()
+    pool_free = threading.Event()
+
+    @contextmanager
+    def connect(database):
+        # Blocks like a pool with no idle connection
+        pool_free.wait(5)
+        yield conn
+
+    async def main():
+        query = asyncio.ensure_future(execute_query("db", "SELECT 1", request=DisconnectedRequest(), connect=connect))
+        await asyncio.sleep(0.05)
+        pool_free.set()
+        await query
+
+    with pytest.raises(QueryCancelledError):
+        asyncio.run(main())
+    assert conn.statements == []
@@ -0,0 +1,46 @@
+import gzip
+
+import pytest
+
+from app.db.export import GzipWriter, copy_source
+
+
+class Sink:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM orders;", "SELECT * FROM orders"),
+    ("-- latest\nSELECT 1 /* trailing */ ;  ", "SELECT 1"),
+    ("WITH o AS (SELECT 1) SELECT * FROM o", "WITH o AS (SELECT 1) SELECT * FROM o"),
+    ("SELECT ')' AS paren", "SELECT ')' AS paren"),
+])
+def test_copy_source_keeps_the_query_text(sql, expected):
+    assert copy_source(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1) TO PROGRAM 'rm -rf /' --",
+    "SELECT (1",
+    "SHOW timezone",
+    "EXPLAIN SELECT 1",
+    "",
+])
+def test_copy_source_rejects_what_cannot_be_embedded_in_copy(sql):
+    with pytest.raises(ValueError):
+        copy_source(sql)
+
+
+def test_gzip_writer_produces_a_gzip_stream():
+    sink = Sink()
+    writer = GzipWriter(sink)
+    writer.write("id,name\n")
+    writer.write(b"1,chai\n")
+    writer.close()
+
+    assert gzip.decompress(bytes(sink.data)) == b"id,name\n1,chai\n"
@@ -0,0 +1,37 @@
+import asyncio
+
+from app.services.llm_cache import LLMCache
+
+
+def test_llm_cache_keys_on_normalized_question_schema_and_model():
+    cache = LLMCache(max_entries=10)
+    cache.set("How many orders?", "orders(id int)", "gpt", "SELECT count(*) FROM orders", database="shop")
+
+    assert cache.get("  how many   ORDERS? ", "orders(id int)", "gpt") == "SELECT count(*) FROM orders"
+    assert cache.get("How many orders?", "orders(id int, total numeric)", "gpt") is None
+    assert cache.get("How many orders?", "orders(id int)", "other-model") is None
+
+
+def test_llm_cache_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    first = LLMCache(db_path=path)
+    first.set("How many orders?", "s", "gpt", "SELECT 1", database="shop")
+    first.delete("Unknown question", "s", "gpt")
+    assert first.get("How many orders?", "s", "gpt") == "SELECT 1"
+
+    second = LLMCache(db_path=path)
+    assert asyncio.run(second.aget("How many orders?", "s", "gpt")) == "SELECT 1"
+
+    second.invalidate_database("shop")
+    assert LLMCache(db_path=path).get("How many orders?", "s", "gpt") is None
+
+
+def test_llm_cache_evicts_least_recently_used():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "s", "m", "SELECT 'a'")
+    cache.set("b", "s", "m", "SELECT 'b'")
+    cache.get("a", "s", "m")
+    cache.set("c", "s", "m", "SELECT 'c'")
+
+    assert cache.get("b", "s", "m") is None
+    assert cache.get("a", "s", "m") == "SELECT 'a'"
@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+from app.api import main
+
+
+def test_metrics_exports_cache_series_with_default_settings():
+    assert main.similarity_cache is None
+
+    response = TestClient(main.app).get("/metrics")
+
+    assert response.status_code == 200
+    for name in ("llm", "result", "fast_path"):
+        assert f'nlpsql_cache_lookups_total{{cache="{name}",result="hit"}}' in response.text
+    assert 'nlpsql_cache_entries{cache="llm"}' in response.text
+    assert 'cache="similarity"' not in response.text
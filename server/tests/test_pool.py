@@ -0,0 +1,80 @@
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from app.db.pool import ConnectionPool, PoolError, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.autocommit = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    return ConnectionPool("db", connect=connect, **kwargs), opened
+
+
+def test_connections_are_reused_and_rolled_back():
+    connections, opened = pool(max_size=2)
+    with connections.connection() as conn:
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    with connections.connection() as again:
+        assert again is conn
+
+    assert len(opened) == 1
+    assert conn.rollbacks == 1
+    assert connections.stats()["idle"] == 1
+
+
+def test_exhausted_pool_times_out():
+    connections, _ = pool(max_size=1, acquire_timeout=0.05)
+    connections.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        connections.getconn()
+
+
+def test_broken_connection_is_discarded():
+    connections, opened = pool(max_size=1)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with connections.connection():
+            raise psycopg2.OperationalError("server closed the connection")
+
+    assert opened[0].closed
+    assert connections.stats() == {"database": "db", "idle": 0, "in_use": 0, "max_size": 1, "closed": False}
+    with connections.connection() as conn:
+        assert conn is opened[1]
+
+
+def test_closed_pool_closes_returned_connections():
+    connections, opened = pool(min_size=1, max_size=2)
+    connections.warm()
+    conn = connections.getconn()
+
+    connections.close()
+    connections.putconn(conn)
+
+    assert all(c.closed for c in opened)
+    with pytest.raises(PoolError):
+        connections.getconn()
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.db.query_guard import ConfirmationRequiredError, QueryGuard
+from app.utils.utils import validate_sql_safety
+
+
+class RecordingCursor:
+    """Cursor stand-in answering EXPLAIN with a fixed plan"""
+
+    def __init__(self, total_cost=10.0, plan_rows=5):
+        self.statements = []
+        self.plan = [{"Plan": {"Node Type": "Seq Scan", "Relation Name": "orders",
+                               "Total Cost": total_cost, "Plan Rows": plan_rows}}]
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (json.dumps(self.plan),)
+
+
+def guard(**thresholds):
+    defaults = {"confirm_cost": 0, "reject_cost": 0, "confirm_rows": 0, "reject_rows": 0, "row_limit": 100}
+    defaults.update(thresholds)
+    return QueryGuard(defaults=defaults)
+
+
+@pytest.mark.parametrize("sql", [
+    "SHOW timezone",
+    "show search_path;",
+    "EXPLAIN SELECT * FROM orders",
+    "explain (format json) select 1",
+])
+def test_statements_explain_cannot_plan_pass_unguarded(sql):
+    assert validate_sql_safety(sql)["is_safe"]
+    cur = RecordingCursor()
+
+    assert guard(confirm_cost=1).check(cur, "db", sql) is None
+    assert cur.statements == []
+    assert guard().apply_row_limit("db", sql) == (sql, None)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM orders",
+    "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent",
+    "VALUES (1), (2)",
+    "TABLE orders",
+])
+def test_queries_are_explained(sql):
+    assert validate_sql_safety(sql)["is_safe"]
+    cur = RecordingCursor()
+
+    plan = guard().check(cur, "db", sql)
+
+    assert cur.statements == ["EXPLAIN (FORMAT JSON) " + sql]
+    assert plan["seq_scans"] == ["orders"]
+
+
+def test_expensive_query_needs_confirmation():
+    cur = RecordingCursor(total_cost=5000)
+
+    with pytest.raises(ConfirmationRequiredError):
+        guard(confirm_cost=1000).check(cur, "db", "SELECT * FROM orders")
+    assert guard(confirm_cost=1000).check(cur, "db", "SELECT * FROM orders", confirmed=True)["total_cost"] == 5000
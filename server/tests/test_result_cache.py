@@ -0,0 +1,37 @@
+from app.db.executor import QueryResult
+from app.services.result_cache import ResultCache
+
+
+def result(rows):
+    return QueryResult(["id"], [23], rows)
+
+
+def test_result_cache_ignores_whitespace_and_skips_volatile_queries():
+    cache = ResultCache()
+
+    assert cache.set("shop", "SELECT id FROM orders;", result([(1,)]))
+    assert cache.get("shop", "  SELECT id   FROM orders ") == result([(1,)])
+    assert not cache.set("shop", "SELECT now()", result([(1,)]))
+    assert cache.get("other", "SELECT id FROM orders") is None
+
+
+def test_result_cache_drops_results_computed_before_an_invalidation():
+    cache = ResultCache()
+    generation = cache.generation("shop")
+    cache.set("shop", "SELECT 1", result([(1,)]))
+
+    cache.invalidate_database("shop")
+
+    assert cache.get("shop", "SELECT 1") is None
+    assert not cache.set("shop", "SELECT 2", result([(2,)]), generation=generation)
+
+
+def test_result_cache_stays_within_its_memory_budget():
+    cache = ResultCache(max_bytes=20000)
+    for n in range(50):
+        cache.set("shop", f"SELECT {n}", result([(i,) for i in range(20)]))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 20000
+    assert 0 < stats["entries"] < 50
+    assert cache.get("shop", "SELECT 49") is not None
@@ -0,0 +1,41 @@
+import asyncio
+import gc
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert calls == [1]
+    assert flights.stats()["coalesced"] == 4
+
+
+def test_running_work_is_referenced_until_it_finishes():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        waiter = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        assert len(flights._tasks) == 1
+        gc.collect()
+        result = await waiter
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "result"
+    assert not flights._tasks
@@ -0,0 +1,66 @@
+import collections
+import os
+
+import pytest
+
+from app.services.sql_ingest import StatementSplitter, iter_text_chunks, leading_keywords
+
+DUMPS = os.path.join(os.path.dirname(__file__), os.pardir, "db")
+
+
+def split(text, chunk_size=None):
+    if chunk_size is None:
+        return list(StatementSplitter(iter([text])))
+    return list(StatementSplitter(text[i:i + chunk_size] for i in range(0, len(text), chunk_size)))
+
+
+@pytest.mark.parametrize("dump, expected", [
+    ("northwind.sql", {"insert": 3362, "alter": 27, "drop": 14, "create": 14, "set": 8}),
+    ("Chinook_PostgreSql.sql", {"insert": 24, "create": 23, "alter": 11, "drop": 1}),
+])
+def test_bundled_dumps_split_the_same_at_any_chunk_size(dump, expected):
+    path = os.path.join(DUMPS, dump)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    whole = [statement.sql for statement in split(text)]
+    with open(path, "rb") as f:
+        streamed = [statement.sql for statement in StatementSplitter(iter_text_chunks(f, 4096))]
+
+    assert collections.Counter(leading_keywords(sql, 1)[0] for sql in whole) == expected
+    assert all(sql.endswith(";") for sql in whole)
+    assert streamed == whole
+    assert [statement.sql for statement in split(text, chunk_size=7)] == whole
+
+
+def test_semicolons_inside_quotes_comments_and_bodies_do_not_split():
+    script = (
+        "INSERT INTO t VALUES ('a;b', E'c\\';d', \"e;f\");\n"
+        "-- comment; still a comment\n"
+        "/* block; /* nested; */ comment */\n"
+        "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;\n"
+        "SELECT 1"
+    )
+
+    statements = [statement.sql for statement in split(script, chunk_size=3)]
+
+    assert len(statements) == 3
+    assert statements[0] == "INSERT INTO t VALUES ('a;b', E'c\\';d', \"e;f\");"
+    assert statements[1].endswith("$body$ LANGUAGE sql;")
+    assert statements[2] == "SELECT 1"
+
+
+def test_copy_data_is_streamed_and_meta_commands_skipped():
+    script = "\\connect shop\nCOPY t (a, b) FROM stdin;\n1\tx;y\n2\tz\n\\.\nSELECT 2;\n"
+
+    chunks = (script[i:i + 4] for i in range(0, len(script), 4))
+    statements = []
+    # Data must be read while the statement is current
+    for statement in StatementSplitter(chunks):
+        data = statement.copy_data.read() if statement.copy_data is not None else None
+        statements.append((statement.sql, data))
+
+    assert statements == [
+        ("COPY t (a, b) FROM stdin;", "1\tx;y\n2\tz\n"),
+        ("SELECT 2;", None),
+    ]
@@ -0,0 +1,23 @@
+import pytest
+
+from app.db.streaming import make_continuation_token, parse_continuation_token, resumable
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM orders ORDER BY order_id", True),
+    ("WITH o AS (SELECT * FROM orders) SELECT * FROM o ORDER BY 1", True),
+    ("SELECT * FROM orders", False),
+    ("SELECT *, row_number() OVER (ORDER BY order_id) FROM orders", False),
+    ("SELECT * FROM (SELECT * FROM orders ORDER BY order_id) o", False),
+    ("SELECT 'order by' FROM orders", False),
+])
+def test_only_queries_with_a_top_level_order_by_are_resumable(sql, expected):
+    assert resumable(sql) is expected
+
+
+def test_continuation_token_only_resumes_the_same_query():
+    token = make_continuation_token("db", "SELECT 1 ORDER BY 1", 500)
+
+    assert parse_continuation_token(token, "db", "SELECT 1 ORDER BY 1") == 500
+    with pytest.raises(ValueError):
+        parse_continuation_token(token, "db", "SELECT 2 ORDER BY 1")
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+from app.services.tenant_registry import TenantRegistry, TenantStore
+
+
+def registry(**kwargs):
+    released = []
+    kwargs.setdefault("idle_timeout", 0)
+    return TenantRegistry(on_evict=released.append, **kwargs), released
+
+
+def test_least_recently_used_tenant_is_evicted_and_its_database_released():
+    tenants, released = registry(max_tenants=2)
+    tenants.bind("a", "db_a")
+    tenants.bind("b", "db_b")
+    tenants.get("a")
+
+    tenants.bind("c", "db_c")
+
+    assert released == ["db_b"]
+    assert tenants.stats()["tenants"] == 2
+    assert tenants.stats()["evictions"] == 1
+
+
+def test_database_still_used_by_another_tenant_is_kept():
+    tenants, released = registry(max_tenants=2)
+    tenants.bind("a", "shared")
+    tenants.bind("b", "shared")
+
+    tenants.bind("c", "db_c")
+
+    assert released == []
+
+
+def test_binding_survives_eviction():
+    tenants, released = registry(max_tenants=1)
+    tenants.bind("a", "db_a")
+    tenants.bind("b", "db_b")
+
+    assert released == ["db_a"]
+    assert tenants.database_for("a") == "db_a"
+    assert tenants.stats()["bindings"] == 2
+
+
+def test_rebinding_releases_the_previous_database():
+    tenants, released = registry()
+    tenants.bind("a", "old")
+    tenants.bind("b", "shared")
+    tenants.bind("a", "shared")
+
+    assert released == ["old"]
+    assert tenants.database_for("a") == "shared"
+
+    tenants.bind("b", "new")
+    assert released == ["old"]
+
+
+def test_rebinding_in_another_worker_is_picked_up_from_the_store(tmp_path):
+    store = TenantStore(str(tmp_path / "tenants.sqlite3"))
+    worker, released = registry(store=store, store_refresh=0)
+    other, _ = registry(store=store, store_refresh=0)
+    worker.bind("a", "old")
+
+    other.bind("a", "new")
+
+    assert worker.database_for("a") == "new"
+    assert released == ["old"]
+
+
+def test_event_loop_releases_on_a_worker_thread():
+    threads = []
+    tenants = TenantRegistry(max_tenants=1, idle_timeout=0, on_evict=lambda _: threads.append(threading.get_ident()))
+    tenants.bind("a", "db_a")
+    tenants.bind("b", "db_b")
+    threads.clear()
+
+    async def use_a():
+        async with tenants.limit("a"):
+            return threading.get_ident()
+
+    loop_thread = asyncio.run(use_a())
+
+    assert len(threads) == 1
+    assert threads[0] != loop_thread
+
+
+def test_reimport_in_another_worker_drops_cached_state(tmp_path):
+    store = TenantStore(str(tmp_path / "tenants.sqlite3"))
+    reimported = []
+    worker = TenantRegistry(store=store, store_refresh=0, on_reimport=reimported.append)
+    uploader = TenantRegistry(store=store, store_refresh=0, on_reimport=reimported.append)
+    uploader.bind("a", "db_a")
+    uploader.record_import("db_a")
+
+    asyncio.run(worker.aget("a"))
+    assert reimported == []
+
+    uploader.record_import("db_a")
+    asyncio.run(worker.aget("a"))
+    worker.get("a")
+
+    assert reimported == ["db_a"]
@@ -0,0 +1,33 @@
+import pytest
+
+from app.utils.utils import validate_sql_safety
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT created_at, last_update FROM orders",
+    "SELECT 'drop table orders; delete' AS note",
+    "SELECT 1 -- delete everything",
+    "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent;",
+    'SELECT "insert" FROM t',
+])
+def test_read_only_queries_are_safe(sql):
+    assert validate_sql_safety(sql)["is_safe"]
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM orders",
+    "SELECT 1; DROP TABLE orders",
+    "WITH gone AS (DELETE FROM orders RETURNING *) SELECT * FROM gone",
+    "SELECT * INTO copy FROM orders",
+    "EXPLAIN ANALYZE DELETE FROM orders",
+    "VACUUM orders",
+    "SELECT 'unterminated",
+])
+def test_writes_and_other_statements_are_rejected(sql):
+    assert not validate_sql_safety(sql)["is_safe"]
+
+
+def test_questions_are_checked_for_command_words():
+    assert validate_sql_safety("Which customers ordered last month?", include_select=True)["is_safe"]
+    assert not validate_sql_safety("select all orders", include_select=True)["is_safe"]
+    assert validate_sql_safety("Which orders were updated?", include_select=True)["is_safe"]